@@ -14,6 +14,8 @@ from livekit.agents import (
 )
 from livekit.plugins import murf, silero, google, deepgram
 
+from prompt_cache import cached_llm_node
+
 logger = logging.getLogger("agent")
 load_dotenv(".env.local")
 
@@ -31,8 +33,17 @@ def load_tutor_content():
 TUTOR_CONTENT = load_tutor_content()
 
 
+class TutorAgent(Agent):
+    """Base for the tutor modes: their instructions carry the full TUTOR_CONTENT, so they go
+    out as a cached prompt prefix instead of in full on every turn."""
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        async for chunk in cached_llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
+
+
 # LEARN MODE AGENT - Matthew voice
-class LearnAgent(Agent):
+class LearnAgent(TutorAgent):
     def __init__(self) -> None:
         content_str = json.dumps(TUTOR_CONTENT, indent=2)
         super().__init__(
@@ -59,7 +70,7 @@ If user wants quiz or teach mode, use the transfer tools.""",
 
 
 # QUIZ MODE AGENT - Alicia voice  
-class QuizAgent(Agent):
+class QuizAgent(TutorAgent):
     def __init__(self) -> None:
         content_str = json.dumps(TUTOR_CONTENT, indent=2)
         super().__init__(
@@ -86,7 +97,7 @@ If user wants learn or teach mode, use the transfer tools.""",
 
 
 # TEACH BACK MODE AGENT - Ken voice
-class TeachBackAgent(Agent):
+class TeachBackAgent(TutorAgent):
     def __init__(self) -> None:
         content_str = json.dumps(TUTOR_CONTENT, indent=2)
         super().__init__(
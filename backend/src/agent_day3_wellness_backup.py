@@ -18,6 +18,8 @@ from livekit.agents import (
     RunContext,
 )
 from livekit.plugins import murf, silero, google, deepgram
+
+from prompt_cache import cached_llm_node
 # from livekit.plugins import noise_cancellation
 # from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
@@ -196,6 +198,11 @@ class Assistant(Agent):
             """,
         )
 
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        # The check-in instructions are static: send them as a cached prompt prefix
+        async for chunk in cached_llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
+
     @function_tool
     async def save_wellness_checkin(
         self,
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import prompt_cache
+from prompt_cache import PromptCache, StubCacheBackend, prefix_hash
+
+PREFIX = "You are Matthew, a friendly Python tutor.\n" + "Available concepts: variables, loops, functions.\n" * 200
+
+
+class FailingBackend:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def create(self, model, prefix, tools, ttl, key):
+        self.calls += 1
+        raise RuntimeError("caching not supported for this model")
+
+
+def get(cache: PromptCache, model: str, prefix: str):
+    return asyncio.run(cache.get(model, prefix))
+
+
+def test_prefix_hash_is_stable() -> None:
+    """Whitespace noise doesn't change the key; content and tools do."""
+    assert prefix_hash(PREFIX) == prefix_hash(PREFIX.replace("\n", "  \r\n") + "\n\n")
+    assert prefix_hash(PREFIX) != prefix_hash(PREFIX + "Be brief.")
+    assert prefix_hash(PREFIX, [{"name": "transfer_to_quiz"}]) != prefix_hash(PREFIX, [{"name": "transfer_to_teach"}])
+
+
+def test_registers_once_and_reuses() -> None:
+    backend = StubCacheBackend()
+    cache = PromptCache(backend, min_tokens=100)
+
+    names = [get(cache, "gemini-2.5-flash", PREFIX) for _ in range(5)]
+
+    assert backend.created == 1
+    assert len(set(names)) == 1
+    assert backend.entries[names[0]]["prefix"] == PREFIX
+    assert cache.stats()["hits"] == 4
+    # A different model needs its own cache
+    assert get(cache, "gemini-2.5-pro", PREFIX) != names[0]
+    assert backend.created == 2
+
+
+def test_small_prefix_is_sent_in_full() -> None:
+    backend = StubCacheBackend()
+    cache = PromptCache(backend, min_tokens=1024)
+
+    assert get(cache, "gemini-2.5-flash", "You are a coordinator.") is None
+    assert backend.created == 0
+    assert cache.stats()["too_small"] == 1
+
+
+def test_expiring_cache_is_registered_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = StubCacheBackend()
+    cache = PromptCache(backend, ttl=600, min_tokens=100)
+    now = 1_000_000.0
+    monkeypatch.setattr(prompt_cache.time, "time", lambda: now)
+
+    first = get(cache, "gemini-2.5-flash", PREFIX)
+    now += 600 - prompt_cache.REFRESH_MARGIN + 1
+    second = get(cache, "gemini-2.5-flash", PREFIX)
+
+    assert first != second
+    assert backend.created == 2
+
+
+def test_failed_registration_falls_back_then_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = FailingBackend()
+    cache = PromptCache(backend, min_tokens=100)
+    now = 1_000_000.0
+    monkeypatch.setattr(prompt_cache.time, "time", lambda: now)
+
+    assert get(cache, "gemini-1.5-flash", PREFIX) is None
+    assert get(cache, "gemini-1.5-flash", PREFIX) is None
+    assert backend.calls == 1
+    now += prompt_cache.RETRY_AFTER_FAILURE + 1
+    assert get(cache, "gemini-1.5-flash", PREFIX) is None
+    assert backend.calls == 2
+    assert cache.stats()["failures"] == 2
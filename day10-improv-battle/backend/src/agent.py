@@ -22,9 +22,16 @@ from livekit.agents import (
 )
 from livekit.plugins import deepgram, google, murf, silero
 
+from rate_limit import is_rate_limited, limiter, rate_limit_stats, retry_after_of
+
 logger = logging.getLogger("improv-battle-agent")
 logger.setLevel(logging.INFO)
 
+# The default Gemini model has a lower quota, so every session in this worker process shares
+# one bucket for it (PROVIDER_RATE_LIMITS can override or add limits).
+LLM_QUOTA_MODEL = "gemini-2.0-flash-exp"
+limiter.configure(f"gemini:{LLM_QUOTA_MODEL}", float(os.getenv("IMPROV_LLM_RPM", 10)))
+
 
 def load_scenarios() -> list[dict[str, Any]]:
     """Load improv scenarios from JSON file."""
@@ -111,6 +118,22 @@ Let's make this fun and engaging!"""
             instructions=instructions
         )
 
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        # Host replies are interactive: wait for quota instead of bursting into 429s
+        await limiter.acquire("gemini", LLM_QUOTA_MODEL)
+        try:
+            async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+                yield chunk
+        except Exception as e:
+            if is_rate_limited(e):
+                limiter.rate_limited("gemini", LLM_QUOTA_MODEL, retry_after_of(e))
+            raise
+
+    async def tts_node(self, text, model_settings):
+        await limiter.acquire("murf")
+        async for frame in Agent.default.tts_node(self, text, model_settings):
+            yield frame
+
     async def on_user_turn_completed(self, session: AgentSession, new_message: llm.ChatMessage):
         """Called after the user finishes speaking."""
         global improv_state
@@ -201,6 +224,11 @@ async def entrypoint(ctx: JobContext):
     # Configure voice activity detection
     vad = silero.VAD.load()
     
+    async def log_rate_limits():
+        logger.info(f"Provider rate limits: {rate_limit_stats()}")
+
+    ctx.add_shutdown_callback(log_rate_limits)
+
     # Connect to the room
     await ctx.connect()
     
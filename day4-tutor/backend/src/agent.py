@@ -7,6 +7,8 @@ from typing import Annotated
 from livekit.agents import Agent, WorkerOptions, cli, llm
 from livekit.plugins import deepgram, google, murf, silero
 
+from prompt_cache import cached_llm_node
+
 logger = logging.getLogger("tutor-agent")
 logger.setLevel(logging.INFO)
 
@@ -25,8 +27,17 @@ def load_tutor_content():
 TUTOR_CONTENT = load_tutor_content()
 
 
+class TutorAgent(Agent):
+    """Base for the tutor agents: their instructions are static (the coordinator's carry the full
+    TUTOR_CONTENT), so they go out as a cached prompt prefix instead of in full on every turn."""
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        async for chunk in cached_llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
+
+
 # LEARN MODE AGENT - Matthew voice
-class LearnAgent(Agent):
+class LearnAgent(TutorAgent):
     def __init__(self) -> None:
         super().__init__(
             instructions=f"""You are a friendly Python programming tutor named Matthew in LEARN mode.
@@ -51,7 +62,7 @@ Be encouraging and patient. Make learning fun!
 
 
 # QUIZ MODE AGENT - Alicia voice
-class QuizAgent(Agent):
+class QuizAgent(TutorAgent):
     def __init__(self) -> None:
         super().__init__(
             instructions=f"""You are an enthusiastic quiz host named Alicia in QUIZ mode.
@@ -79,7 +90,7 @@ Be supportive and encouraging, even when answers are wrong!
 
 
 # TEACH BACK MODE AGENT - Ken voice
-class TeachBackAgent(Agent):
+class TeachBackAgent(TutorAgent):
     def __init__(self) -> None:
         super().__init__(
             instructions=f"""You are a patient mentor named Ken in TEACH BACK mode.
@@ -110,7 +121,7 @@ Teaching others is the best way to learn - encourage and praise their efforts!
 
 
 # COORDINATOR AGENT - Greets and manages handoffs
-class CoordinatorAgent(Agent):
+class CoordinatorAgent(TutorAgent):
     def __init__(self) -> None:
         super().__init__(
             instructions="""You are a friendly coordinator for the Active Recall Coach learning system.
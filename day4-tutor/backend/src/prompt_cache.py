@@ -0,0 +1,190 @@
+# Static prompt-prefix caching. An agent's instructions are identical on every turn, so they are
+# registered once with the provider's context cache (Gemini cachedContents) and later turns send
+# only the cache name plus the conversation instead of re-sending the whole prefix.
+#
+# Caches are keyed by a stable hash of the model, prefix and tool declarations and shared by every
+# session in the process. Prefixes under the provider's minimum size, non-Gemini LLMs and failed
+# registrations fall back to sending the prompt as usual. StubCacheBackend stands in for the
+# provider in tests and offline benchmarks. The core has no framework dependencies; only
+# cached_llm_node() touches LiveKit. Copied into each agent that uses it, like rate_limit.py.
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger("prompt-cache")
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE", "1") == "1"
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", 3600))
+# Gemini won't cache fewer tokens than this (1024 for 2.5 Flash; Pro models need more)
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", 1024))
+# Re-register this long before a cache expires, so no turn references an expired one
+REFRESH_MARGIN = 60.0
+# After a failed registration, send the prompt normally for this long before trying again
+RETRY_AFTER_FAILURE = 300.0
+# ~4 characters per token for English; only used against the minimum size
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _jsonable(value: Any) -> Any:
+    # Provider tool declarations are pydantic models
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def prefix_hash(prefix: str, tools: Any = None) -> str:
+    """Same hash in every process and across restarts: line endings and trailing whitespace
+    are normalized, tool declarations serialized with sorted keys."""
+    text = "\n".join(line.rstrip() for line in prefix.strip().splitlines())
+    digest = hashlib.sha256(text.encode("utf-8"))
+    if tools:
+        digest.update(json.dumps(tools, sort_keys=True, default=_jsonable).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class StubCacheBackend:
+    """In-memory stand-in for a provider cache, for tests and offline runs."""
+
+    def __init__(self):
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.created = 0
+
+    async def create(self, model: str, prefix: str, tools: Any, ttl: int, key: str) -> str:
+        self.created += 1
+        name = f"cachedContents/stub-{key}-{self.created}"
+        self.entries[name] = {"model": model, "prefix": prefix, "tools": tools, "expires_at": time.time() + ttl}
+        return name
+
+
+class GeminiCacheBackend:
+    """Gemini explicit context caching through google-genai (installed with the LiveKit Google plugin)."""
+
+    def __init__(self, client: Any = None):
+        self._client = client
+
+    async def create(self, model: str, prefix: str, tools: Any, ttl: int, key: str) -> str:
+        from google import genai
+        from google.genai import types
+
+        if self._client is None:
+            # Same environment as the LiveKit plugin: GOOGLE_API_KEY, or the Vertex AI variables
+            self._client = genai.Client()
+        cache = await self._client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=prefix,
+                tools=tools or None,
+                ttl=f"{ttl}s",
+                display_name=f"prompt-{key}",
+            ),
+        )
+        return cache.name
+
+
+class PromptCache:
+    def __init__(self, backend: Any, ttl: int = PROMPT_CACHE_TTL, min_tokens: int = PROMPT_CACHE_MIN_TOKENS):
+        self.backend = backend
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self._entries: dict[str, tuple[str, float]] = {}  # key -> (cache name, expires at)
+        self._retry_at: dict[str, float] = {}
+        self.hits = 0
+        self.registrations = 0
+        self.failures = 0
+        self.too_small = 0
+        self.uncached = 0
+
+    async def get(self, model: str, prefix: str, tools: Any = None) -> Optional[str]:
+        """Cache name to send instead of the prefix, registering it first if needed; None to send
+        the prefix as usual. Two sessions registering the same prefix at once may both create a
+        cache; the spare one simply expires."""
+        if estimate_tokens(prefix) < self.min_tokens:
+            self.too_small += 1
+            return None
+        key = prefix_hash(prefix, tools)
+        entry_key = f"{model}:{key}"
+        now = time.time()
+        entry = self._entries.get(entry_key)
+        if entry and entry[1] - REFRESH_MARGIN > now:
+            self.hits += 1
+            return entry[0]
+        if self._retry_at.get(entry_key, 0.0) > now:
+            self.uncached += 1
+            return None
+        try:
+            name = await self.backend.create(model, prefix, tools, self.ttl, key)
+        except Exception as e:
+            self.failures += 1
+            self._retry_at[entry_key] = now + RETRY_AFTER_FAILURE
+            logger.warning(f"Prompt cache: could not register prefix {key} for {model}, sending it in full: {e}")
+            return None
+        self._entries[entry_key] = (name, now + self.ttl)
+        self.registrations += 1
+        logger.info(f"Prompt cache: registered {key} (~{estimate_tokens(prefix)} tokens) for {model} as {name}")
+        return name
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "registrations": self.registrations,
+            "failures": self.failures,
+            "too_small": self.too_small,
+            "uncached": self.uncached,
+            "cached_prefixes": len(self._entries),
+        }
+
+
+# One cache registry per process, shared by all sessions
+prompt_cache = PromptCache(GeminiCacheBackend())
+
+
+def prompt_cache_stats() -> dict[str, Any]:
+    return prompt_cache.stats()
+
+
+def _gemini_tools(tools: list[Any]) -> Any:
+    # Google function declarations from the public ToolContext conversion (livekit-agents 1.3,
+    # pinned in pyproject.toml), not the Google plugin's internal helpers, which change between releases
+    from google.genai import types
+    from livekit.agents import llm
+
+    declarations = llm.ToolContext(tools).parse_function_tools("google")
+    return [types.Tool(function_declarations=[types.FunctionDeclaration.model_validate(d) for d in declarations])]
+
+
+async def cached_llm_node(agent: Any, chat_ctx: Any, tools: list[Any], model_settings: Any, cache: Optional[PromptCache] = None):
+    """Agent.llm_node that sends the agent's instructions as a cached Gemini prefix when it can.
+
+    A request that uses a cache can't also carry a system instruction or tools, so the cache holds
+    both and the turn goes out with only the conversation; anything else falls back to the default node.
+    """
+    from livekit.agents import Agent
+
+    cache = cache or prompt_cache
+    llm = agent.llm or agent.session.llm
+    name = None
+    if PROMPT_CACHE_ENABLED and type(llm).__module__.startswith("livekit.plugins.google"):
+        prefix = agent.instructions
+        ctx = chat_ctx.copy()
+        ctx.items = [
+            item for item in ctx.items
+            if not (item.type == "message" and item.role in ("system", "developer") and item.text_content == prefix)
+        ]
+        # Other system messages can't go alongside the cache
+        if not any(item.type == "message" and item.role in ("system", "developer") for item in ctx.items):
+            name = await cache.get(llm.model, prefix, _gemini_tools(tools) if tools else None)
+    if name is None:
+        async for chunk in Agent.default.llm_node(agent, chat_ctx, tools, model_settings):
+            yield chunk
+        return
+    conn_options = agent.session.conn_options.llm_conn_options
+    async with llm.chat(chat_ctx=ctx, tools=[], conn_options=conn_options, extra_kwargs={"cached_content": name}) as stream:
+        async for chunk in stream:
+            yield chunk
@@ -0,0 +1,160 @@
+# Answer cache accuracy, hit rate and the latency it saves, over a labelled set of SDR visitor
+# messages. None of the messages is an FAQ question or a curated paraphrase word for word: the
+# paraphrases are held out, and the rest (small talk, lead details, questions mixed with lead
+# details, product questions the FAQ doesn't answer) must still go to the LLM.
+#   python bench_answer_cache.py [--llm-ms 700] [--tts-ms 300]
+#   python bench_answer_cache.py --tune      # grid over the confidence thresholds
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import answer_cache
+from answer_cache import FAQ_PARAPHRASES, AnswerCache, intent_key
+
+# (message, FAQ question it should be answered with, or None for the LLM)
+LABELLED = [
+    ("what exactly is phonepe", "What does PhonePe do?"),
+    ("so what do you guys offer", "What does PhonePe do?"),
+    ("does it cost anything to use phonepe", "Is PhonePe free to use?"),
+    ("is phonepe really free", "Is PhonePe free to use?"),
+    ("do I need to pay for the QR code", "Is PhonePe free to use?"),
+    ("what fees do you take", "What is the Payment Gateway pricing?"),
+    ("what are the charges for the payment gateway", "What is the Payment Gateway pricing?"),
+    ("how much do you charge", "What is the Payment Gateway pricing?"),
+    ("do you charge a fee on each transaction", "What is the Payment Gateway pricing?"),
+    ("payment gateway pricing please", "What is the Payment Gateway pricing?"),
+    ("can every kind of business use phonepe", "Who can use PhonePe for business?"),
+    ("who is phonepe business for", "Who can use PhonePe for business?"),
+    ("how does the smartspeaker work", "What is PhonePe SmartSpeaker?"),
+    ("tell me about the sound box", "What is PhonePe SmartSpeaker?"),
+    ("when do I receive the money", "How quickly do I get settlements?"),
+    ("how long do settlements take", "How quickly do I get settlements?"),
+    ("how fast will the money reach my bank", "How quickly do I get settlements?"),
+    ("do you accept debit cards", "What payment methods does PhonePe support?"),
+    ("what payment options are available", "What payment methods does PhonePe support?"),
+    ("which payment methods do you support", "What payment methods does PhonePe support?"),
+    ("is it safe to use", "Is PhonePe safe and secure?"),
+    ("how secure are payments on phonepe", "Is PhonePe safe and secure?"),
+    ("is it secure", "Is PhonePe safe and secure?"),
+    ("can I use it abroad", "Can I use PhonePe internationally?"),
+    ("does phonepe work internationally", "Can I use PhonePe internationally?"),
+    ("how many people use phonepe", "What is PhonePe's market reach?"),
+    ("how many merchants do you have", "What is PhonePe's market reach?"),
+    ("how do I get started", "How do I get started with PhonePe for my business?"),
+    ("how can I sign up my business", "How do I get started with PhonePe for my business?"),
+    ("what do I need to start accepting payments", "How do I get started with PhonePe for my business?"),
+    ("can I get a business loan", "Does PhonePe offer loans?"),
+    ("do you give loans", "Does PhonePe offer loans?"),
+    ("is it good for a small team", "What team size is ideal for PhonePe business solutions?"),
+    ("does phonepe work for large enterprises", "What team size is ideal for PhonePe business solutions?"),
+    ("can I buy mutual funds", "Can I invest through PhonePe?"),
+    ("can I invest in gold", "Can I invest through PhonePe?"),
+    ("explain upi lite to me", "What is UPI Lite?"),
+    ("what's upi lite", "What is UPI Lite?"),
+    ("how do I reach support", "How do I contact PhonePe support?"),
+    ("how can I contact customer support", "How do I contact PhonePe support?"),
+    ("what industries do you serve", "What industries does PhonePe serve?"),
+    ("do you serve the healthcare industry", "What industries does PhonePe serve?"),
+    ("Hi, I'm looking for a payment solution", None),
+    ("I have an online clothing store", None),
+    ("I'm Rahul from Acme, is it secure?", None),
+    ("I'm Rahul, CTO at Threadline, team of 40", None),
+    ("We do about 5 lakh a month in sales, what would the fees be for us", None),
+    ("How does PhonePe compare to Razorpay?", None),
+    ("Do you integrate with Shopify?", None),
+    ("Can I speak to someone from sales?", None),
+    ("tell me about ads", None),
+    ("My email is rahul@acme.in", None),
+    ("yes", None),
+    ("okay great", None),
+    ("That's all, thanks", None),
+]
+
+# Thresholds tried by --tune
+SCORES = [1.5, 2.0, 2.5, 3.0, 3.5, 4.0]
+MARGINS = [1.0, 1.25, 1.5, 2.0]
+COVERAGES = [0.5, 0.6, 0.75, 1.0]
+
+
+def evaluate(faqs, labelled):
+    """(correct, wrong, false hits) over the labelled messages, with a fresh cache."""
+    cache = AnswerCache(faqs)
+    questions = [faq["question"] for faq in faqs]
+    correct = wrong = false_hits = 0
+    for text, expected in labelled:
+        faq_id = cache.match(text)
+        if faq_id is None:
+            continue
+        if expected is None:
+            false_hits += 1
+        elif questions[faq_id] == expected:
+            correct += 1
+        else:
+            wrong += 1
+    return correct, wrong, false_hits
+
+
+def tune(faqs):
+    questions = sum(1 for _, expected in LABELLED if expected)
+    results = []
+    for score, margin, coverage in itertools.product(SCORES, MARGINS, COVERAGES):
+        answer_cache.CONFIDENT_SCORE, answer_cache.CONFIDENT_MARGIN, answer_cache.MIN_COVERAGE = score, margin, coverage
+        correct, wrong, false_hits = evaluate(faqs, LABELLED)
+        results.append((wrong + false_hits, -correct, score, margin, coverage))
+    print(f"{'score':>6} {'margin':>6} {'cover':>6}  answered  wrong/false")
+    for errors, neg_correct, score, margin, coverage in sorted(results)[:10]:
+        print(f"{score:>6} {margin:>6} {coverage:>6}  {-neg_correct:>4}/{questions}  {errors:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=700)
+    parser.add_argument("--tts-ms", type=float, default=300)
+    parser.add_argument("--turns", type=int, default=10000)
+    parser.add_argument("--tune", action="store_true")
+    args = parser.parse_args()
+    with open(Path(__file__).parent / "phonepe_faq.json", encoding="utf-8") as f:
+        faqs = json.load(f)["faqs"]
+    curated = {intent_key(text) for faq in faqs for text in [faq["question"], *FAQ_PARAPHRASES.get(faq["question"], [])]}
+    assert not [text for text, _ in LABELLED if intent_key(text) in curated], "labelled set must be held out"
+    if args.tune:
+        tune(faqs)
+        sys.exit()
+
+    correct, wrong, false_hits = evaluate(faqs, LABELLED)
+    questions = sum(1 for _, expected in LABELLED if expected)
+    print(f"labelled set: {correct}/{questions} paraphrased FAQ questions answered from the cache, "
+          f"{wrong} with the wrong FAQ, {false_hits}/{len(LABELLED) - questions} other messages wrongly answered")
+
+    # Traffic replay: the labelled messages at random, with matches learned along the way
+    cache = AnswerCache(faqs, audio_dir=None)
+    rng = random.Random(3)
+    turns = [text for text, _ in rng.choices(LABELLED, k=args.turns)]
+    start = time.perf_counter()
+    for text in turns:
+        faq_id = cache.match(text)
+        if faq_id is not None:
+            # Each answer is synthesized on its first hit and replayed from the cache after that
+            cache.record_hit(0.0, faq_id in cache.audio)
+            cache.audio.setdefault(faq_id, (b"", 16000, 1))
+    lookup_us = (time.perf_counter() - start) / len(turns) * 1e6
+    for _ in range(len(turns)):
+        cache.record_llm_ttft(args.llm_ms / 1000)
+        cache.record_tts_ttfb(args.tts_ms / 1000)
+    stats = cache.stats()
+    print(f"{len(turns)} turns: hit rate {stats['hit_rate']:.0%} ({stats['exact_hits']} exact, {stats['ranked_hits']} ranked), "
+          f"{lookup_us:.1f}us per lookup")
+    print(f"latency saved: {stats['latency_saved_ms'] / 1000:.0f}s total, "
+          f"{stats['latency_saved_ms'] / max(stats['hits'], 1):.0f}ms per hit")
+    cache = AnswerCache(faqs)
+    for text, expected in LABELLED:
+        faq_id = cache.match(text)
+        answered = faqs[faq_id]["question"] if faq_id is not None else "LLM"
+        mark = "" if answered == (expected or "LLM") else "  <-- expected " + (expected or "LLM")
+        print(f"  {text!r:50} -> {answered}{mark}")
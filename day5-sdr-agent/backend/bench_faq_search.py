@@ -0,0 +1,83 @@
+# FAQ retrieval benchmark: the old keyword scan vs the BM25 inverted index, on the real FAQ
+# and on a synthetic knowledge base grown to --size entries.
+#   python bench_faq_search.py [--size 50000]
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from faq_search import FAQIndex
+
+QUERIES = [
+    "what are the fees for the payment gateway",
+    "is the QR code free",
+    "how fast are settlements",
+    "does the smart speaker need a battery",
+    "can I get a business loan",
+    "is it safe and secure",
+]
+
+
+def keyword_scan(faqs, query, k=3):
+    # The previous search_faq: substring test for every query word against every FAQ
+    hits = []
+    for faq in faqs:
+        if any(word in faq["question"].lower() or word in faq["answer"].lower() for word in query.lower().split()):
+            hits.append(faq)
+    return hits[:k]
+
+
+def synthetic_faqs(base, size, seed=7, vocab_size=30000):
+    # Word frequencies follow Zipf's law like real text: the FAQ's own words plus generated
+    # ones, drawn with weight 1/rank, so common words are everywhere and most are rare
+    rng = random.Random(seed)
+    vocab = sorted({w for faq in base for w in (faq["question"] + " " + faq["answer"]).split()})
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    while len(vocab) < vocab_size:
+        vocab.append("".join(rng.choices(letters, k=rng.randint(4, 10))))
+    rng.shuffle(vocab)
+    weights = [1 / rank for rank in range(1, len(vocab) + 1)]
+    faqs = list(base)
+    while len(faqs) < size:
+        faqs.append({
+            "question": " ".join(rng.choices(vocab, weights, k=8)) + "?",
+            "answer": " ".join(rng.choices(vocab, weights, k=40)) + ".",
+        })
+    return faqs
+
+
+def per_query_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1e6
+
+
+def run(faqs, label, repeat):
+    start = time.perf_counter()
+    index = FAQIndex(faqs)
+    build_ms = (time.perf_counter() - start) * 1000
+    scan = per_query_us(lambda q: keyword_scan(faqs, q), max(1, repeat // 100))
+    bm25 = per_query_us(lambda q: index.search(q, k=3), repeat)
+    print(f"{label:>14} entries: keyword scan {scan:>10.1f}us/query | BM25 {bm25:>8.1f}us/query "
+          f"(index built in {build_ms:.0f}ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    with open(Path(__file__).parent / "phonepe_faq.json", encoding="utf-8") as f:
+        base = json.load(f)["faqs"]
+    run(base, f"{len(base)}", args.repeat * 10)
+    run(synthetic_faqs(base, args.size), f"{args.size}", args.repeat)
+    index = FAQIndex(base)
+    for query in QUERIES[:3]:
+        top = index.search(query, k=1)
+        print(f"  {query!r} -> {top[0][1]['question'] if top else '(no match)'}")
@@ -0,0 +1,86 @@
+# Lead capture cost per conversation: one save_lead_field call per detail vs one save_lead_fields
+# call per message. A scripted LLM stub stands in for Gemini: each LLM round trip sleeps --llm-ms
+# and returns either the next tool call or the spoken reply; the tools run the real save path.
+#   python bench_lead_tools.py [--llm-ms 700] [--sessions 20]
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from leads import LeadStore, LeadWriter, new_lead, save_fields
+
+# (user message, lead details the LLM would extract from it)
+CONVERSATION = [
+    ("Hi, I'm looking for a payment solution", {}),
+    ("I have an online clothing store", {"use_case": "e-commerce - online clothing store"}),
+    ("I'm Rahul, CTO at Acme, team of 40", {"name": "Rahul", "role": "CTO", "company": "Acme", "team_size": "40"}),
+    ("What are the fees?", {}),
+    ("We want to go live next month, reach me at rahul@acme.in or 98765 43210",
+     {"timeline": "next month", "email": "rahul@acme.in", "phone": "98765 43210"}),
+    ("That's all, thanks", {}),
+]
+
+
+class ScriptedLLM:
+    """Replays the tool calls a model makes for each message, with a fixed round-trip time."""
+
+    def __init__(self, mode, latency):
+        self.mode = mode
+        self.latency = latency
+        self.calls = 0
+
+    def plan(self, fields):
+        # single: one field per tool call (one LLM round trip each); multi: all fields in one call
+        if not fields:
+            return []
+        if self.mode == "single":
+            return [("save_lead_field", {"field_name": k, "value": v}) for k, v in fields.items()]
+        return [("save_lead_fields", fields)]
+
+    async def respond(self, pending):
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        return pending.pop(0) if pending else None
+
+
+async def run_session(mode, latency, writer):
+    llm = ScriptedLLM(mode, latency)
+    lead = new_lead()
+    tool_turns, extra = 0, 0.0
+    for _, fields in CONVERSATION:
+        pending = llm.plan(fields)
+        start = time.perf_counter()
+        while True:
+            call = await llm.respond(pending)
+            if call is None:
+                break  # the spoken reply
+            tool_turns += 1
+            name, args = call
+            save_fields(lead, {args["field_name"]: args["value"]} if name == "save_lead_field" else args, writer)
+        # Everything beyond the one round trip that produces the reply is added latency
+        extra += time.perf_counter() - start - latency
+    await writer.flush()
+    return tool_turns, llm.calls, extra
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LeadStore(Path(tmp) / "leads.jsonl", None)
+        writer = LeadWriter(store, flush_interval=0.05)
+        for mode in ("single", "multi"):
+            results = await asyncio.gather(*(run_session(mode, args.llm_ms / 1000, writer) for _ in range(args.sessions)))
+            turns, calls, extra = zip(*results)
+            print(f"{mode:>6}: {statistics.mean(turns):.0f} tool turns, {statistics.mean(calls):.0f} LLM calls, "
+                  f"+{statistics.mean(extra) * 1000:.0f}ms added latency per conversation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=700)
+    parser.add_argument("--sessions", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
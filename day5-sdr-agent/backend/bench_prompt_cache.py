@@ -0,0 +1,101 @@
+# Static prompt-prefix caching for the SDR instructions: prompt tokens sent per turn with the
+# prefix re-sent every time vs registered once and referenced by cache name.
+#   python bench_prompt_cache.py                # offline: stub cache, estimated tokens
+#   python bench_prompt_cache.py --live         # Gemini: real cache, reported tokens and TTFT (needs GOOGLE_API_KEY)
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from bench_sdr_prompt import CONVERSATION
+from prompt_cache import (
+    GeminiCacheBackend,
+    PromptCache,
+    StubCacheBackend,
+    estimate_tokens,
+)
+from sdr_prompt import build_instructions
+
+
+def turns():
+    # Conversation so far at each user turn, as Gemini contents
+    history = []
+    for user, reply in CONVERSATION:
+        history.append({"role": "user", "parts": [{"text": user}]})
+        yield list(history)
+        history.append({"role": "model", "parts": [{"text": reply}]})
+
+
+def history_tokens(contents):
+    return estimate_tokens("".join(part["text"] for turn in contents for part in turn["parts"]))
+
+
+async def offline(prefix, model):
+    backend = StubCacheBackend()
+    cache = PromptCache(backend)
+    full, cached = [], []
+    for contents in turns():
+        full.append(estimate_tokens(prefix) + history_tokens(contents))
+        name = await cache.get(model, prefix)
+        cached.append(history_tokens(contents) if name else full[-1])
+    return full, cached, None, None, cache
+
+
+async def live(prefix, model):
+    from google import genai
+    from google.genai import types
+
+    client = genai.Client()
+    cache = PromptCache(GeminiCacheBackend(client))
+
+    async def ttft_and_usage(contents, config):
+        start = time.perf_counter()
+        ttft, usage = None, None
+        async for chunk in await client.aio.models.generate_content_stream(model=model, contents=contents, config=config):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            usage = chunk.usage_metadata or usage
+        return ttft, usage
+
+    full, cached, full_ttft, cached_ttft = [], [], [], []
+    name = None
+    try:
+        for contents in turns():
+            ttft, usage = await ttft_and_usage(contents, types.GenerateContentConfig(system_instruction=prefix))
+            full.append(usage.prompt_token_count)
+            full_ttft.append(ttft)
+            name = await cache.get(model, prefix)
+            if name is None:
+                raise SystemExit("Gemini would not cache this prefix (too small, or model without caching)")
+            ttft, usage = await ttft_and_usage(contents, types.GenerateContentConfig(cached_content=name))
+            # Tokens actually sent: the prompt minus what came from the cache
+            cached.append(usage.prompt_token_count - (usage.cached_content_token_count or 0))
+            cached_ttft.append(ttft)
+    finally:
+        if name:
+            await client.aio.caches.delete(name=name)
+    return full, cached, full_ttft, cached_ttft, cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["full", "retrieval"], default="full")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+    with open(Path(__file__).parent / "phonepe_faq.json", encoding="utf-8") as f:
+        prefix = build_instructions(json.load(f), args.mode)
+    run = live if args.live else offline
+    full, cached, full_ttft, cached_ttft, cache = asyncio.run(run(prefix, args.model))
+    print(f"SDR instructions ({args.mode}): ~{estimate_tokens(prefix)} tokens, {len(full)} turns")
+    print(f"  prefix re-sent: {statistics.mean(full):>6.0f} prompt tokens/turn, {sum(full):>6} per conversation")
+    print(f"  prefix cached:  {statistics.mean(cached):>6.0f} prompt tokens/turn, {sum(cached):>6} per conversation")
+    if full_ttft:
+        print(f"  TTFT median: re-sent {statistics.median(full_ttft) * 1000:.0f}ms, "
+              f"cached {statistics.median(cached_ttft) * 1000:.0f}ms")
+    print(f"  cache: {cache.stats()}")
@@ -0,0 +1,98 @@
+# SDR prompt size (and optionally TTFT) per turn: full FAQ in the instructions vs retrieval.
+#   python bench_sdr_prompt.py                 # offline token estimates
+#   python bench_sdr_prompt.py --faq-size 200  # same, with the FAQ grown to 200 entries
+#   python bench_sdr_prompt.py --live          # also measure Gemini TTFT (needs GOOGLE_API_KEY)
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from faq_search import FAQIndex
+from sdr_prompt import build_instructions, estimate_tokens, retrieved_context
+
+CONVERSATION = [
+    ("Hi, I'm looking for a payment solution", "Hi! I'm Sarah from PhonePe. What kind of business are you running?"),
+    ("I have an online clothing store", "Nice! Which payment gateway do you use today?"),
+    ("What are the fees for the payment gateway?", "PhonePe Payment Gateway has 0% transaction fees."),
+    ("How quickly do I get settlements?", "Payment Gateway settlements are instant."),
+    ("I'm Rahul, CTO at Threadline, team of 40", "Great to meet you, Rahul!"),
+    ("Is it secure?", "Yes, PhonePe is PCI-DSS certified with bank-grade security."),
+    ("Do you offer loans for merchants?", "Yes, PhonePe offers merchant lending."),
+    ("That's all, thanks", "Thanks Rahul, our team will reach out soon!"),
+]
+
+
+def grow_faq(faq_data, size):
+    # Bigger knowledge base for the scaling comparison: numbered variants of the real entries
+    faqs = list(faq_data["faqs"])
+    base = faq_data["faqs"]
+    while len(faqs) < size:
+        faq = base[len(faqs) % len(base)]
+        n = len(faqs) // len(base)
+        faqs.append({"question": f"{faq['question']} (region {n})", "answer": f"{faq['answer']} Region {n} details apply."})
+    return dict(faq_data, faqs=faqs)
+
+
+def turn_prompts(faq_data, mode):
+    """(system instructions, conversation text) for each user turn, as the LLM would receive them."""
+    instructions = build_instructions(faq_data, mode)
+    index = FAQIndex(faq_data["faqs"])
+    history = []
+    for user, reply in CONVERSATION:
+        history.append(f"User: {user}")
+        turn = list(history)
+        if mode == "retrieval":
+            context = retrieved_context(index, user)
+            if context:
+                turn.append(f"Assistant: {context}")
+        yield instructions, "\n".join(turn)
+        history.append(f"Assistant: {reply}")
+
+
+def live_ttft(instructions, contents, model):
+    from google import genai
+    from google.genai import types
+
+    client = genai.Client(api_key=os.environ["GOOGLE_API_KEY"])
+    start = time.perf_counter()
+    stream = client.models.generate_content_stream(
+        model=model, contents=contents, config=types.GenerateContentConfig(system_instruction=instructions)
+    )
+    ttft, prompt_tokens = None, None
+    for chunk in stream:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        if chunk.usage_metadata and chunk.usage_metadata.prompt_token_count:
+            prompt_tokens = chunk.usage_metadata.prompt_token_count
+    return ttft, prompt_tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faq-size", type=int, default=0)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    args = parser.parse_args()
+    with open(Path(__file__).parent / "phonepe_faq.json", encoding="utf-8") as f:
+        faq_data = json.load(f)
+    if args.faq_size:
+        faq_data = grow_faq(faq_data, args.faq_size)
+    print(f"{len(faq_data['faqs'])} FAQ entries, {len(CONVERSATION)} user turns")
+    for mode in ("full", "retrieval"):
+        tokens, ttfts = [], []
+        for instructions, contents in turn_prompts(faq_data, mode):
+            if args.live:
+                ttft, prompt_tokens = live_ttft(instructions, contents, args.model)
+                ttfts.append(ttft)
+                tokens.append(prompt_tokens or estimate_tokens(instructions + contents))
+            else:
+                tokens.append(estimate_tokens(instructions + contents))
+        line = f"{mode:>9}: {statistics.mean(tokens):>6.0f} prompt tokens/turn, {sum(tokens):>7} per conversation"
+        if ttfts:
+            line += f", TTFT median {statistics.median(ttfts) * 1000:.0f}ms"
+        print(line)
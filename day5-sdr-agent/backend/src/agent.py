@@ -1,8 +1,10 @@
+import asyncio
 import json
 import logging
 import os
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 from dotenv import load_dotenv
 from livekit import rtc
@@ -14,13 +16,24 @@ from livekit.agents import (
     Agent,
     AgentSession,
     JobContext,
+    MetricsCollectedEvent,
+    StopResponse,
     WorkerOptions,
     cli,
     llm,
     function_tool,
+    metrics,
 )
 from livekit.plugins import deepgram, google, murf, silero
 
+from answer_cache import ANSWER_CACHE_ENABLED, AnswerCache
+from faq_search import FAQIndex
+from leads import has_details, lead_writer, new_lead, save_fields
+from product_index import ProductIndex
+from prompt_cache import cached_llm_node, prompt_cache_stats
+from rate_limit import is_rate_limited, limiter, rate_limit_stats, retry_after_of
+from sdr_prompt import SDR_PROMPT_MODE, build_instructions, estimate_tokens, retrieved_context
+
 logger = logging.getLogger("phonepe-sdr-agent")
 logger.setLevel(logging.INFO)
 
@@ -34,157 +47,133 @@ def load_phonepe_faq() -> dict[str, Any]:
 
 # Global FAQ data
 FAQ_DATA = load_phonepe_faq()
-
-# Lead storage
-LEAD_DATA = {
-    "name": None,
-    "company": None,
-    "email": None,
-    "role": None,
-    "use_case": None,
-    "team_size": None,
-    "timeline": None,
-}
-
+FAQ_INDEX = FAQIndex(FAQ_DATA["faqs"])
+PRODUCT_INDEX = ProductIndex(FAQ_DATA["products"])
+LLM_MODEL = "gemini-2.5-flash"
+SDR_VOICE = "en-US-natalie"  # Professional female voice for SDR
+# Shared by every session in the worker; answer audio is kept on disk for the other workers
+ANSWER_CACHE = AnswerCache(FAQ_DATA["faqs"], voice=SDR_VOICE)
 
 class PhonePeSDRAgent(Agent):
     """PhonePe Sales Development Representative Agent."""
 
     def __init__(self):
-        # Prepare FAQ context
-        faq_context = self._prepare_faq_context()
-        
-        instructions = f"""You are a friendly and professional Sales Development Representative (SDR) for PhonePe, India's leading digital payments platform.
-
-**YOUR ROLE:**
-- Greet visitors warmly and professionally
-- Understand their business needs and challenges
-- Answer questions about PhonePe products and services using the FAQ
-- Naturally collect lead information during conversation
-- Be helpful, conversational, and genuine
-
-**PHONEPE OVERVIEW:**
-{FAQ_DATA['company_info']['description']}
-Key Stats: {FAQ_DATA['company_info']['name']} has 61+ crore registered users, accepted at 4.4+ crore merchants across 98% of India's postal codes.
-
-**AVAILABLE PRODUCTS & PRICING:**
-
-1. **Payment Gateway** - ZERO cost (0% fees)
-   - For online businesses (e-commerce, apps, websites)
-   - Supports UPI, cards, wallets, net banking
-   - Instant settlements
-   
-2. **Offline Payments (QR + SmartSpeaker)** - FREE QR codes
-   - For retail stores, restaurants, kirana shops
-   - Voice alerts with SmartSpeaker (4 days battery)
-   - Real-time payment notifications
-
-3. **Business Lending** - Quick loans for growth
-   - Competitive interest rates
-   - Fast approval, minimal documentation
-
-4. **PhonePe Ads** - Reach 61+ crore users
-   - Contact sales for pricing
-
-**FAQ KNOWLEDGE BASE:**
-{faq_context}
-
-**CONVERSATION GUIDELINES:**
-
-1. **Opening (First 30 seconds):**
-   - Warm greeting: "Hi! I'm Sarah from PhonePe. Great to connect with you!"
-   - Ask: "What brought you here today?" or "Tell me a bit about what you're working on?"
-
-2. **Discovery (Understand their needs):**
-   - Listen actively to their business/use case
-   - Ask clarifying questions about their challenges
-   - Naturally collect information:
-     * Their name (if not mentioned, ask: "I didn't catch your name?")
-     * Company name (ask: "Which company are you with?")
-     * Role (ask: "What's your role there?")
-     * Use case (infer from conversation or ask: "What are you looking to solve?")
-     * Team size (ask: "How big is your team?")
-     * Timeline (ask: "When are you looking to get started?")
-
-3. **Answering Questions:**
-   - Use ONLY information from the FAQ above
-   - If unsure, say: "Let me check with our team and get back to you"
-   - Highlight the FREE 0% fees for Payment Gateway
-   - Emphasize our massive reach (61+ crore users)
-
-4. **Qualification:**
-   - Determine if they're a good fit based on:
-     * Online business → Payment Gateway
-     * Offline store → QR + SmartSpeaker
-     * Need funding → Business Lending
-     * Want to advertise → PhonePe Ads
-
-5. **Closing the Conversation:**
-   - When user says: "That's all", "I'm done", "Thanks", "Goodbye" etc.
-   - Summarize what you learned: "Great chatting with you [Name]! So you're [Role] at [Company], looking to [Use Case] for a team of [Team Size], planning to start [Timeline]."
-   - Offer next steps: "I'll have our team reach out to you at [Email] with the next steps!"
-
-**LEAD COLLECTION STRATEGY:**
-- Collect information NATURALLY during conversation - don't make it feel like a form
-- If they mention something, store it immediately using the save_lead_field tool
-- Don't ask all questions at once - spread them throughout the conversation
-- Some fields can be inferred (e.g., if they say "I run a small shop" → use_case = "offline payments")
-
-**IMPORTANT RULES:**
-- Always be warm, friendly, and professional
-- Never make up features or pricing not in the FAQ
-- If asked about competitors, focus on PhonePe's strengths (0% fees, massive reach, security)
-- Use simple language - avoid jargon
-- Keep responses concise (2-3 sentences max)
-- Show genuine interest in helping them succeed
-
-**EXAMPLE CONVERSATION FLOW:**
-User: "Hi, I'm looking for a payment solution"
-You: "Hi! I'm Sarah from PhonePe. Great to connect! I'd love to help you find the right solution. What kind of business are you running?"
-
-User: "I have an online clothing store"
-You: [Save use_case: "e-commerce - online clothing store"] "That's awesome! How's business going? By the way, I didn't catch your name?"
-
-User: "I'm Rahul"
-You: [Save name: "Rahul"] "Nice to meet you, Rahul! So for your online store, are you currently using any payment gateway?"
-
-User: "Yes, but the fees are killing me - 2% per transaction!"
-You: "Oh I totally understand! That adds up fast. Good news - PhonePe Payment Gateway is completely FREE with 0% transaction fees. You'd save a ton on every order."
-
-Remember: You're here to help them succeed. Be genuinely interested, listen well, and offer solutions that fit their needs!
-"""
+        instructions = build_instructions(FAQ_DATA, SDR_PROMPT_MODE)
+        logger.info(f"SDR prompt mode={SDR_PROMPT_MODE}, instructions ~{estimate_tokens(instructions)} tokens")
 
         super().__init__(
             instructions=instructions,
-            tts=murf.TTS(voice="en-US-natalie"),  # Professional female voice for SDR
+            tts=murf.TTS(voice=SDR_VOICE),
         )
-
-    def _prepare_faq_context(self) -> str:
-        """Format FAQ data into a readable context string."""
-        context_parts = []
-        
-        # Add FAQs
-        context_parts.append("**FREQUENTLY ASKED QUESTIONS:**")
-        for i, faq in enumerate(FAQ_DATA['faqs'], 1):
-            context_parts.append(f"\nQ{i}: {faq['question']}")
-            context_parts.append(f"A{i}: {faq['answer']}")
-        
-        return "\n".join(context_parts)
+        # Lead fields for this conversation only; one agent instance per session
+        self.lead = new_lead()
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        # Sessions in this worker share the Gemini and Murf keys; wait for quota instead of hitting 429s
+        await limiter.acquire("gemini", LLM_MODEL)
+        try:
+            # The instructions go out as a cached Gemini prefix instead of in full on every turn
+            async for chunk in cached_llm_node(self, chat_ctx, tools, model_settings):
+                yield chunk
+        except Exception as e:
+            if is_rate_limited(e):
+                limiter.rate_limited("gemini", LLM_MODEL, retry_after_of(e))
+            raise
+
+    async def tts_node(self, text, model_settings):
+        await limiter.acquire("murf")
+        async for frame in Agent.default.tts_node(self, text, model_settings):
+            yield frame
+
+    async def _answer_audio(self, faq_id: int, cached: Optional[tuple[bytes, int, int]]):
+        if cached is not None:
+            pcm, sample_rate, channels = cached
+            # Replayed in 100ms frames
+            step = sample_rate // 10 * channels * 2
+            for i in range(0, len(pcm), step):
+                chunk = pcm[i:i + step]
+                yield rtc.AudioFrame(chunk, sample_rate, channels, len(chunk) // (2 * channels))
+            return
+        # First hit on this answer: speak it live and keep the audio for every later hit
+        await limiter.acquire("murf")
+        parts, fmt = [], None
+        async with self.tts.synthesize(ANSWER_CACHE.answer(faq_id)) as stream:
+            async for audio in stream:
+                fmt = (audio.frame.sample_rate, audio.frame.num_channels)
+                parts.append(bytes(audio.frame.data))
+                yield audio.frame
+        # Only reached when the whole answer was synthesized, not when the user interrupted
+        if parts:
+            await asyncio.to_thread(ANSWER_CACHE.store_audio, faq_id, b"".join(parts), *fmt)
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage):
+        """Answer common FAQ questions from the cache; otherwise, in retrieval mode, add the
+        FAQ entries matching this message to the current turn only."""
+        text = new_message.text_content or ""
+        if ANSWER_CACHE_ENABLED:
+            start = time.perf_counter()
+            faq_id = ANSWER_CACHE.match(text)
+            if faq_id is not None:
+                cached = await asyncio.to_thread(ANSWER_CACHE.cached_audio, faq_id)
+                with_audio = cached is not None
+                self.session.say(ANSWER_CACHE.answer(faq_id), audio=self._answer_audio(faq_id, cached))
+                ANSWER_CACHE.record_hit(time.perf_counter() - start, with_audio)
+                logger.info(f"Answer cache hit: {text!r} -> FAQ {faq_id} (audio cached: {with_audio})")
+                raise StopResponse()
+        if SDR_PROMPT_MODE != "retrieval":
+            return
+        context = retrieved_context(FAQ_INDEX, text)
+        if context:
+            turn_ctx.add_message(role="assistant", content=context)
 
     @function_tool()
     async def save_lead_field(self, field_name: str, value: str):
         """
-        Save a lead field when the user provides information.
+        Save a single lead field. Prefer save_lead_fields when the user gives several details at once.
         
         Args:
-            field_name: One of: name, company, email, role, use_case, team_size, timeline
+            field_name: One of: name, company, email, phone, role, use_case, team_size, timeline
             value: The value to save
         """
-        if field_name in LEAD_DATA:
-            LEAD_DATA[field_name] = value
-            logger.info(f"Saved lead field: {field_name} = {value}")
-            return f"Got it! I've noted that down."
-        return "Invalid field name"
+        return save_fields(self.lead, {field_name: value})
+
+    @function_tool()
+    async def save_lead_fields(
+        self,
+        name: Optional[str] = None,
+        company: Optional[str] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        role: Optional[str] = None,
+        use_case: Optional[str] = None,
+        team_size: Optional[str] = None,
+        timeline: Optional[str] = None,
+    ):
+        """
+        Save every lead detail the user just mentioned in one call, e.g. "I'm Rahul, CTO at Acme,
+        team of 40" -> name="Rahul", role="CTO", company="Acme", team_size="40". Leave out fields
+        they didn't mention.
+        
+        Args:
+            name: The user's name
+            company: Company or business name
+            email: Email address
+            phone: Phone number
+            role: Their role or job title
+            use_case: What they want to use PhonePe for
+            team_size: How many people are on their team
+            timeline: When they want to get started
+        """
+        return save_fields(self.lead, {
+            "name": name,
+            "company": company,
+            "email": email,
+            "phone": phone,
+            "role": role,
+            "use_case": use_case,
+            "team_size": team_size,
+            "timeline": timeline,
+        })
 
     @function_tool()
     async def search_faq(self, query: str):
@@ -194,17 +183,14 @@ Remember: You're here to help them succeed. Be genuinely interested, listen well
         Args:
             query: The user's question or keywords to search for
         """
-        query_lower = query.lower()
-        relevant_faqs = []
-        
-        # Simple keyword matching
-        for faq in FAQ_DATA['faqs']:
-            if any(keyword in faq['question'].lower() or keyword in faq['answer'].lower() 
-                   for keyword in query_lower.split()):
-                relevant_faqs.append(f"Q: {faq['question']}\nA: {faq['answer']}")
-        
+        # Ranked BM25 matches from the prebuilt index
+        relevant_faqs = [
+            f"Q: {faq['question']}\nA: {faq['answer']}"
+            for _, faq in FAQ_INDEX.search(query, k=3)
+        ]
+
         if relevant_faqs:
-            return "\n\n".join(relevant_faqs[:3])  # Return top 3 matches
+            return "\n\n".join(relevant_faqs)
         return "I don't have specific information on that. Let me connect you with our team for details."
 
     @function_tool()
@@ -213,18 +199,27 @@ Remember: You're here to help them succeed. Be genuinely interested, listen well
         Get detailed information about a PhonePe product.
         
         Args:
-            product_name: Name of the product (e.g., "Payment Gateway", "QR", "SmartSpeaker")
+            product_name: Name of the product as the user said it (e.g., "Payment Gateway", "PG", "QR", "smart speaker", "loans")
         """
-        for product in FAQ_DATA['products']:
-            if product_name.lower() in product['name'].lower():
-                return f"{product['name']}: {product['description']}\nPricing: {product['pricing']}\nIdeal for: {product['ideal_for']}"
-        return "Product not found. Available products: Payment Gateway, QR Codes, SmartSpeaker, Business Lending, PhonePe Ads"
+        matches = PRODUCT_INDEX.candidates(product_name)
+        if len(matches) == 1:
+            product = matches[0]
+            return f"{product['name']}: {product['description']}\nPricing: {product['pricing']}\nIdeal for: {product['ideal_for']}"
+        if matches:
+            # A generic word like "payments": ask rather than describe the wrong product
+            return f"'{product_name}' could mean: {', '.join(p['name'] for p in matches)}. Ask which one they mean."
+        return f"Product not found. Available products: {', '.join(PRODUCT_INDEX.names())}"
 
 
 async def entrypoint(ctx: JobContext):
     """Agent entrypoint - called when user joins the room."""
     
     logger.info(f"Starting PhonePe SDR Agent for room: {ctx.room.name}")
+
+    async def log_rate_limits():
+        logger.info(f"Provider rate limits: {rate_limit_stats()}")
+
+    ctx.add_shutdown_callback(log_rate_limits)
     
     # Connect to the room
     await ctx.connect()
@@ -232,42 +227,56 @@ async def entrypoint(ctx: JobContext):
     # Create agent session with plugins
     session = AgentSession(
         stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
+        llm=google.LLM(model=LLM_MODEL),
         tts=murf.TTS(),  # Default voice, overridden by agent
         vad=silero.VAD.load(),
     )
     
-    # Start the session with PhonePe SDR agent
-    await session.start(PhonePeSDRAgent(), room=ctx.room)
-    
-    # Save lead data to JSON file after session ends
-    save_lead_data()
+    # Prompt size, cached share and time-to-first-token per LLM call, to compare
+    # SDR_PROMPT_MODE=full vs retrieval and PROMPT_CACHE=1 vs 0
+    llm_calls = []
+
+    @session.on("metrics_collected")
+    def _on_metrics_collected(ev: MetricsCollectedEvent):
+        metrics.log_metrics(ev.metrics)
+        if isinstance(ev.metrics, metrics.LLMMetrics):
+            llm_calls.append((ev.metrics.prompt_tokens, ev.metrics.prompt_cached_tokens, ev.metrics.ttft))
+            ANSWER_CACHE.record_llm_ttft(ev.metrics.ttft)
+        elif isinstance(ev.metrics, metrics.TTSMetrics):
+            ANSWER_CACHE.record_tts_ttfb(ev.metrics.ttfb)
+
+    async def log_prompt_stats():
+        if llm_calls:
+            avg_tokens = sum(tokens for tokens, _, _ in llm_calls) / len(llm_calls)
+            avg_cached = sum(cached for _, cached, _ in llm_calls) / len(llm_calls)
+            avg_ttft = sum(ttft for _, _, ttft in llm_calls) / len(llm_calls)
+            logger.info(
+                f"SDR prompt mode={SDR_PROMPT_MODE}: {len(llm_calls)} LLM calls, "
+                f"avg {avg_tokens:.0f} prompt tokens ({avg_cached:.0f} cached), avg TTFT {avg_ttft * 1000:.0f}ms"
+            )
+        logger.info(f"Prompt cache: {prompt_cache_stats()}")
+
+    ctx.add_shutdown_callback(log_prompt_stats)
+
+    async def log_answer_cache():
+        if ANSWER_CACHE_ENABLED:
+            logger.info(f"Answer cache: {ANSWER_CACHE.stats()}")
+
+    ctx.add_shutdown_callback(log_answer_cache)
+
+    agent = PhonePeSDRAgent()
+
+    # Save lead data after the session ends (session.start returns as soon as the agent is running)
+    async def save_lead():
+        lead_writer.submit(agent.lead)
+        await lead_writer.flush()
+        if has_details(agent.lead):
+            logger.info(f"Lead data saved: {agent.lead}")
+
+    ctx.add_shutdown_callback(save_lead)
 
-
-def save_lead_data():
-    """Save collected lead data to JSON file."""
-    if any(LEAD_DATA.values()):  # Only save if we collected something
-        leads_file = Path(__file__).parent.parent / "leads.json"
-        
-        # Load existing leads
-        existing_leads = []
-        if leads_file.exists():
-            with open(leads_file, "r", encoding="utf-8") as f:
-                existing_leads = json.load(f)
-        
-        # Add new lead with timestamp
-        from datetime import datetime
-        lead_entry = {
-            "timestamp": datetime.now().isoformat(),
-            **LEAD_DATA
-        }
-        existing_leads.append(lead_entry)
-        
-        # Save back to file
-        with open(leads_file, "w", encoding="utf-8") as f:
-            json.dump(existing_leads, f, indent=2)
-        
-        logger.info(f"Lead data saved: {LEAD_DATA}")
+    # Start the session with PhonePe SDR agent
+    await session.start(agent, room=ctx.room)
 
 
 if __name__ == "__main__":
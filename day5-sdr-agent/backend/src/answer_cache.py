@@ -0,0 +1,240 @@
+"""Pre-approved answers for the questions SDR visitors ask over and over.
+
+A question is keyed by its intent: the FAQ tokenizer's stemmed, stopword-free terms,
+deduplicated and sorted, then hashed, so "What are the fees?" and "fees, what are they"
+share a key. Keys come from the FAQ questions, the curated paraphrases below (visitors
+rarely use the FAQ's own wording), and every confident BM25 match seen since start-up,
+so a new paraphrase only has to be ranked once. Ranking scores a message against the
+ways each question is asked rather than the answer prose. A confident hit is spoken
+straight from the FAQ answer and never reaches the LLM.
+
+An answer's audio is synthesized the first time it is hit, then kept in memory and on
+disk keyed by a hash of the voice and answer text, so later hits in this and every
+other worker process replay it instead of paying for TTS again.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from faq_search import FAQIndex, tokenize
+
+logger = logging.getLogger("phonepe-sdr-agent")
+
+ANSWER_CACHE_ENABLED = os.getenv("SDR_ANSWER_CACHE", "1") == "1"
+
+# FAQ question -> other ways visitors ask it. Only add phrasings the FAQ answer fully answers.
+FAQ_PARAPHRASES = {
+    "What does PhonePe do?": [
+        "What is PhonePe?", "Tell me about PhonePe", "What services does PhonePe offer?", "What does your company do?",
+    ],
+    "Is PhonePe free to use?": [
+        "Is it free?", "Do I have to pay to use PhonePe?", "Is the QR code free?", "Are there any charges?",
+        "Does PhonePe cost anything?",
+    ],
+    "What is the Payment Gateway pricing?": [
+        "What are the fees?", "How much does the payment gateway cost?", "What are your transaction fees?",
+        "What is the pricing?", "What do you charge per transaction?", "Is there a setup fee?", "What is the MDR?",
+    ],
+    "Who can use PhonePe for business?": [
+        "Can my business use PhonePe?", "Is PhonePe only for big companies?", "Who is PhonePe for business meant for?",
+    ],
+    "What is PhonePe SmartSpeaker?": [
+        "What is the smart speaker?", "What is the soundbox?", "Tell me about the SmartSpeaker",
+        "What does the speaker device do?",
+    ],
+    "How quickly do I get settlements?": [
+        "When will I get my money?", "How fast are settlements?", "What is the settlement time?",
+        "How long until payments reach my bank account?",
+    ],
+    "What payment methods does PhonePe support?": [
+        "Do you accept credit cards?", "Which payment options do you support?", "Can customers pay with cards?",
+        "Do you support net banking?",
+    ],
+    "Is PhonePe safe and secure?": [
+        "Is it safe?", "Is PhonePe secure?", "Is my money safe?", "Are you PCI DSS compliant?", "How do you prevent fraud?",
+    ],
+    "Can I use PhonePe internationally?": [
+        "Does PhonePe work abroad?", "Can I pay outside India?", "Which countries does PhonePe work in?",
+    ],
+    "What is PhonePe's market reach?": [
+        "How many users does PhonePe have?", "How many merchants accept PhonePe?", "How big is PhonePe?",
+    ],
+    "How do I get started with PhonePe for my business?": [
+        "How do I sign up?", "How do I onboard my business?", "How can I start accepting payments?",
+        "How do I get a QR code?", "How long does integration take?",
+    ],
+    "Does PhonePe offer loans?": [
+        "Can I get a loan?", "Do you offer business loans?", "Do you provide working capital?", "Does PhonePe do lending?",
+    ],
+    "What team size is ideal for PhonePe business solutions?": [
+        "Is PhonePe good for small businesses?", "Does it work for a small team?", "Is PhonePe suitable for large enterprises?",
+    ],
+    "Can I invest through PhonePe?": [
+        "Can I buy mutual funds on PhonePe?", "Can I buy gold?", "Does PhonePe have investment options?",
+    ],
+    "What is UPI Lite?": ["Tell me about UPI Lite", "How does UPI Lite work?", "Can I pay without a PIN?"],
+    "How do I contact PhonePe support?": [
+        "How do I reach customer care?", "What is your support number?", "Who do I talk to if something goes wrong?",
+        "How do I get help?",
+    ],
+    "What industries does PhonePe serve?": [
+        "Which industries do you work with?", "Do you work with restaurants?", "What kind of businesses use PhonePe?",
+    ],
+}
+# A ranked match must score at least this, and beat the runner-up by this factor
+CONFIDENT_SCORE = float(os.getenv("SDR_ANSWER_CACHE_MIN_SCORE", 3.0))
+CONFIDENT_MARGIN = float(os.getenv("SDR_ANSWER_CACHE_MARGIN", 1.25))
+# Share of the message's terms the matched question has to cover; anything else in the
+# message (a name, a company) may need the LLM, so it isn't answered from the cache
+MIN_COVERAGE = float(os.getenv("SDR_ANSWER_CACHE_MIN_COVERAGE", 0.5))
+# Messages with fewer content terms than this ("is it free?" -> {free}) are too vague to
+# answer without the conversation, so they always go to the LLM
+MIN_MATCH_TERMS = int(os.getenv("SDR_ANSWER_CACHE_MIN_TERMS", 2))
+MAX_LEARNED_INTENTS = 10000
+ANSWER_AUDIO_DIR = Path(os.getenv("SDR_ANSWER_AUDIO_DIR", Path(__file__).parent.parent / "answer_audio"))
+
+
+def intent_key(text: str) -> Optional[str]:
+    terms = sorted(set(tokenize(text)))
+    if not terms:
+        return None
+    return hashlib.sha1(" ".join(terms).encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerCache:
+    def __init__(self, faqs: list[dict[str, Any]], paraphrases: Optional[dict[str, list[str]]] = None,
+                 voice: str = "", audio_dir: Optional[Path] = ANSWER_AUDIO_DIR):
+        self.faqs = faqs
+        paraphrases = FAQ_PARAPHRASES if paraphrases is None else paraphrases
+        phrasings = [[faq["question"], *paraphrases.get(faq["question"], [])] for faq in faqs]
+        self.intents: dict[str, int] = {}
+        for i, texts in enumerate(phrasings):
+            for text in texts:
+                # Phrasings too short to key on still add their terms to the ranking below
+                if len(set(tokenize(text))) >= MIN_MATCH_TERMS:
+                    self.intents.setdefault(intent_key(text), i)
+        self.curated_intents = len(self.intents)
+        # One document per FAQ holding every phrasing of its question, no answer prose
+        self.index = FAQIndex([{"question": " ".join(texts), "answer": ""} for texts in phrasings])
+        self.faq_ids = {id(doc): i for i, doc in enumerate(self.index.faqs)}
+        self.question_terms = [set(tokenize(" ".join(texts))) for texts in phrasings]
+        self.voice = voice
+        self.audio_dir = audio_dir
+        # FAQ id -> (16-bit PCM, sample rate, channels) of its spoken answer
+        self.audio: dict[int, tuple[bytes, int, int]] = {}
+        self.lookups = 0
+        self.exact_hits = 0
+        self.ranked_hits = 0
+        self.audio_hits = 0
+        self.hit_seconds = 0.0
+        # Time to first audio on the LLM path, to estimate what a hit saves
+        self.llm_ttft_total = 0.0
+        self.llm_ttft_count = 0
+        self.tts_ttfb_total = 0.0
+        self.tts_ttfb_count = 0
+
+    def match(self, text: str) -> Optional[int]:
+        """The FAQ id to answer this message with, or None when the LLM should handle it."""
+        self.lookups += 1
+        terms = set(tokenize(text))
+        if len(terms) < MIN_MATCH_TERMS:
+            return None
+        key = intent_key(text)
+        if key in self.intents:
+            self.exact_hits += 1
+            return self.intents[key]
+        results = self.index.search(text, k=2)
+        if not results:
+            return None
+        score, faq = results[0]
+        runner_up = results[1][0] if len(results) > 1 else 0.0
+        faq_id = self.faq_ids[id(faq)]
+        overlap = len(terms & self.question_terms[faq_id])
+        if (score < CONFIDENT_SCORE or score < runner_up * CONFIDENT_MARGIN
+                or overlap < MIN_MATCH_TERMS or overlap / len(terms) < MIN_COVERAGE):
+            return None
+        if len(self.intents) < self.curated_intents + MAX_LEARNED_INTENTS:
+            self.intents[key] = faq_id
+        self.ranked_hits += 1
+        return faq_id
+
+    def answer(self, faq_id: int) -> str:
+        return self.faqs[faq_id]["answer"]
+
+    def _audio_path(self, faq_id: int) -> Optional[Path]:
+        if self.audio_dir is None:
+            return None
+        digest = hashlib.sha256(f"{self.voice}\0{self.answer(faq_id)}".encode()).hexdigest()[:24]
+        return self.audio_dir / f"{digest}.pcm"
+
+    def cached_audio(self, faq_id: int) -> Optional[tuple[bytes, int, int]]:
+        """The answer's audio if it was synthesized before, here or by another worker process."""
+        audio = self.audio.get(faq_id)
+        path = self._audio_path(faq_id)
+        if audio is None and path is not None:
+            try:
+                data = path.read_bytes()
+            except OSError:
+                return None
+            # 8-byte header: sample rate and channel count
+            if len(data) > 8:
+                audio = self.audio[faq_id] = (data[8:], int.from_bytes(data[:4], "little"), int.from_bytes(data[4:8], "little"))
+        return audio
+
+    def store_audio(self, faq_id: int, pcm: bytes, sample_rate: int, channels: int):
+        """Keep a complete synthesis of the answer for every later hit."""
+        self.audio[faq_id] = (pcm, sample_rate, channels)
+        path = self._audio_path(faq_id)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Temp file and rename, so another process never reads half a clip
+            fd, tmp = tempfile.mkstemp(dir=path.parent)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(sample_rate.to_bytes(4, "little") + channels.to_bytes(4, "little") + pcm)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            logger.warning(f"Answer cache: could not store audio for FAQ {faq_id}: {e}")
+
+    def record_hit(self, seconds: float, with_audio: bool):
+        self.hit_seconds += seconds
+        if with_audio:
+            self.audio_hits += 1
+
+    def record_llm_ttft(self, seconds: float):
+        if seconds < 0:  # reported as -1 when the model produced no tokens
+            return
+        self.llm_ttft_total += seconds
+        self.llm_ttft_count += 1
+
+    def record_tts_ttfb(self, seconds: float):
+        if seconds < 0:
+            return
+        self.tts_ttfb_total += seconds
+        self.tts_ttfb_count += 1
+
+    def stats(self) -> dict[str, Any]:
+        hits = self.exact_hits + self.ranked_hits
+        avg_ttft = self.llm_ttft_total / self.llm_ttft_count if self.llm_ttft_count else 0.0
+        avg_ttfb = self.tts_ttfb_total / self.tts_ttfb_count if self.tts_ttfb_count else 0.0
+        # Each hit skips an LLM round trip; hits with cached audio skip the TTS wait too
+        saved = hits * avg_ttft + self.audio_hits * avg_ttfb - self.hit_seconds
+        return {
+            "lookups": self.lookups,
+            "hits": hits,
+            "exact_hits": self.exact_hits,
+            "ranked_hits": self.ranked_hits,
+            "audio_hits": self.audio_hits,
+            "hit_rate": round(hits / self.lookups, 3) if self.lookups else 0.0,
+            "cached_audio": len(self.audio),
+            "latency_saved_ms": round(max(saved, 0.0) * 1000),
+        }
@@ -0,0 +1,116 @@
+"""BM25 retrieval over the PhonePe FAQ.
+
+The index is built once at load time: each FAQ is tokenized (lowercase, stopwords
+removed, light suffix stemming) into an inverted index of term -> postings. Question and
+answer are scored as separate BM25 fields, so a term in a short question isn't drowned
+out by the same term in a long answer that happens to mention every query word. A query
+only walks the head of its own terms' postings, so top-k stays in the microsecond
+range even for knowledge bases with tens of thousands of entries.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any
+
+# BM25 parameters (the usual defaults)
+K1 = 1.5
+B = 0.75
+# Question words are a better signal than answer prose: the question field's score is boosted this much
+QUESTION_WEIGHT = 2
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "about", "an", "and", "any", "are", "as", "at", "be", "been", "but", "by", "can",
+    "could", "do", "does", "for", "from", "get", "got", "had", "has", "have", "how", "i",
+    "if", "in", "is", "it", "its", "just", "me", "my", "no", "not", "of", "on", "or",
+    "our", "so", "than", "that", "the", "their", "them", "then", "there", "these", "they",
+    "this", "to", "up", "us", "was", "we", "what", "when", "where", "which", "who", "why",
+    "will", "with", "would", "you", "your",
+})
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping so "payments"/"payment" and "settles"/"settlement" meet."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    # Plural first, then one derivational suffix, so both forms land on the same stem
+    if word.endswith("ies") and len(word) > 5:
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    for suffix in ("ing", "ment", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def field_impacts(texts: list[str]) -> list[dict[str, float]]:
+    """Per-document BM25 contribution of each term, with idf and length norms from this field alone."""
+    docs = [Counter(tokenize(text)) for text in texts]
+    n = len(docs)
+    avg_len = sum(sum(d.values()) for d in docs) / n if n else 0.0
+    df = Counter(term for d in docs for term in d)
+    idf = {term: math.log(1 + (n - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+    impacts = []
+    for terms in docs:
+        norm = K1 * (1 - B + B * sum(terms.values()) / avg_len) if avg_len else K1
+        impacts.append({term: idf[term] * tf * (K1 + 1) / (tf + norm) for term, tf in terms.items()})
+    return impacts
+
+
+class FAQIndex:
+    """Inverted index with BM25 scoring over question/answer pairs.
+
+    Each posting stores the term's precomputed BM25 contribution ("impact") and lists are
+    sorted by impact, so search() can stop as soon as no unseen document could still make
+    the top k (Fagin's threshold algorithm) instead of scoring every matching document.
+    """
+
+    def __init__(self, faqs: list[dict[str, Any]]):
+        self.faqs = faqs
+        # doc -> term -> impact, for scoring a document in full once it is seen
+        self.doc_terms: list[dict[str, float]] = [{} for _ in faqs]
+        for field, weight in (("question", QUESTION_WEIGHT), ("answer", 1)):
+            for doc_terms, impacts in zip(self.doc_terms, field_impacts([faq[field] for faq in faqs])):
+                for term, impact in impacts.items():
+                    doc_terms[term] = doc_terms.get(term, 0.0) + weight * impact
+        postings: dict[str, list[tuple[float, int]]] = defaultdict(list)
+        for doc_id, impacts in enumerate(self.doc_terms):
+            for term, impact in impacts.items():
+                postings[term].append((impact, doc_id))
+        self.postings = {term: sorted(plist, reverse=True) for term, plist in postings.items()}
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, dict[str, Any]]]:
+        """Top-k (score, faq) pairs, best first; empty when no query term is indexed."""
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        lists = [self.postings[term] for term in terms]
+        top: list[tuple[float, int]] = []  # min-heap of (score, -doc_id)
+        seen = set()
+        for depth in range(max((len(plist) for plist in lists), default=0)):
+            # Best score any document not yet seen could still reach
+            threshold = 0.0
+            for plist in lists:
+                if depth >= len(plist):
+                    continue
+                impact, doc_id = plist[depth]
+                threshold += impact
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                impacts = self.doc_terms[doc_id]
+                entry = (sum(impacts.get(term, 0.0) for term in terms), -doc_id)
+                if len(top) < k:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            # Strictly better: an unseen document that ties could still win on the lower doc id
+            if len(top) == k and top[0][0] > threshold:
+                break
+        return [(score, self.faqs[-neg_id]) for score, neg_id in sorted(top, reverse=True)]
@@ -0,0 +1,436 @@
+"""Per-session lead capture with write-behind persistence.
+
+Each SDR session owns its own lead dict (new_lead()), so parallel conversations in one
+worker never see each other's fields. Updates are queued to one LeadWriter per process,
+which coalesces them per session and upserts each batch into the LeadStore off the
+event loop. Leads are deduplicated by email, then phone: a returning visitor updates
+their existing record instead of adding a new one.
+
+The store is an append-only log (leads.jsonl) with an index, so saving doesn't rewrite
+every lead. Export for the CRM sync streams it:
+    python src/leads.py export --format csv -o leads.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are serialized within the process only
+    fcntl = None
+
+logger = logging.getLogger("phonepe-sdr-agent")
+
+LEAD_FIELDS = ("name", "company", "email", "phone", "role", "use_case", "team_size", "timeline")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+LEADS_LOG = Path(os.getenv("SDR_LEADS_LOG", Path(__file__).parent.parent / "leads.jsonl"))
+# Imported into the log the first time it is created
+LEGACY_LEADS_FILE = Path(__file__).parent.parent / "leads.json"
+# Compact once the log holds this many lines and more than COMPACT_RATIO lines per live lead
+COMPACT_MIN_LINES = int(os.getenv("SDR_LEADS_COMPACT_MIN_LINES", 1000))
+COMPACT_RATIO = float(os.getenv("SDR_LEADS_COMPACT_RATIO", 2.0))
+# Wait this long after the first queued update so a burst of tool calls lands in one write
+LEAD_FLUSH_INTERVAL = float(os.getenv("SDR_LEAD_FLUSH_INTERVAL_SECONDS", 0.5))
+LEAD_BATCH_SIZE = int(os.getenv("SDR_LEAD_BATCH_SIZE", 50))
+
+
+def new_lead() -> dict[str, Any]:
+    return {"lead_id": uuid.uuid4().hex, "timestamp": datetime.now().isoformat(), **dict.fromkeys(LEAD_FIELDS)}
+
+
+def has_details(lead: dict[str, Any]) -> bool:
+    return any(lead.get(field) for field in LEAD_FIELDS)
+
+
+def validate_lead_fields(fields: dict[str, Optional[str]]) -> tuple[dict[str, str], list[str]]:
+    """Cleaned values worth saving, plus a short note for each one that was rejected."""
+    clean, errors = {}, []
+    for field, value in fields.items():
+        value = str(value).strip() if value is not None else ""
+        if not value:
+            continue
+        if field not in LEAD_FIELDS:
+            errors.append(f"{field} is not a lead field")
+        elif field == "email" and not EMAIL_RE.match(value):
+            errors.append(f"{value!r} doesn't look like an email address")
+        elif field == "phone" and len(re.sub(r"\D", "", value)) < 7:
+            errors.append(f"{value!r} doesn't look like a phone number")
+        else:
+            clean[field] = value
+    return clean, errors
+
+
+def save_fields(lead: dict[str, Any], fields: dict[str, Optional[str]], writer: Optional["LeadWriter"] = None) -> str:
+    """Validate and apply several fields to a session's lead with one write; returns the tool reply."""
+    clean, errors = validate_lead_fields(fields)
+    if clean:
+        lead.update(clean)
+        logger.info(f"Saved lead fields: {clean}")
+        # Written behind the conversation; the reply doesn't wait for the disk
+        (writer or lead_writer).submit(lead)
+    if errors:
+        saved = f"Saved {', '.join(clean)}. " if clean else ""
+        return f"{saved}Not saved: {'; '.join(errors)}. Ask the user to confirm those."
+    return "Got it! I've noted that down." if clean else "Nothing to save."
+
+
+def dedupe_keys(lead: dict[str, Any]) -> list[str]:
+    """Identity keys for a lead: normalized email and phone (last 10 digits)."""
+    keys = []
+    if lead.get("email"):
+        keys.append("email:" + lead["email"].strip().lower())
+    digits = re.sub(r"\D", "", lead.get("phone") or "")
+    if len(digits) >= 7:
+        keys.append("phone:" + digits[-10:])
+    return keys
+
+
+def merge_into(record: dict[str, Any], lead: dict[str, Any]) -> dict[str, Any]:
+    """Upsert semantics: later values win, but a missing field never erases a saved one."""
+    record.update({k: v for k, v in lead.items() if v is not None and k not in ("lead_id", "timestamp")})
+    record.setdefault("lead_id", lead["lead_id"])
+    record.setdefault("timestamp", lead["timestamp"])
+    # The session that last touched the record, so its later updates find it again
+    record["session_id"] = lead["lead_id"]
+    record["updated_at"] = datetime.now().isoformat()
+    return record
+
+
+class LeadStore:
+    """Append-only JSON-lines lead log with an in-memory index.
+
+    Every upsert appends the merged record as one line; the index maps lead ids, emails
+    and phones to the newest line's offset, and companies to their leads, so a save costs
+    the same at ten leads or a million. Superseded lines are dropped by compact(), which
+    runs once they outnumber the live ones. Other processes appending to the same log are
+    picked up by reading only the bytes added since the last call.
+    """
+
+    def __init__(self, path: Path = LEADS_LOG, legacy_path: Optional[Path] = LEGACY_LEADS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._lock_path = path.with_suffix(path.suffix + ".lock")
+        self._reset()
+        self.compactions = 0
+        # Imported on first use rather than here, so importing the module writes nothing
+        self._legacy_path = legacy_path
+
+    def _reset(self):
+        self._offsets: dict[str, int] = {}  # lead_id -> offset of its newest line
+        self._keys: dict[str, str] = {}  # "id:", "email:", "phone:" keys -> lead_id
+        self._companies: dict[str, set[str]] = {}
+        self._company_of: dict[str, str] = {}
+        self._size = 0
+        self._inode = None
+        self.lines = 0
+        # Complete lines that aren't a lead record (disk corruption, hand edits); skipped, never indexed
+        self.corrupt_lines = 0
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                self._import_legacy()
+                yield
+                return
+            # A separate lock file, since compaction replaces the log itself
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._import_legacy()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _index(self, record: dict[str, Any], offset: int):
+        lead_id = record["lead_id"]
+        if record.get("merged_into"):
+            # Tombstone: this record was folded into another one
+            self._offsets.pop(lead_id, None)
+            self._keys[f"id:{lead_id}"] = record["merged_into"]
+            company = ""
+        else:
+            self._offsets[lead_id] = offset
+            for key in [f"id:{lead_id}", *dedupe_keys(record)] + ([f"id:{record['session_id']}"] if record.get("session_id") else []):
+                self._keys[key] = lead_id
+            company = (record.get("company") or "").strip().lower()
+        previous = self._company_of.get(lead_id)
+        if company != previous:
+            if previous:
+                self._companies[previous].discard(lead_id)
+            if company:
+                self._companies.setdefault(company, set()).add(lead_id)
+                self._company_of[lead_id] = company
+            else:
+                self._company_of.pop(lead_id, None)
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[dict[str, Any]]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) and record.get("lead_id") else None
+
+    def _resolve(self, key: str) -> Optional[str]:
+        lead_id = self._keys.get(key)
+        # Keys of a merged-away record lead on to the record it was merged into
+        while lead_id is not None and lead_id not in self._offsets:
+            lead_id = self._keys.get(f"id:{lead_id}")
+        return lead_id
+
+    def _catch_up(self):
+        """Index whatever was appended since the last call (by us or another process)."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._size:
+                self._reset()
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._size:
+            # Compacted (replaced) since we last looked: start over
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._size)
+            offset = self._size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A line still being written, or torn by a crash: the next upsert truncates it
+                    break
+                record = self._parse(line)
+                if record is None:
+                    self.corrupt_lines += 1
+                    logger.warning(f"Skipping corrupt line at byte {offset} of {self.path.name}")
+                else:
+                    self._index(record, offset)
+                offset += len(line)
+                self.lines += 1
+        self._size = offset
+
+    def _read(self, lead_id: str) -> dict[str, Any]:
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[lead_id])
+            return json.loads(f.readline())
+
+    def get(self, lead_id: str) -> Optional[dict[str, Any]]:
+        with self._locked():
+            self._catch_up()
+            lead_id = self._resolve(f"id:{lead_id}")
+            return self._read(lead_id) if lead_id else None
+
+    def find(self, email: Optional[str] = None, phone: Optional[str] = None) -> Optional[dict[str, Any]]:
+        """The lead with this email or phone, if any."""
+        with self._locked():
+            self._catch_up()
+            for key in dedupe_keys({"email": email, "phone": phone}):
+                lead_id = self._resolve(key)
+                if lead_id:
+                    return self._read(lead_id)
+            return None
+
+    def by_company(self, company: str) -> list[dict[str, Any]]:
+        with self._locked():
+            self._catch_up()
+            return [self._read(lead_id) for lead_id in sorted(self._companies.get(company.strip().lower(), ()))]
+
+    def _append(self, f: BinaryIO, record: dict[str, Any]):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        f.write(line)
+        f.flush()
+        self._index(record, self._size)
+        self._size += len(line)
+        self.lines += 1
+
+    def upsert(self, leads: list[dict[str, Any]]) -> int:
+        """Merge each lead into the record with the same email, phone or session, or add it.
+        Returns how many records were added."""
+        with self._locked():
+            return self._upsert(leads)
+
+    def _upsert(self, leads: list[dict[str, Any]]) -> int:
+        added = 0
+        self._catch_up()
+        if self.path.exists() and os.path.getsize(self.path) > self._size:
+            # Everything complete is indexed, and writers hold the lock, so the rest is a torn
+            # write from a crash; appending after it would glue the next record onto it
+            logger.warning(f"Truncating torn write at byte {self._size} of {self.path.name}")
+            os.truncate(self.path, self._size)
+        with open(self.path, "ab") as f:
+            for lead in leads:
+                # Email/phone matches first: the visitor's existing record is the one to keep
+                keys = [*dedupe_keys(lead), f"id:{lead['lead_id']}"]
+                matches = list(dict.fromkeys(filter(None, map(self._resolve, keys))))
+                if not matches:
+                    added += 1
+                record = self._read(matches[0]) if matches else {}
+                for other in matches[1:]:
+                    # A session saved before we knew who it was: fold it into the known lead
+                    record.update({k: v for k, v in self._read(other).items() if v is not None and k in LEAD_FIELDS})
+                    self._append(f, {"lead_id": other, "merged_into": matches[0]})
+                self._append(f, merge_into(record, lead))
+            self._inode = os.fstat(f.fileno()).st_ino
+        if self.lines >= COMPACT_MIN_LINES and self.lines > len(self._offsets) * COMPACT_RATIO:
+            self._compact()
+        return added
+
+    def _iter_current(self) -> Iterator[tuple[bytes, dict[str, Any]]]:
+        # One pass over the log, keeping only each lead's newest line
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if offset >= self._size:
+                    break
+                record = self._parse(line)
+                if record is not None and self._offsets.get(record["lead_id"]) == offset:
+                    yield line, record
+                offset += len(line)
+
+    def _compact(self):
+        if not self.path.exists():
+            return
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as out:
+            for line, _ in self._iter_current():
+                out.write(line)
+        os.replace(tmp, self.path)
+        self._reset()
+        self._catch_up()
+        self.compactions += 1
+        logger.info(f"Compacted {self.path.name} to {self.lines} leads")
+
+    def compact(self):
+        with self._locked():
+            self._catch_up()
+            self._compact()
+
+    def iter_leads(self) -> Iterator[dict[str, Any]]:
+        """Stream the current version of every lead in log order, one line in memory at a time.
+        Holds the store lock while iterating, so saves wait in the write-behind queue."""
+        with self._locked():
+            self._catch_up()
+            if self.path.exists():
+                for _, record in self._iter_current():
+                    yield record
+
+    def _import_legacy(self):
+        # One-off migration from the old leads.json list, under the store lock on first use
+        legacy_path, self._legacy_path = self._legacy_path, None
+        if legacy_path is None or not legacy_path.exists() or self.path.exists():
+            return
+        with open(legacy_path, encoding="utf-8") as f:
+            entries = json.load(f)
+        leads = [{**entry, "lead_id": entry.get("lead_id") or uuid.uuid4().hex} for entry in entries]
+        self._upsert([{**dict.fromkeys(LEAD_FIELDS), **lead} for lead in leads])
+        logger.info(f"Imported {len(entries)} leads from {legacy_path.name}")
+
+
+class LeadWriter:
+    """Write-behind queue: submit() never blocks the conversation; one task batches the writes."""
+
+    def __init__(self, store: LeadStore, batch_size: int = LEAD_BATCH_SIZE, flush_interval: float = LEAD_FLUSH_INTERVAL):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Jobs can run on separate event loops in one process: one queue and task per loop
+        self._workers: dict[asyncio.AbstractEventLoop, tuple[asyncio.Queue, asyncio.Task]] = {}
+        self.batches = 0
+        self.written = 0
+
+    def submit(self, lead: dict[str, Any]):
+        if not has_details(lead):
+            return
+        loop = asyncio.get_running_loop()
+        worker = self._workers.get(loop)
+        if worker is None or worker[1].done():
+            for other in [other for other in self._workers if other.is_closed()]:
+                del self._workers[other]
+            queue = asyncio.Queue()
+            worker = self._workers[loop] = (queue, loop.create_task(self._run(queue)))
+        worker[0].put_nowait(dict(lead))
+
+    async def flush(self):
+        """Wait until everything submitted on this loop so far is on disk."""
+        worker = self._workers.get(asyncio.get_running_loop())
+        if worker is not None:
+            await worker[0].join()
+
+    async def _run(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            lead = await queue.get()
+            batch, taken = {lead["lead_id"]: lead}, 1
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    lead = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                # Only the latest snapshot of each session's lead needs writing
+                batch[lead["lead_id"]] = lead
+                taken += 1
+            try:
+                await asyncio.to_thread(self._write, list(batch.values()))
+            except Exception:
+                logger.exception(f"Failed to save {len(batch)} leads")
+            finally:
+                for _ in range(taken):
+                    queue.task_done()
+
+    def _write(self, leads: list[dict[str, Any]]):
+        added = self.store.upsert(leads)
+        self.batches += 1
+        self.written += len(leads)
+        logger.info(f"Saved {len(leads)} leads to {self.store.path.name} ({added} new)")
+
+
+def export_leads(store: LeadStore, out: TextIO, fmt: str = "jsonl"):
+    """Write every current lead to out as JSON lines or CSV, streaming from the log."""
+    if fmt == "csv":
+        writer = csv.DictWriter(out, ["lead_id", "timestamp", "updated_at", *LEAD_FIELDS], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(store.iter_leads())
+    else:
+        for lead in store.iter_leads():
+            out.write(json.dumps(lead, ensure_ascii=False) + "\n")
+
+
+# One store and writer per process, shared by every session
+lead_store = LeadStore()
+lead_writer = LeadWriter(lead_store)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or compact the SDR lead log.")
+    parser.add_argument("command", choices=["export", "compact"])
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+    if args.command == "compact":
+        lead_store.compact()
+        print(f"{lead_store.lines} leads in {lead_store.path}")
+        sys.exit()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            export_leads(lead_store, out, args.format)
+    else:
+        export_leads(lead_store, sys.stdout, args.format)
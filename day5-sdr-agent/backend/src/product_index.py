@@ -0,0 +1,131 @@
+"""Product name lookup for get_product_info.
+
+Names the LLM passes through vary ("smart speaker", "PG", "QR codes", "loans"), so every
+product is indexed under normalized aliases: its name, the parts of a name like
+"Offline Payments (QR & SmartSpeaker)", the name without "PhonePe", and the curated
+synonyms below. Normalizing drops case, spaces and punctuation, so "Smart Speaker" and
+"SmartSpeaker" are one key. Lookup is a dict hit; only unknown names fall back to
+aliases made of whole words of the query and close-spelling matching, and those only
+answer when they point at one product. A generic word like "payments" is close to several products, so it gets the
+choices back instead of a guess.
+"""
+
+import difflib
+import re
+from typing import Any, Optional
+
+PRODUCT_SYNONYMS = {
+    "Payment Gateway": ["PG", "gateway", "online", "online payments", "payment gateway integration", "checkout"],
+    "UPI Payments": ["UPI", "UPI Lite", "send money", "money transfer"],
+    "Offline Payments (QR & SmartSpeaker)": [
+        "QR", "QR code", "speaker", "soundbox", "sound box", "offline", "in-store payments", "store payments",
+    ],
+    "Business Lending": ["loan", "business loan", "lending", "financing", "working capital"],
+    "PhonePe Ads": ["ads", "advertising", "advertise", "marketing"],
+}
+
+# Below this, a close spelling is more likely a different product than a typo ("online" is
+# 0.77 from "offline")
+FUZZY_CUTOFF = 0.8
+# A close spelling only counts when it beats every other product's by this much
+FUZZY_MARGIN = 0.1
+# Aliases inside a longer query must be whole words, so two-letter ones ("PG", "QR") are safe
+MIN_CONTAINED_ALIAS = 2
+
+
+def normalize(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def singular(key: str) -> str:
+    return key[:-1] if key.endswith("s") and not key.endswith("ss") and len(key) > 3 else key
+
+
+def word_runs(name: str) -> set[str]:
+    """Every run of consecutive words, normalized like an alias key, so aliases match whole
+    words only: "smart speaker device" holds "smartspeaker", "downloads" doesn't hold "ads"."""
+    words = [w for w in re.findall(r"[a-z0-9]+", name.lower()) if w != "phonepe"]
+    runs = {"".join(words[i:j]) for i in range(len(words)) for j in range(i + 1, len(words) + 1)}
+    return runs | {singular(run) for run in runs}
+
+
+def name_aliases(name: str) -> list[str]:
+    """Aliases derivable from the product name itself."""
+    aliases = [name]
+    base, _, inner = name.partition("(")
+    if inner:
+        aliases.append(base)
+        aliases.extend(re.split(r"&|,|\band\b", inner.rstrip(")")))
+    aliases.extend(re.sub(r"(?i)\bphonepe\b", "", alias) for alias in list(aliases))
+    return aliases
+
+
+class ProductIndex:
+    def __init__(self, products: list[dict[str, Any]], synonyms: Optional[dict[str, list[str]]] = None):
+        self.products = products
+        self.aliases: dict[str, int] = {}
+        synonyms = PRODUCT_SYNONYMS if synonyms is None else synonyms
+        for i, product in enumerate(products):
+            for alias in name_aliases(product["name"]) + synonyms.get(product["name"], []):
+                key = normalize(alias)
+                if key:
+                    # Singular form too, so "QR codes"/"QR code" and "loans"/"loan" agree
+                    self.aliases.setdefault(key, i)
+                    self.aliases.setdefault(singular(key), i)
+        # Longest first, so "upilite" wins over "upi" when looking for an alias inside the query
+        self.by_length = sorted(self.aliases, key=len, reverse=True)
+
+    def lookup(self, name: str) -> Optional[dict[str, Any]]:
+        """The product this name means, or None when it matches nothing or is ambiguous."""
+        matches = self.candidates(name)
+        return matches[0] if len(matches) == 1 else None
+
+    def candidates(self, name: str) -> list[dict[str, Any]]:
+        """Every product the name could mean, best first: one for a clear match, several when ambiguous."""
+        return [self.products[i] for i in self._resolve(name)]
+
+    def _resolve(self, name: str) -> list[int]:
+        key = normalize(name)
+        if not key:
+            return []
+        for candidate in (key, singular(key)):
+            if candidate in self.aliases:
+                return [self.aliases[candidate]]
+        # The brand alone names no product
+        key = key.replace("phonepe", "")
+        if not key:
+            return []
+        for candidate in (key, singular(key)):
+            if candidate in self.aliases:
+                return [self.aliases[candidate]]
+        # "the PhonePe smart speaker device": aliases made of whole words of the query, longest first
+        runs = word_runs(name)
+        contained = [self.aliases[a] for a in self.by_length if len(a) >= MIN_CONTAINED_ALIAS and a in runs]
+        if contained:
+            return list(dict.fromkeys(contained))
+        return self._fuzzy(key)
+
+    def _fuzzy(self, key: str) -> list[int]:
+        # Best close-spelling ratio per product; runners-up count from just under the cutoff,
+        # so "payments" (0.84 from "upipayments", 0.76 from "storepayments") stays ambiguous
+        floor = FUZZY_CUTOFF - FUZZY_MARGIN
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(key)
+        best: dict[int, float] = {}
+        for alias, i in self.aliases.items():
+            matcher.set_seq1(alias)
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= floor and ratio > best.get(i, 0.0):
+                best[i] = ratio
+        ranked = sorted(best, key=best.get, reverse=True)
+        if not ranked or best[ranked[0]] < FUZZY_CUTOFF:
+            return []
+        if len(ranked) > 1 and best[ranked[0]] - best[ranked[1]] < FUZZY_MARGIN:
+            # Ambiguous: offer every product that came close
+            return ranked
+        return ranked[:1]
+
+    def names(self) -> list[str]:
+        return [product["name"] for product in self.products]
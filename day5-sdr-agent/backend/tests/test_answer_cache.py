@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from answer_cache import AnswerCache, intent_key
+
+with open(Path(__file__).parent.parent / "phonepe_faq.json", encoding="utf-8") as f:
+    FAQS = json.load(f)["faqs"]
+QUESTIONS = [faq["question"] for faq in FAQS]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(FAQS, voice="en-US-natalie", audio_dir=tmp_path)
+
+
+def answered(cache, text):
+    faq_id = cache.match(text)
+    return None if faq_id is None else QUESTIONS[faq_id]
+
+
+def test_intent_key_ignores_case_punctuation_and_word_order():
+    assert intent_key("What are the fees?") == intent_key("fees, what are THEY")
+    assert intent_key("What are the fees?") != intent_key("What are the settlements?")
+    assert intent_key("the and of") is None
+
+
+def test_faq_questions_and_curated_paraphrases_hit(cache):
+    assert answered(cache, "What is the Payment Gateway pricing?") == "What is the Payment Gateway pricing?"
+    assert answered(cache, "how fast are SETTLEMENTS") == "How quickly do I get settlements?"
+    assert cache.stats()["exact_hits"] == 2
+
+
+def test_ranked_hit_is_learned(cache):
+    assert answered(cache, "how long do settlements take") == "How quickly do I get settlements?"
+    assert answered(cache, "settlements take how long") == "How quickly do I get settlements?"
+    stats = cache.stats()
+    assert (stats["ranked_hits"], stats["exact_hits"]) == (1, 1)
+
+
+@pytest.mark.parametrize("text", [
+    "Hi, I'm looking for a payment solution",
+    "I'm Rahul from Acme, is it secure?",
+    "Do you integrate with Shopify?",
+    "My email is rahul@acme.in",
+    "okay great",
+])
+def test_other_messages_go_to_the_llm(cache, text):
+    assert cache.match(text) is None
+
+
+@pytest.mark.parametrize("text", ["Is it free?", "Is it safe?", "fees?", "loan"])
+def test_single_term_messages_are_not_answered(cache, text):
+    assert cache.match(text) is None
+
+
+def test_answer_audio_is_shared_through_disk(tmp_path, cache):
+    faq_id = cache.match("What is the Payment Gateway pricing?")
+    assert cache.cached_audio(faq_id) is None
+    cache.store_audio(faq_id, b"\x01\x02" * 100, 24000, 1)
+
+    # Another worker process with the same voice finds it; a different voice doesn't
+    assert AnswerCache(FAQS, voice="en-US-natalie", audio_dir=tmp_path).cached_audio(faq_id) == (b"\x01\x02" * 100, 24000, 1)
+    assert AnswerCache(FAQS, voice="en-US-ken", audio_dir=tmp_path).cached_audio(faq_id) is None
+    assert [p.suffix for p in tmp_path.iterdir()] == [".pcm"]
@@ -0,0 +1,68 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from faq_search import FAQIndex, tokenize
+
+FAQS = json.loads((Path(__file__).resolve().parent.parent / "phonepe_faq.json").read_text(encoding="utf-8"))["faqs"]
+
+
+def linear_search(index, query, k):
+    """Reference: score every document in full, best first, lower doc id on ties."""
+    terms = set(tokenize(query))
+    scored = [(sum(impacts.get(term, 0.0) for term in terms), doc_id) for doc_id, impacts in enumerate(index.doc_terms)]
+    ranked = sorted((item for item in scored if item[0] > 0), key=lambda item: (-item[0], item[1]))
+    return [(score, index.faqs[doc_id]) for score, doc_id in ranked[:k]]
+
+
+def synthetic_faqs(size, seed):
+    # A small vocabulary and exact duplicates, so scores tie often
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(30)]
+    faqs = []
+    for _ in range(size):
+        if faqs and rng.random() < 0.2:
+            faqs.append(dict(rng.choice(faqs)))
+            continue
+        faqs.append({
+            "question": " ".join(rng.choices(vocab, k=rng.randint(2, 6))),
+            "answer": " ".join(rng.choices(vocab, k=rng.randint(5, 30))),
+        })
+    return faqs, vocab
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_early_exit_matches_a_full_scan(seed):
+    faqs, vocab = synthetic_faqs(300, seed)
+    index = FAQIndex(faqs)
+    rng = random.Random(seed)
+    for _ in range(50):
+        query = " ".join(rng.choices(vocab, k=rng.randint(1, 4)))
+        for k in (1, 3, 10):
+            assert index.search(query, k) == linear_search(index, query, k)
+
+
+def test_real_faq_matches_a_full_scan():
+    index = FAQIndex(FAQS)
+    for faq in FAQS:
+        for k in (1, 3):
+            assert index.search(faq["question"], k) == linear_search(index, faq["question"], k)
+
+
+@pytest.mark.parametrize("query, question", [
+    ("what are the fees for the payment gateway", "What is the Payment Gateway pricing?"),
+    ("is the QR code free", "Is PhonePe free to use?"),
+    ("how fast are settlements", "How quickly do I get settlements?"),
+    ("can I get a business loan", "Does PhonePe offer loans?"),
+    ("is it safe and secure", "Is PhonePe safe and secure?"),
+])
+def test_top_answer(query, question):
+    assert FAQIndex(FAQS).search(query, k=1)[0][1]["question"] == question
+
+
+def test_no_indexed_terms_returns_nothing():
+    index = FAQIndex(FAQS)
+    assert index.search("the and of") == []
+    assert index.search("zebra") == []
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+
+import pytest
+
+from leads import LeadStore, export_leads, new_lead
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LeadStore(tmp_path / "leads.jsonl", legacy_path=None)
+
+
+def lead(**fields):
+    return {**new_lead(), **fields}
+
+
+def test_upsert_merges_by_email_without_erasing_fields(store):
+    first = lead(name="Asha", email="asha@acme.in", company="Acme")
+    assert store.upsert([first]) == 1
+    # A later session with the same email (different case) updates the same record
+    assert store.upsert([lead(email="ASHA@acme.in", role="CTO")]) == 0
+
+    record = store.find(email="asha@acme.in")
+    assert record["lead_id"] == first["lead_id"]
+    assert (record["name"], record["company"], record["role"]) == ("Asha", "Acme", "CTO")
+    assert [r["lead_id"] for r in store.by_company("acme")] == [first["lead_id"]]
+
+
+def test_session_saved_before_identity_is_folded_in(store):
+    known = lead(name="Ravi", phone="+91 98765 43210")
+    store.upsert([known])
+    # An anonymous session starts saving details before giving its phone number
+    session = lead(company="Threadline")
+    store.upsert([session])
+    store.upsert([{**session, "phone": "9876543210"}])
+
+    # The session's record is tombstoned into the known lead, and its old id leads there
+    merged = store.get(session["lead_id"])
+    assert merged["lead_id"] == known["lead_id"]
+    assert (merged["name"], merged["company"]) == ("Ravi", "Threadline")
+    assert [r["lead_id"] for r in store.iter_leads()] == [known["lead_id"]]
+
+
+def test_compact_keeps_only_current_records(store):
+    ids = [lead(email=f"user{i}@example.com") for i in range(3)]
+    store.upsert(ids)
+    for i in range(5):
+        store.upsert([{**ids[0], "timeline": f"Q{i}"}])
+    before = list(store.iter_leads())
+
+    store.compact()
+    assert store.lines == 3
+    assert list(store.iter_leads()) == before
+    assert store.get(ids[0]["lead_id"])["timeline"] == "Q4"
+
+
+def test_export_jsonl_and_csv(store):
+    store.upsert([lead(name="Asha", email="asha@acme.in"), lead(name="Ravi", phone="9876543210")])
+
+    out = io.StringIO()
+    export_leads(store, out)
+    assert [json.loads(line)["name"] for line in out.getvalue().splitlines()] == ["Asha", "Ravi"]
+
+    out = io.StringIO()
+    export_leads(store, out, "csv")
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [(r["name"], r["email"]) for r in rows] == [("Asha", "asha@acme.in"), ("Ravi", "")]
+
+
+def test_torn_tail_is_truncated_before_the_next_append(store):
+    first = lead(name="Asha", email="asha@acme.in")
+    store.upsert([first])
+    with open(store.path, "ab") as f:
+        f.write(b'{"lead_id": "torn", "na')
+
+    fresh = LeadStore(store.path, legacy_path=None)
+    fresh.upsert([lead(name="Ravi", email="ravi@threadline.in")])
+    assert [r["name"] for r in fresh.iter_leads()] == ["Asha", "Ravi"]
+    assert fresh.get(first["lead_id"])["name"] == "Asha"
+    assert all(json.loads(line) for line in store.path.read_bytes().splitlines())
+
+
+def test_corrupt_line_is_skipped_and_counted(store):
+    store.upsert([lead(name="Asha", email="asha@acme.in")])
+    with open(store.path, "ab") as f:
+        f.write(b'{"lead_id": "x", "name": \n[1, 2]\n')
+    store.upsert([lead(name="Ravi", email="ravi@threadline.in")])
+
+    fresh = LeadStore(store.path, legacy_path=None)
+    assert [r["name"] for r in fresh.iter_leads()] == ["Asha", "Ravi"]
+    assert fresh.find(email="ravi@threadline.in")["name"] == "Ravi"
+    assert fresh.corrupt_lines == 2
+    fresh.compact()
+    assert (fresh.lines, fresh.corrupt_lines) == (2, 0)
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from product_index import ProductIndex
+
+PRODUCTS = json.loads((Path(__file__).resolve().parent.parent / "phonepe_faq.json").read_text(encoding="utf-8"))["products"]
+INDEX = ProductIndex(PRODUCTS)
+
+GATEWAY = "Payment Gateway"
+UPI = "UPI Payments"
+OFFLINE = "Offline Payments (QR & SmartSpeaker)"
+LENDING = "Business Lending"
+ADS = "PhonePe Ads"
+
+
+def names(query):
+    return [product["name"] for product in INDEX.candidates(query)]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("PG", GATEWAY),
+    ("QR codes", OFFLINE),
+    ("Smart Speaker", OFFLINE),
+    ("SmartSpeaker", OFFLINE),
+    ("loans", LENDING),
+    ("Ads", ADS),
+    ("PhonePe Payment Gateway", GATEWAY),
+])
+def test_aliases_resolve_directly(query, expected):
+    assert INDEX.lookup(query)["name"] == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("the PhonePe smart speaker device", OFFLINE),
+    ("business loans for my shop", LENDING),
+    ("a marketing campaign", ADS),
+    ("UPI lite wallet", UPI),
+])
+def test_aliases_inside_a_longer_name(query, expected):
+    assert names(query) == [expected]
+
+
+@pytest.mark.parametrize("query", ["app downloads", "roadside stall", "sqrt"])
+def test_aliases_only_match_whole_words(query):
+    # "ads" in "downloads", "ads" in "roadside", "qr" in "sqrt"
+    assert names(query) == []
+
+
+def test_close_spelling_resolves_to_one_product():
+    assert names("payment gatway") == [GATEWAY]
+    assert names("lendng") == [LENDING]
+
+
+def test_far_spelling_matches_nothing():
+    assert names("xyz") == []
+    assert INDEX.lookup("PhonePe") is None
+
+
+def test_ambiguous_names_return_every_candidate():
+    assert set(names("payments")) == {GATEWAY, UPI, OFFLINE}
+    assert set(names("UPI and QR")) == {UPI, OFFLINE}
+    assert INDEX.lookup("payments") is None
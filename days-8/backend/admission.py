@@ -0,0 +1,155 @@
+# Per-stage admission control for the GM pipeline. Each provider stage (STT, LLM, TTS) has a
+# concurrency limit and a bounded wait queue; anything beyond that is rejected immediately with
+# a Retry-After hint instead of piling onto providers that are already rate limiting us.
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+MAX_QUEUE = int(os.getenv("GM_MAX_QUEUE", 32))
+MAX_QUEUE_WAIT = float(os.getenv("GM_MAX_QUEUE_WAIT_SECONDS", 10))
+STAGE_CONCURRENCY = {
+    "stt": int(os.getenv("GM_STT_CONCURRENCY", 8)),
+    "llm": int(os.getenv("GM_LLM_CONCURRENCY", 8)),
+    "tts": int(os.getenv("GM_TTS_CONCURRENCY", 8)),
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, stage: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{stage} {reason}")
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    def __init__(self, name: str, concurrency: int, max_queue: int = MAX_QUEUE, max_wait: float = MAX_QUEUE_WAIT):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._slots = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._service: Deque[float] = deque(maxlen=200)
+
+    def retry_after(self) -> int:
+        # Time for the current queue to drain at the recent per-call service time
+        service = sum(self._service) / len(self._service) if self._service else 1.0
+        return max(1, math.ceil(service * (self.waiting + 1) / self.concurrency))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the admission timestamp. Raises Overloaded when the queue is full or too slow."""
+        start = time.perf_counter()
+        if not self._slots.locked():
+            # Free slot: take it without counting as queued
+            await self._slots.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, 429, self.retry_after(), "queue is full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded(self.name, 503, self.retry_after(), "queue wait timed out")
+            finally:
+                self.waiting -= 1
+        admitted_at = time.perf_counter()
+        self._waits.append(admitted_at - start)
+        self.in_flight += 1
+        self.admitted += 1
+        return admitted_at
+
+    def release(self, admitted_at: float):
+        self._service.append(time.perf_counter() - admitted_at)
+        self.in_flight -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        admitted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def stats(self) -> Dict:
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+class LimitedTTS:
+    """TTS wrapper for pipelined narration: when the TTS stage is saturated a sentence simply has
+    no audio (the client falls back to local speech) rather than failing the whole stream."""
+
+    def __init__(self, tts, limiter: StageLimiter):
+        self.tts = tts
+        self.limiter = limiter
+
+    async def synthesize(self, text: str):
+        try:
+            async with self.limiter.slot():
+                return await self.tts.synthesize(text)
+        except Overloaded:
+            return None
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """StreamingResponse that holds a stage slot until its body is finished with.
+
+    The slot is released however the response ends: fully sent, cut off mid-stream, or never
+    started because the client left before the first byte. Starlette neither iterates nor closes
+    the body in that last case, so a release in the body generator's finally would never run.
+    """
+
+    def __init__(self, content, limiter: StageLimiter, admitted_at: float,
+                 on_close: Optional[Callable[[], Awaitable[None]]] = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.limiter = limiter
+        self.admitted_at = admitted_at
+        self.on_close = on_close
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter.release(self.admitted_at)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+            # Close whatever the body wraps (e.g. a provider stream), even if it never started
+            if self.on_close is not None:
+                await self.on_close()
+
+
+stages: Dict[str, StageLimiter] = {name: StageLimiter(name, n) for name, n in STAGE_CONCURRENCY.items()}
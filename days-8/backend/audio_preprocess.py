@@ -0,0 +1,192 @@
+# Audio normalization before STT: decode WAV/PCM, downmix, resample to 16 kHz, trim silence
+import os
+import struct
+from functools import lru_cache
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 20
+VAD_PAD_MS = 150
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", -40))
+
+# Anti-aliasing filter for resample(): zero crossings of the windowed sinc on each side of its
+# centre, Kaiser window beta, and cutoff as a fraction of the lower of the two Nyquist rates
+RESAMPLE_ZERO_CROSSINGS = 12
+RESAMPLE_KAISER_BETA = 8.0
+RESAMPLE_ROLLOFF = 0.95
+# Output samples computed per block, to bound the (block, taps) gather in memory
+RESAMPLE_BLOCK = 16384
+
+RAW_PCM_TYPES = ("audio/l16", "audio/pcm", "audio/x-raw")
+
+# WAVE format tags
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _sample_dtype(tag: int, bits: int) -> Optional[np.dtype]:
+    if tag == WAVE_FORMAT_PCM:
+        return {8: np.dtype("u1"), 16: np.dtype("<i2"), 32: np.dtype("<i4")}.get(bits)
+    if tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return np.dtype("<f4")
+    return None
+
+
+def decode_wav(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode a RIFF/WAVE payload into a (frames, channels) array and its sample rate.
+
+    Samples are read with np.frombuffer over a memoryview of the data chunk, so
+    nothing is copied before downmixing. Returns None for anything other than
+    8/16/32-bit integer PCM or 32-bit float WAV.
+    """
+    mv = memoryview(data)
+    if len(mv) < 12 or mv[:4] != b"RIFF" or mv[8:12] != b"WAVE":
+        return None
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(mv):
+        chunk_id = mv[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", mv, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", mv, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The first two bytes of the SubFormat GUID hold the real format tag
+                tag = struct.unpack_from("<H", mv, body + 24)[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data" and fmt is not None:
+            tag, channels, rate, bits = fmt
+            dtype = _sample_dtype(tag, bits)
+            if dtype is None or channels < 1 or rate < 1:
+                return None
+            frame_bytes = dtype.itemsize * channels
+            end = min(body + chunk_size, len(mv))
+            end -= (end - body) % frame_bytes
+            samples = np.frombuffer(mv[body:end], dtype=dtype)
+            return samples.reshape(-1, channels), rate
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def decode_pcm16(data: bytes, sample_rate: int = TARGET_SAMPLE_RATE, channels: int = 1) -> Tuple[np.ndarray, int]:
+    """Wrap headerless little-endian 16-bit PCM without copying."""
+    mv = memoryview(data)
+    usable = len(mv) - len(mv) % (2 * channels)
+    return np.frombuffer(mv[:usable], dtype="<i2").reshape(-1, channels), sample_rate
+
+
+def to_mono_float(samples: np.ndarray) -> np.ndarray:
+    """Downmix (frames, channels) integer or float samples to mono float32 in [-1, 1]."""
+    if samples.dtype == np.uint8:
+        scale, offset = 128.0, 128.0
+    elif samples.dtype.kind == "i":
+        scale, offset = float(np.iinfo(samples.dtype).max) + 1, 0.0
+    else:
+        scale, offset = 1.0, 0.0
+    mono = samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1, dtype=np.float32)
+    mono = mono.astype(np.float32, copy=False)
+    if offset:
+        mono = mono - offset
+    if scale != 1.0:
+        mono = mono / scale
+    return mono
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    """Windowed-sinc low-pass for resampling by up/down, split into `up` phases of equal length.
+
+    Designed at the upsampled rate with its cutoff below both Nyquist rates, so it removes the
+    images of upsampling and the content that would alias when downsampling.
+    """
+    half = RESAMPLE_ZERO_CROSSINGS * max(up, down)
+    cutoff = RESAMPLE_ROLLOFF / max(up, down)
+    n = np.arange(-half, half + 1)
+    # Gain of `up` makes up for the zeros that upsampling inserts between input samples
+    taps = up * cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), RESAMPLE_KAISER_BETA)
+    per_phase = -(-len(taps) // up)
+    taps = np.pad(taps, (0, per_phase * up - len(taps)))
+    # Phase p holds taps p, p + up, p + 2 * up, ...
+    return taps.reshape(per_phase, up).T.astype(np.float32)
+
+
+def resample(mono: np.ndarray, src_rate: int, dst_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample mono float audio with a polyphase windowed-sinc filter (anti-aliased).
+
+    Output sample i sits at input position i * src_rate / dst_rate; only the taps that line
+    up with real input samples are evaluated, so nothing is computed at the upsampled rate.
+    """
+    if src_rate == dst_rate or len(mono) == 0:
+        return mono
+    common = gcd(src_rate, dst_rate)
+    up, down = dst_rate // common, src_rate // common
+    bank = _polyphase_filter(up, down)
+    per_phase = bank.shape[1]
+    half = RESAMPLE_ZERO_CROSSINGS * max(up, down)
+    n_out = int(round(len(mono) * dst_rate / src_rate))
+    # Zero padding so every tap of every output lands inside the array
+    padded = np.concatenate([
+        np.zeros(per_phase, np.float32), mono.astype(np.float32, copy=False),
+        np.zeros(half // up + 2, np.float32),
+    ])
+    out = np.empty(n_out, np.float32)
+    lags = np.arange(per_phase)
+    for start in range(0, n_out, RESAMPLE_BLOCK):
+        t = np.arange(start, min(start + RESAMPLE_BLOCK, n_out), dtype=np.int64) * down + half
+        phase, base = t % up, t // up
+        window = padded[(base + per_phase)[:, None] - lags]
+        out[start:start + len(t)] = np.einsum("ij,ij->i", window, bank[phase])
+    return out
+
+
+def trim_silence(
+    mono: np.ndarray,
+    sample_rate: int = TARGET_SAMPLE_RATE,
+    threshold_db: float = VAD_THRESHOLD_DB,
+    frame_ms: int = VAD_FRAME_MS,
+    pad_ms: int = VAD_PAD_MS,
+) -> np.ndarray:
+    """Drop leading and trailing frames whose RMS energy is below threshold_db (dBFS)."""
+    frame = max(1, sample_rate * frame_ms // 1000)
+    threshold = 10 ** (threshold_db / 20)
+    n_frames = len(mono) // frame
+    if n_frames == 0:
+        # Shorter than one frame: judge the clip as a whole
+        if len(mono) == 0 or np.sqrt(np.mean(mono * mono)) <= threshold:
+            return mono[:0]
+        return mono
+    frames = mono[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    voiced = np.flatnonzero(rms > threshold)
+    if len(voiced) == 0:
+        return mono[:0]
+    pad = sample_rate * pad_ms // 1000
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(mono), (voiced[-1] + 1) * frame + pad)
+    return mono[start:end]
+
+
+def to_pcm16(mono: np.ndarray) -> bytes:
+    return (np.clip(mono, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def normalize_for_stt(data: bytes, content_type: Optional[str] = None) -> Optional[bytes]:
+    """Turn an uploaded WAV or raw PCM clip into trimmed 16 kHz mono LINEAR16 bytes.
+
+    Returns None when the payload is a format we don't decode here (webm, ogg,
+    mp3, ...), in which case callers should send the original bytes. Returns
+    b"" when the clip is all silence.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    decoded = decode_wav(data)
+    if decoded is None and content_type in RAW_PCM_TYPES:
+        decoded = decode_pcm16(data)
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    mono = resample(to_mono_float(samples), rate)
+    return to_pcm16(trim_silence(mono))
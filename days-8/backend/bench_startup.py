@@ -0,0 +1,58 @@
+# Cold-start benchmark: time from spawning uvicorn until the app answers its first request.
+# Target is under one second, with no network access needed at boot.
+#   python bench_startup.py [--runs 5]
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+TARGET_SECONDS = 1.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def boot_once() -> float:
+    port = free_port()
+    env = dict(os.environ)
+    for key in ("GOOGLE_API_KEY", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+        env.setdefault(key, "bench")
+    client = httpx.Client(timeout=0.5)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                # Any HTTP response means the app is up; an unknown clip id is a cheap 404
+                client.get(f"http://127.0.0.1:{port}/api/gm/audio/boot-check")
+                return time.perf_counter() - start
+            except httpx.TransportError:
+                time.sleep(0.01)
+    finally:
+        client.close()
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    times = [boot_once() for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"boot to first response: median {median * 1000:.0f}ms, min {min(times) * 1000:.0f}ms, max {max(times) * 1000:.0f}ms")
+    print("PASS" if median < TARGET_SECONDS else "FAIL", f"(target < {TARGET_SECONDS:g}s)")
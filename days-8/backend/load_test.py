@@ -0,0 +1,123 @@
+# Load test for the Game Master provider chain (STT -> LLM -> TTS) against local stub servers.
+# Compares the old blocking calls with the async adapters in providers.py as players are added.
+#   python load_test.py [--turns 2] [--players 1 8 32 64]
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+STT_DELAY = 0.05
+LLM_DELAY = 0.15
+TTS_DELAY = 0.08
+DOWNLOAD_DELAY = 0.02
+FAKE_MP3 = b"\xff\xfb" + b"\0" * 16 * 1024
+
+
+def stub_app(base_url: str) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/v1/listen")
+    async def listen(request: Request):
+        await request.body()
+        await asyncio.sleep(STT_DELAY)
+        return {"results": {"channels": [{"alternatives": [{"transcript": "I open the door"}]}]}}
+
+    @stub.post("/v1/speech/generate")
+    async def generate(request: Request):
+        await request.json()
+        await asyncio.sleep(TTS_DELAY)
+        return {"audioUrl": f"{base_url}/audio/clip.mp3"}
+
+    @stub.post("/v1/speech/stream")
+    async def stream(request: Request):
+        await request.json()
+        await asyncio.sleep(TTS_DELAY)
+        return Response(FAKE_MP3, media_type="audio/mpeg")
+
+    @stub.get("/audio/clip.mp3")
+    async def clip():
+        await asyncio.sleep(DOWNLOAD_DELAY)
+        return Response(FAKE_MP3, media_type="audio/mpeg")
+
+    return stub
+
+
+class SlowGeminiModel:
+    """Stands in for genai.GenerativeModel: blocks the calling thread like the real SDK."""
+
+    def generate_content(self, prompt):
+        time.sleep(LLM_DELAY)
+        return SimpleNamespace(text="The door creaks open onto a torch-lit hall. What do you do?")
+
+
+def start_stub_server() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(uvicorn.Config(stub_app(base_url), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return base_url
+
+
+async def blocking_turn(base_url: str, model: SlowGeminiModel):
+    # What gm_endpoint used to do: synchronous HTTP and SDK calls straight on the event loop
+    with httpx.Client() as client:
+        client.post(f"{base_url}/v1/listen", content=b"\0" * 32000)
+        model.generate_content("prompt")
+        audio_url = client.post(f"{base_url}/v1/speech/generate", json={"text": "hi"}).json()["audioUrl"]
+        client.get(audio_url)
+
+
+async def async_turn(stt, llm, tts):
+    await stt.transcribe(b"\0" * 32000, {"punctuate": True})
+    narration = await llm.generate("prompt")
+    await tts.synthesize(narration)
+
+
+async def run(players: int, turns: int, make_turn) -> float:
+    async def player():
+        for _ in range(turns):
+            await make_turn()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(player() for _ in range(players)))
+    return players * turns / (time.perf_counter() - start)
+
+
+async def main(player_counts, turns):
+    base_url = start_stub_server()
+    os.environ.setdefault("DEEPGRAM_API_KEY", "stub")
+    os.environ.setdefault("MURF_API_KEY", "stub")
+    import providers
+
+    stt = providers.DeepgramSTT(url=f"{base_url}/v1/listen")
+    llm = providers.GeminiLLM(SlowGeminiModel())
+    tts = providers.MurfTTS(url=f"{base_url}/v1/speech/stream")
+    model = SlowGeminiModel()
+
+    print(f"stub latencies: stt {STT_DELAY * 1000:.0f}ms, llm {LLM_DELAY * 1000:.0f}ms, "
+          f"tts {TTS_DELAY * 1000:.0f}ms (old two-hop path adds a {DOWNLOAD_DELAY * 1000:.0f}ms download)")
+    for players in player_counts:
+        blocking = await run(players, turns, lambda: blocking_turn(base_url, model))
+        pooled = await run(players, turns, lambda: async_turn(stt, llm, tts))
+        print(f"{players:>4} players | blocking: {blocking:7.1f} turns/s | async pooled: {pooled:7.1f} turns/s")
+    await providers.close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--turns", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.players, args.turns))
@@ -1,17 +1,30 @@
 
-from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi import FastAPI, Request, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import uuid
 import uvicorn
 import os
+import asyncio
+import threading
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
-import requests
 import base64
-import io
 from fastapi import HTTPException
+from audio_preprocess import normalize_for_stt, TARGET_SAMPLE_RATE
+from fastapi.responses import JSONResponse, Response
+from providers import DeepgramSTT, GeminiLLM, MurfTTS, ProviderError, close_clients
+from narration import narrate_stream
+from sessions import SessionStore, SNAPSHOT_INTERVAL, world_delta
+from prompting import (RECENT_TURNS, SUMMARY_EVERY, SUMMARY_TOKEN_BUDGET, build_prompt, clip,
+                       extractive_summary, summary_prompt)
+from admission import AdmittedStreamingResponse, LimitedTTS, Overloaded, stages
+from timing import SERVER_TIMING, TimingMiddleware, record, span, timing_stats
+from streaming_stt import get_streaming_stt
+from rate_limit import BACKGROUND, rate_limit_stats
 
 
 
@@ -26,12 +39,6 @@ if not GOOGLE_API_KEY:
     raise RuntimeError("GOOGLE_API_KEY not set in .env")
 if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
     raise RuntimeError("LIVEKIT_API_KEY and LIVEKIT_API_SECRET must be set in .env")
-genai.configure(api_key=GOOGLE_API_KEY)
-
-# Print available Gemini models and their supported methods
-print("\nAvailable Gemini models and supported methods:")
-for m in genai.list_models():
-    print(f"- {m.name}: {getattr(m, 'supported_generation_methods', [])}")
 from fastapi import Body
 
 # --- LiveKit Token Endpoint ---
@@ -46,7 +53,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+if SERVER_TIMING:
+    app.add_middleware(TimingMiddleware, paths=("/api/gm",))
 
 class ChatTurn(BaseModel):
     role: str
@@ -61,51 +71,166 @@ class GMRequest(BaseModel):
 
 class GMResponse(BaseModel):
     narration: str
-    update: Dict[str, Any]
-    audio_base64: str = None
-
-
-
-# --- Murf Falcon TTS API helper ---
-def murf_tts(text, api_key, voice="en-US-matthew", model="falcon"):
-    url = "https://api.murf.ai/v1/speech/generate"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    payload = {
-        "voice": voice,
-        "model": model,
-        "text": text,
-        "format": "mp3"
-    }
-    resp = requests.post(url, headers=headers, json=payload)
-    if resp.status_code == 200:
-        audio_url = resp.json().get("audioUrl")
-        if audio_url:
-            audio_resp = requests.get(audio_url)
-            if audio_resp.status_code == 200:
-                return base64.b64encode(audio_resp.content).decode("utf-8")
-    return None
+    player_input: Optional[str] = None
+    # Full world for stateless requests; session requests get a JSON-Patch delta instead
+    update: Optional[Dict[str, Any]] = None
+    session_id: Optional[str] = None
+    delta: Optional[List[Dict[str, Any]]] = None
+    # Relative URL that streams the narration audio (GET /api/gm/audio/{clip_id})
+    audio_url: Optional[str] = None
 
 
-@app.post("/api/gm", response_model=GMResponse)
-async def gm_endpoint(
-    request: Request,
-    audio: UploadFile = File(None),
-    history: str = Form(None),
-    world: str = Form(None),
-    universe: str = Form(None),
-    player_input: str = Form(None),
-):
+class SessionRequest(BaseModel):
+    universe: str = "fantasy"
+    world: Optional[Dict[str, Any]] = None
+
+
+
+# --- Provider adapters (shared connection pools, per-provider timeouts) ---
+stt = DeepgramSTT()
+live_stt = get_streaming_stt()
+tts = MurfTTS()
+sessions = SessionStore()
+llm = None
+available_models = None
+_llm_lock = threading.Lock()
+# Model discovery is a network call, so it only runs on startup when explicitly asked for
+GM_LIST_MODELS_ON_STARTUP = os.getenv("GM_LIST_MODELS_ON_STARTUP", "0") == "1"
+
+
+def _load_llm() -> GeminiLLM:
+    # google.generativeai is imported on first use: it takes ~1s and nothing at boot needs it
+    global llm
+    with _llm_lock:
+        if llm is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=GOOGLE_API_KEY)
+            llm = GeminiLLM(genai.GenerativeModel(MODEL_NAME))
+    return llm
+
+
+async def get_llm() -> GeminiLLM:
+    # A request that beats the startup warm-up waits on a worker thread, never on the event loop;
+    # the lock in _load_llm makes it share the warm-up's import instead of starting another
+    if llm is None:
+        return await asyncio.to_thread(_load_llm)
+    return llm
+
+
+def list_available_models() -> List[Dict[str, Any]]:
+    global available_models
+    if available_models is None:
+        import google.generativeai as genai
+
+        _load_llm()
+        available_models = [
+            {"name": m.name, "supported_generation_methods": list(getattr(m, "supported_generation_methods", []))}
+            for m in genai.list_models()
+        ]
+    return available_models
+
+
+async def warm_up():
+    # Load the SDK off the event loop after the server is already accepting requests
+    await asyncio.to_thread(_load_llm)
+    if GM_LIST_MODELS_ON_STARTUP:
+        try:
+            models = await asyncio.to_thread(list_available_models)
+            print(f"Gemini model discovery: {len(models)} models available")
+        except Exception as e:
+            print(f"Gemini model discovery failed (GET /api/admin/models to retry): {e}")
+
+
+async def maintain_sessions():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        sessions.evict_expired()
+        try:
+            await asyncio.to_thread(sessions.snapshot)
+        except OSError as e:
+            print(f"GM session snapshot failed: {e}")
+
+
+@app.on_event("startup")
+async def startup_providers():
+    try:
+        sessions.load()
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Could not restore GM sessions: {e}")
+    asyncio.create_task(warm_up())
+    asyncio.create_task(maintain_sessions())
+
+
+@app.on_event("shutdown")
+async def shutdown_providers():
+    await close_clients()
+    sessions.snapshot(force=True)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Shed load fast: 429 when the stage queue is full, 503 when the wait ran too long
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc), "stage": exc.stage},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.get("/api/admin/queues")
+async def admin_queues():
+    """Per-stage concurrency, queue depth and admission wait times."""
+    return {name: limiter.stats() for name, limiter in stages.items()}
+
+
+@app.get("/api/admin/timings")
+async def admin_timings():
+    """p50/p95/p99 per request stage since startup (empty when SERVER_TIMING=0)."""
+    return timing_stats()
+
+
+@app.get("/api/admin/rate-limits")
+async def admin_rate_limits():
+    """Provider token buckets (PROVIDER_RATE_LIMITS): waits, 429s and retries."""
+    return rate_limit_stats()
+
+
+@app.get("/api/admin/models")
+async def admin_models(refresh: bool = False):
+    """Gemini models and their supported methods (fetched once, then cached)."""
+    global available_models
+    if refresh:
+        available_models = None
+    try:
+        return {"current": MODEL_NAME, "models": await asyncio.to_thread(list_available_models)}
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Model discovery failed: {e}")
+
+
+async def read_gm_turn(request: Request, audio, history, world, universe, player_input, session_id=None):
+    """Normalize a multipart (audio) or JSON GM request into (session, history, world, universe, player_input).
+
+    With a session_id the history, world and universe come from the server-side session
+    and the client only sends the new input; otherwise they are read from the request.
+    """
     # If audio is sent, use Deepgram STT
     if audio is not None:
-        deepgram_api_key = os.getenv("DEEPGRAM_API_KEY")
-        audio_bytes = await audio.read()
-        deepgram_url = "https://api.deepgram.com/v1/listen"
-        headers = {"Authorization": f"Token {deepgram_api_key}"}
-        dg_resp = requests.post(deepgram_url, headers=headers, data=audio_bytes, params={"punctuate": True, "language": "en"})
-        if dg_resp.status_code == 200:
-            player_input = dg_resp.json().get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0].get("transcript", "")
+        with span("upload"):
+            audio_bytes = await audio.read()
+        params = {"punctuate": True, "language": "en"}
+        # WAV/PCM uploads are downmixed, resampled and trimmed; compressed formats go as-is
+        with span("preprocess"):
+            pcm = normalize_for_stt(audio_bytes, audio.content_type)
+        if pcm is not None:
+            audio_bytes = pcm
+            params.update({"encoding": "linear16", "sample_rate": TARGET_SAMPLE_RATE, "channels": 1})
+        if not audio_bytes:
+            player_input = ""
         else:
-            player_input = "[STT error]"
+            async with stages["stt"].slot():
+                try:
+                    with span("stt"):
+                        player_input = await stt.transcribe(audio_bytes, params)
+                except ProviderError:
+                    player_input = "[STT error]"
         # Parse other fields
         history = history and json.loads(history) or []
         world = world and json.loads(world) or {}
@@ -116,35 +241,353 @@ async def gm_endpoint(
         world = req.get("world", {})
         universe = req.get("universe", "fantasy")
         player_input = req.get("player_input", "")
+        session_id = req.get("session_id", session_id)
+    session = None
+    if session_id:
+        session = sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired session")
+        history, world, universe = session.history, session.world, session.universe
+    return session, history, world, universe, player_input
 
-    # Compose prompt for Gemini
-    history_text = "\n".join([
-        f"{turn['role'].capitalize()}: {turn['text']}" for turn in history[-8:]
-    ])
-    prompt = (
-        f"You are a creative, helpful Game Master for a {universe} scenario. "
-        f"Maintain a consistent world state: {world}.\n"
-        f"Here is the recent conversation:\n{history_text}\n"
-        f"Player just said: '{player_input}'.\n"
-        f"Respond with a short, vivid narration (1-3 sentences) that guides the player, then end with a question or suggestion for what to do next."
-    )
+
+def advance_world(world: Dict[str, Any]) -> Dict[str, Any]:
+    update = dict(world)
+    update['turn'] = world.get('turn', 1) + 1
+    return update
+
+
+def begin_turn(session):
+    """Claim a session for one turn, so two overlapping turns can't both advance the same world."""
+    if session is not None and not sessions.begin_turn(session.id):
+        raise HTTPException(status_code=409, detail="Another turn is in progress for this session")
+
+
+def end_turn(session):
+    if session is not None:
+        sessions.end_turn(session.id)
+
+
+@app.post("/api/gm", response_model=GMResponse)
+async def gm_endpoint(
+    request: Request,
+    audio: UploadFile = File(None),
+    history: str = Form(None),
+    world: str = Form(None),
+    universe: str = Form(None),
+    player_input: str = Form(None),
+    session_id: str = Form(None),
+):
+    session, history, world, universe, player_input = await read_gm_turn(request, audio, history, world, universe, player_input, session_id)
+    begin_turn(session)
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(prompt)
-        narration = response.text.strip()
-    except Exception as e:
-        narration = f"[Gemini error] {e}"
+        # Compose prompt for Gemini
+        prompt = build_prompt(universe, world, history, player_input, session.summary if session else "")
+        async with stages["llm"].slot():
+            try:
+                with span("llm"):
+                    gemini = await get_llm()
+                    narration = await gemini.generate(prompt)
+            except Exception as e:
+                # Nothing is voiced or recorded, and the world stays where it was
+                raise HTTPException(status_code=502, detail=f"Gemini error: {e}")
 
-    # Murf Falcon TTS
-    murf_api_key = os.getenv("MURF_API_KEY")
-    audio_base64 = None
-    if murf_api_key:
-        audio_base64 = murf_tts(narration, murf_api_key)
+        # Murf Falcon TTS is fetched separately as binary audio, so the JSON stays small
+        audio_url = f"/api/gm/audio/{remember_clip(narration)}" if tts.api_key else None
+        return GMResponse(narration=narration, player_input=player_input, audio_url=audio_url,
+                          **finish_turn(session, world, player_input, narration))
+    finally:
+        end_turn(session)
+
+
+def finish_turn(session, world: Dict[str, Any], player_input: str, narration: str) -> Dict[str, Any]:
+    """Advance the world; for sessions, store the turn and return only the delta."""
+    update = advance_world(world)
+    if session is None:
+        return {"update": update}
+    delta = world_delta(session.world, update)
+    session.record_turn(player_input, narration, update)
+    turns = session.turns_to_summarize(RECENT_TURNS, SUMMARY_EVERY)
+    if turns:
+        # Fold old turns into the rolling summary off the request path
+        session.summarizing = True
+        asyncio.create_task(summarize_session(session, turns))
+    return {"session_id": session.id, "delta": delta}
+
+
+async def summarize_session(session, turns: List[Dict[str, str]]):
+    try:
+        # Background work waits its turn like everything else; overload falls back to the extractive summary
+        async with stages["llm"].slot():
+            gemini = await get_llm()
+            summary = await gemini.generate(summary_prompt(session.summary, turns), priority=BACKGROUND)
+    except Exception:
+        summary = extractive_summary(session.summary, turns)
+    session.apply_summary(clip(summary, SUMMARY_TOKEN_BUDGET), len(turns))
+
+
+@app.post("/api/gm/session")
+async def create_session(req: SessionRequest):
+    session = sessions.create(req.universe, req.world)
+    return {"session_id": session.id, "universe": session.universe, "world": session.world}
+
+
+@app.get("/api/gm/session/{session_id}")
+async def get_session(session_id: str):
+    # Full state, for clients resyncing after a reconnect
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"session_id": session.id, "universe": session.universe, "world": session.world, "history": session.history}
+
+
+@app.delete("/api/gm/session/{session_id}")
+async def end_session(session_id: str):
+    return {"deleted": sessions.delete(session_id)}
+
+
+# Narrations waiting to be played, so the browser can stream them with a plain <audio src>. Only
+# text the server narrated can be spoken: there is no endpoint that voices arbitrary text.
+MAX_PENDING_CLIPS = int(os.getenv("MAX_PENDING_CLIPS", 512))
+pending_clips: "OrderedDict[str, str]" = OrderedDict()
+# Audio is kept once synthesized, so range and retry requests don't call Murf again
+MAX_CLIP_AUDIO_BYTES = int(os.getenv("MAX_CLIP_AUDIO_BYTES", 64 * 1024 * 1024))
+clip_audio: "OrderedDict[tuple, bytes]" = OrderedDict()
+clip_audio_size = 0
+clip_synthesis: Dict[tuple, asyncio.Future] = {}
+
+
+def remember_clip(text: str) -> str:
+    clip_id = uuid.uuid4().hex
+    pending_clips[clip_id] = text
+    while len(pending_clips) > MAX_PENDING_CLIPS:
+        pending_clips.popitem(last=False)
+    return clip_id
+
+
+def store_clip_audio(key: tuple, audio: bytes):
+    global clip_audio_size
+    clip_audio[key] = audio
+    clip_audio_size += len(audio)
+    while clip_audio_size > MAX_CLIP_AUDIO_BYTES and clip_audio:
+        _, evicted = clip_audio.popitem(last=False)
+        clip_audio_size -= len(evicted)
+
+
+async def relay_speech(text: str, fmt: str, on_done=None):
+    """Stream Murf audio straight through to the client, with no buffering or base64.
+
+    on_done gets the whole clip once it has been relayed in full, or None if it wasn't.
+    """
+    if fmt not in MurfTTS.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(MurfTTS.FORMATS)}")
+    admitted_at = await stages["tts"].acquire()
+    chunks = tts.stream(text, fmt)
+    try:
+        # Pull the first chunk up front so provider failures become a 502 instead of a broken stream
+        with span("tts_first_byte"):
+            first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except BaseException as e:
+        stages["tts"].release(admitted_at)
+        await chunks.aclose()
+        if isinstance(e, ProviderError):
+            raise HTTPException(status_code=502, detail=str(e))
+        raise
+    parts = [first]
+    complete = False
+
+    async def body():
+        nonlocal complete
+        yield first
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        complete = True
+
+    async def close():
+        await chunks.aclose()
+        if on_done is not None:
+            on_done(b"".join(parts) if complete else None)
+
+    # The TTS slot is held until the last byte has been relayed, or the client has gone
+    return AdmittedStreamingResponse(body(), stages["tts"], admitted_at, on_close=close,
+                                     media_type=MurfTTS.FORMATS[fmt][1])
+
+
+@app.get("/api/gm/audio/{clip_id}")
+async def gm_audio(clip_id: str, format: str = "mp3"):
+    text = pending_clips.get(clip_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired clip")
+    key = (clip_id, format)
+    audio = clip_audio.get(key)
+    if audio is None and key in clip_synthesis:
+        # Another request for this clip (e.g. the browser's range probe) is already fetching it
+        audio = await asyncio.shield(clip_synthesis[key])
+    if audio is not None:
+        return Response(content=audio, media_type=MurfTTS.FORMATS[format][1])
+    future = asyncio.get_running_loop().create_future()
+    clip_synthesis[key] = future
+
+    def done(audio: Optional[bytes]):
+        clip_synthesis.pop(key, None)
+        if audio:
+            store_clip_audio(key, audio)
+        if not future.done():
+            future.set_result(audio)
+
+    try:
+        return await relay_speech(text, format, on_done=done)
+    except BaseException:
+        done(None)
+        raise
+
+
+async def narrate_turn(session, world: Dict[str, Any], player_input: str, prompt: str, label: str):
+    """Pipelined narration events ready to send: audio as base64, and the world update on "done"."""
+    started = time.perf_counter()
+    async for kind, data in narrate_stream(await get_llm(), LimitedTTS(tts, stages["tts"]), prompt):
+        if SERVER_TIMING and data.get("index") == 0 and kind in ("sentence", "audio"):
+            # Streamed milestones land after the header is sent, so they only feed the histograms
+            record(f"{label}_first_{kind}", (time.perf_counter() - started) * 1000)
+        if kind == "audio":
+            audio_bytes = data.pop("audio")
+            data["audio_base64"] = base64.b64encode(audio_bytes).decode("utf-8") if audio_bytes else ""
+        elif kind == "done":
+            data.update(finish_turn(session, world, player_input, data["narration"]))
+        yield kind, data
+
+
+def sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/gm/stream")
+async def gm_stream_endpoint(
+    request: Request,
+    audio: UploadFile = File(None),
+    history: str = Form(None),
+    world: str = Form(None),
+    universe: str = Form(None),
+    player_input: str = Form(None),
+    session_id: str = Form(None),
+):
+    """Server-sent events version of /api/gm: narration is spoken sentence by sentence while it is generated.
+
+    Events: transcript, sentence {index, text}, audio {index, audio_base64} (in order), error,
+    done {narration, update} or, for sessions, done {narration, session_id, delta}.
+    """
+    session, history, world, universe, player_input = await read_gm_turn(request, audio, history, world, universe, player_input, session_id)
+    begin_turn(session)
+    try:
+        prompt = build_prompt(universe, world, history, player_input, session.summary if session else "")
+        # Admit the LLM stage before the response starts, so overload is still a proper 429/503
+        admitted_at = await stages["llm"].acquire()
+    except BaseException:
+        end_turn(session)
+        raise
+
+    async def events():
+        yield sse("transcript", {"player_input": player_input})
+        async for kind, data in narrate_turn(session, world, player_input, prompt, "stream"):
+            yield sse(kind, data)
+
+    async def close():
+        end_turn(session)
+
+    # The turn is released with the LLM slot, however the response ends
+    return AdmittedStreamingResponse(events(), stages["llm"], admitted_at, on_close=close,
+                                     media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/api/gm/live")
+async def gm_live(ws: WebSocket, session_id: Optional[str] = None, universe: str = "fantasy", sample_rate: int = TARGET_SAMPLE_RATE):
+    """Live-audio GM turns over a WebSocket.
+
+    The client sends 16-bit mono PCM frames (binary) at sample_rate, plus optional JSON text
+    messages {"type": "end"} (push-to-talk released) and {"type": "stop"}. The server sends
+    {"type": "session"}, then per utterance interim/final {"type": "transcript", "text", "final"}
+    followed by the same sentence/audio/error/done events as /api/gm/stream. Narration starts
+    the moment the final transcript arrives, with no upload or prerecorded transcription wait.
+    """
+    await ws.accept()
+    session = sessions.get(session_id) if session_id else sessions.create(universe)
+    if session is None:
+        await ws.send_json({"type": "error", "error": "Unknown or expired session"})
+        await ws.close(code=4404)
+        return
+    try:
+        stream = await live_stt.open(sample_rate)
+    except ProviderError as e:
+        await ws.send_json({"type": "error", "error": str(e)})
+        await ws.close(code=1011)
+        return
+    await ws.send_json({"type": "session", "session_id": session.id, "universe": session.universe, "world": session.world})
+
+    async def pump_audio():
+        # Mic frames keep flowing to STT while narration for the previous utterance is sent
+        try:
+            while True:
+                message = await ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    await stream.send(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        control = None
+                    if not isinstance(control, dict):
+                        # A bad control message is reported; the mic stream carries on
+                        await ws.send_json({"type": "error", "error": 'Control messages must be JSON objects like {"type": "end"}'})
+                        continue
+                    if control.get("type") == "end":
+                        await stream.finalize()
+                    elif control.get("type") == "stop":
+                        break
+        except (WebSocketDisconnect, ValueError, ProviderError):
+            pass
+        finally:
+            await stream.close()
+
+    pump = asyncio.create_task(pump_audio())
+    try:
+        async for result in stream:
+            await ws.send_json({"type": "transcript", "text": result.text, "final": result.final})
+            if not result.final:
+                continue
+            if not sessions.begin_turn(session.id):
+                await ws.send_json({"type": "error", "error": "Another turn is in progress for this session"})
+                continue
+            try:
+                prompt = build_prompt(session.universe, session.world, session.history, result.text, session.summary)
+                try:
+                    admitted_at = await stages["llm"].acquire()
+                except Overloaded as e:
+                    await ws.send_json({"type": "error", "error": str(e), "retry_after": e.retry_after})
+                    continue
+                try:
+                    async for kind, data in narrate_turn(session, session.world, result.text, prompt, "live"):
+                        await ws.send_json({"type": kind, **data})
+                finally:
+                    stages["llm"].release(admitted_at)
+            finally:
+                sessions.end_turn(session.id)
+    except ProviderError as e:
+        await ws.send_json({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pump.cancel()
+        await stream.close()
+    try:
+        await ws.close()
+    except RuntimeError:
+        # Already closed by the client
+        pass
 
-    turn = world.get('turn', 1) + 1
-    update = dict(world)
-    update['turn'] = turn
-    return GMResponse(narration=narration, update=update, audio_base64=audio_base64 or "")
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8008, reload=True)
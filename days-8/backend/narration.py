@@ -0,0 +1,110 @@
+# Sentence-pipelined narration: split streamed LLM text into sentences, synthesize each one
+# concurrently, and emit audio strictly in sentence order as soon as it is ready.
+import asyncio
+import os
+import re
+from typing import AsyncIterator, List, Optional, Tuple
+
+TTS_STREAM_CONCURRENCY = int(os.getenv("TTS_STREAM_CONCURRENCY", 4))
+
+# End of sentence: terminal punctuation, optional closing quote/bracket, then whitespace
+SENTENCE_END_RE = re.compile(r'[.!?…]+["\'”’)\]]*\s+')
+
+
+class SentenceSplitter:
+    """Incrementally cut a growing text stream into complete sentences."""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END_RE.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        tail, self.buffer = self.buffer.strip(), ""
+        return tail or None
+
+
+async def narrate_stream(llm, tts, prompt: str) -> AsyncIterator[Tuple[str, dict]]:
+    """Yield ("sentence", ...), ("audio", ...), then exactly one ("done", ...) or ("error", ...) event.
+
+    Sentence text is emitted the moment it is complete. TTS for each sentence
+    starts immediately (at most TTS_STREAM_CONCURRENCY at once) and audio events
+    are released in sentence order, so the first clip can play while later
+    sentences are still being generated. A sentence whose TTS fails gets audio
+    None (the client speaks it locally); an LLM failure ends the stream with
+    "error" and no "done", since the narration is incomplete.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    pending: asyncio.Queue = asyncio.Queue()
+    limit = asyncio.Semaphore(TTS_STREAM_CONCURRENCY)
+    parts: List[str] = []
+    failed = False
+
+    async def speak(text: str) -> Optional[bytes]:
+        async with limit:
+            return await tts.synthesize(text)
+
+    async def emit(sentence: str):
+        index = len(parts)
+        parts.append(sentence)
+        await events.put(("sentence", {"index": index, "text": sentence}))
+        await pending.put((index, asyncio.create_task(speak(sentence))))
+
+    async def generate():
+        nonlocal failed
+        splitter = SentenceSplitter()
+        try:
+            async for chunk in llm.stream(prompt):
+                for sentence in splitter.feed(chunk):
+                    await emit(sentence)
+            tail = splitter.flush()
+            if tail:
+                await emit(tail)
+        except Exception as e:
+            failed = True
+            await events.put(("error", {"error": f"[Gemini error] {e}"}))
+        finally:
+            await pending.put(None)
+
+    async def relay_audio():
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                index, task = item
+                try:
+                    audio = await task
+                except Exception:
+                    audio = None
+                await events.put(("audio", {"index": index, "audio": audio}))
+        except Exception as e:
+            await events.put(("error", {"error": f"[TTS error] {e}"}))
+            return
+        if not failed:
+            await events.put(("done", {"narration": " ".join(parts)}))
+
+    workers = [asyncio.create_task(generate()), asyncio.create_task(relay_audio())]
+    try:
+        while True:
+            kind, data = await events.get()
+            yield kind, data
+            if kind in ("done", "error"):
+                break
+    finally:
+        for task in workers:
+            task.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[1].cancel()
@@ -0,0 +1,107 @@
+# Game Master prompt construction under a hard token budget, plus the rolling story summary
+# that replaces old turns so prompt size stays flat however long a campaign runs.
+import json
+import os
+from typing import Any, Dict, List
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("GM_PROMPT_TOKEN_BUDGET", 1200))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("GM_SUMMARY_TOKEN_BUDGET", 250))
+WORLD_TOKEN_BUDGET = int(os.getenv("GM_WORLD_TOKEN_BUDGET", 300))
+TURN_TOKEN_LIMIT = int(os.getenv("GM_TURN_TOKEN_LIMIT", 120))
+# The universe is a genre name ("fantasy", "sci-fi"), not a place for instructions
+UNIVERSE_TOKEN_LIMIT = int(os.getenv("GM_UNIVERSE_TOKEN_LIMIT", 8))
+RECENT_TURNS = int(os.getenv("GM_RECENT_TURNS", 8))
+# Fold this many history entries into the summary once they fall out of the recent window
+SUMMARY_EVERY = int(os.getenv("GM_SUMMARY_EVERY", 6))
+
+CHARS_PER_TOKEN = 4
+# Kept first when the world state is over budget; other keys follow in their own order
+WORLD_CORE_KEYS = ("location", "players", "turn")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; cheap and close enough for budgeting
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clip(text: str, max_tokens: int) -> str:
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:max(0, limit - 1)].rstrip() + "…"
+
+
+def fit_world(world: Dict[str, Any], max_tokens: int) -> str:
+    """World state as compact JSON within max_tokens, dropping whole keys rather than cutting the text.
+
+    Core keys are kept first, then the rest in order; a key whose value alone won't fit is
+    skipped so smaller ones after it still make it in. The result is always valid JSON.
+    """
+    text = json.dumps(world, separators=(",", ":"), ensure_ascii=False)
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    keys = [k for k in WORLD_CORE_KEYS if k in world] + [k for k in world if k not in WORLD_CORE_KEYS]
+    kept: Dict[str, Any] = {}
+    used = 2
+    for key in keys:
+        # The pair as it appears inside the object, plus its separating comma
+        cost = len(json.dumps({key: world[key]}, separators=(",", ":"), ensure_ascii=False)) - 1
+        if used + cost <= limit:
+            kept[key] = world[key]
+            used += cost
+    return json.dumps(kept, separators=(",", ":"), ensure_ascii=False)
+
+
+def format_turn(turn: Dict[str, str]) -> str:
+    return f"{turn['role'].capitalize()}: {clip(turn['text'], TURN_TOKEN_LIMIT)}"
+
+
+def build_prompt(universe: str, world: Dict[str, Any], history: List[Dict[str, str]], player_input: str,
+                 summary: str = "", budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Assemble the GM prompt without exceeding budget tokens.
+
+    Fixed instructions and the player's line always fit; the universe, story summary and
+    world state are held to their own caps (the world by dropping keys, so it stays valid
+    JSON); the remaining budget is filled with the most recent turns, newest first.
+    """
+    universe = clip(" ".join(str(universe).split()), UNIVERSE_TOKEN_LIMIT)
+    head = f"You are a creative, helpful Game Master for a {universe} scenario. "
+    head += f"Maintain a consistent world state: {fit_world(world, WORLD_TOKEN_BUDGET)}.\n"
+    if summary:
+        head += f"Story so far: {clip(summary, SUMMARY_TOKEN_BUDGET)}\n"
+    tail = (
+        f"Player just said: '{clip(player_input, TURN_TOKEN_LIMIT)}'.\n"
+        f"Respond with a short, vivid narration (1-3 sentences) that guides the player, then end with a question or suggestion for what to do next."
+    )
+    remaining = budget - estimate_tokens(head) - estimate_tokens(tail) - estimate_tokens("Here is the recent conversation:\n")
+    lines: List[str] = []
+    for turn in reversed(history[-RECENT_TURNS:]):
+        line = format_turn(turn)
+        cost = estimate_tokens(line) + 1
+        if cost > remaining:
+            break
+        lines.append(line)
+        remaining -= cost
+    lines.reverse()
+    return head + "Here is the recent conversation:\n" + "\n".join(lines) + "\n" + tail
+
+
+def summary_prompt(summary: str, turns: List[Dict[str, str]]) -> str:
+    events = "\n".join(format_turn(t) for t in turns)
+    return (
+        "You keep the running summary of a tabletop adventure. Update the summary with the new events, "
+        "keeping names, items, goals and unresolved threads. Drop flavour text. "
+        f"Answer with the summary only, at most {SUMMARY_TOKEN_BUDGET * 3 // 4} words.\n"
+        f"Current summary: {summary or '(none yet)'}\n"
+        f"New events:\n{events}"
+    )
+
+
+def extractive_summary(summary: str, turns: List[Dict[str, str]]) -> str:
+    """Fallback when the LLM is unavailable: keep the first sentence of each GM line."""
+    notes = [t["text"].split(". ")[0].strip() for t in turns if t["role"] != "player" and t["text"].strip()]
+    merged = " ".join(p for p in [summary] + notes if p)
+    # Keep the newest material when over budget
+    limit = SUMMARY_TOKEN_BUDGET * CHARS_PER_TOKEN
+    return merged[-limit:] if len(merged) > limit else merged
@@ -0,0 +1,201 @@
+# Async provider adapters for the Game Master: Deepgram STT, Gemini narration, Murf Falcon TTS.
+# HTTP providers share one keep-alive connection pool each; the blocking Gemini SDK runs on a
+# dedicated thread pool so a slow generation never stalls the event loop.
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from rate_limit import INTERACTIVE, call_with_backoff, is_rate_limited, limiter
+
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "https://api.deepgram.com/v1/listen")
+MURF_STREAM_URL = os.getenv("MURF_STREAM_URL", "https://api.murf.ai/v1/speech/stream")
+
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT_SECONDS", 15))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", 20))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT_SECONDS", 15))
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+LLM_THREADS = int(os.getenv("LLM_THREADS", 32))
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _status_error(provider: str, resp: httpx.Response) -> ProviderError:
+    return ProviderError(f"{provider} returned {resp.status_code}", resp.status_code, resp.headers.get("retry-after"))
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_llm_pool: Optional[ThreadPoolExecutor] = None
+
+
+def http_client(provider: str, timeout: float) -> httpx.AsyncClient:
+    """Shared keep-alive client for one provider, created on first use."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
+        _clients[provider] = client
+    return client
+
+
+async def close_clients():
+    global _llm_pool
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+    if _llm_pool is not None:
+        _llm_pool.shutdown(wait=False)
+        _llm_pool = None
+
+
+def _llm_executor() -> ThreadPoolExecutor:
+    global _llm_pool
+    if _llm_pool is None:
+        _llm_pool = ThreadPoolExecutor(max_workers=LLM_THREADS, thread_name_prefix="gemini")
+    return _llm_pool
+
+
+class DeepgramSTT:
+    def __init__(self, api_key: Optional[str] = None, url: str = DEEPGRAM_URL, timeout: float = STT_TIMEOUT):
+        self.api_key = api_key or os.getenv("DEEPGRAM_API_KEY")
+        self.url = url
+        self.timeout = timeout
+
+    async def transcribe(self, audio: bytes, params: Optional[Dict[str, Any]] = None) -> str:
+        return await call_with_backoff(lambda: self._transcribe(audio, params), "deepgram")
+
+    async def _transcribe(self, audio: bytes, params: Optional[Dict[str, Any]]) -> str:
+        client = http_client("deepgram", self.timeout)
+        try:
+            resp = await client.post(
+                self.url,
+                headers={"Authorization": f"Token {self.api_key}"},
+                params={k: str(v).lower() if isinstance(v, bool) else v for k, v in (params or {}).items()},
+                content=audio,
+            )
+        except httpx.HTTPError as e:
+            raise ProviderError(f"Deepgram request failed: {e!r}") from e
+        if resp.status_code != 200:
+            raise _status_error("Deepgram", resp)
+        return resp.json().get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0].get("transcript", "")
+
+
+class GeminiLLM:
+    """Runs the synchronous google-generativeai call on the LLM thread pool with a timeout."""
+
+    def __init__(self, model: Any, timeout: float = LLM_TIMEOUT):
+        self.model = model
+        self.timeout = timeout
+        # Per-model quota bucket, e.g. "gemini:gemini-flash-lite-latest"
+        self.model_name = str(getattr(model, "model_name", "") or "").replace("models/", "") or None
+
+    async def generate(self, prompt: str, priority: int = INTERACTIVE) -> str:
+        return await call_with_backoff(lambda: self._generate(prompt), "gemini", self.model_name, priority)
+
+    async def _generate(self, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_llm_executor(), self.model.generate_content, prompt)
+        try:
+            response = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as e:
+            raise ProviderError(f"Gemini timed out after {self.timeout:g}s") from e
+        return response.text.strip()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield text chunks as Gemini produces them (generate_content(stream=True) on the thread pool).
+
+        Rate limited but not retried: chunks may already have been passed on when a call fails.
+        """
+        await limiter.acquire("gemini", self.model_name)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def pump():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        loop.run_in_executor(_llm_executor(), pump)
+        deadline = loop.time() + self.timeout
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError as e:
+                raise ProviderError(f"Gemini timed out after {self.timeout:g}s") from e
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                if is_rate_limited(item):
+                    limiter.rate_limited("gemini", self.model_name)
+                raise item
+            yield item
+
+
+class MurfTTS:
+    """Murf Falcon TTS through the streaming endpoint: audio bytes come back on the same
+    response, so there is no second request to fetch an audioUrl."""
+
+    # Requested format -> (Murf format name, response media type)
+    FORMATS = {"mp3": ("MP3", "audio/mpeg"), "opus": ("OGG", "audio/ogg")}
+
+    def __init__(self, api_key: Optional[str] = None, url: str = MURF_STREAM_URL, timeout: float = TTS_TIMEOUT,
+                 voice: str = "en-US-matthew", model: str = "falcon"):
+        self.api_key = api_key or os.getenv("MURF_API_KEY")
+        self.url = url
+        self.timeout = timeout
+        self.voice = voice
+        self.model = model
+
+    async def stream(self, text: str, fmt: str = "mp3") -> AsyncIterator[bytes]:
+        """Relay provider audio chunks as they arrive. Raises ProviderError before the first chunk on failure."""
+        await limiter.acquire("murf", self.model)
+        try:
+            async for chunk in self._stream(text, fmt):
+                yield chunk
+        except ProviderError as e:
+            if e.status_code == 429:
+                limiter.rate_limited("murf", self.model)
+            raise
+
+    async def _stream(self, text: str, fmt: str) -> AsyncIterator[bytes]:
+        if not self.api_key:
+            raise ProviderError("MURF_API_KEY not set")
+        client = http_client("murf", self.timeout)
+        # Same request shape as the days-9 Murf client: api-key header, voiceId in the body
+        payload = {"voiceId": self.voice, "model": self.model.upper(), "text": text, "format": self.FORMATS[fmt][0]}
+        try:
+            async with client.stream("POST", self.url, headers={"api-key": self.api_key}, json=payload) as resp:
+                if resp.status_code != 200:
+                    raise _status_error("Murf", resp)
+                async for chunk in resp.aiter_bytes():
+                    yield chunk
+        except httpx.HTTPError as e:
+            raise ProviderError(f"Murf request failed: {e!r}") from e
+
+    async def synthesize(self, text: str, fmt: str = "mp3") -> Optional[bytes]:
+        async def collect():
+            return b"".join([chunk async for chunk in self._stream(text, fmt)]) or None
+
+        try:
+            # Whole clips can be retried safely, unlike a relayed stream
+            return await call_with_backoff(collect, "murf", self.model)
+        except ProviderError:
+            return None
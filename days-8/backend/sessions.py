@@ -0,0 +1,168 @@
+# Server-side Game Master sessions: world state and history live here, keyed by session ID,
+# so clients only send the new player input and receive a JSON-Patch delta of the world.
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+SESSION_TTL = float(os.getenv("GM_SESSION_TTL_SECONDS", 2 * 60 * 60))
+MAX_SESSIONS = int(os.getenv("GM_MAX_SESSIONS", 10000))
+MAX_SESSION_HISTORY = int(os.getenv("GM_MAX_SESSION_HISTORY", 50))
+SNAPSHOT_PATH = os.getenv("GM_SESSION_SNAPSHOT", os.path.join(os.path.dirname(__file__), "gm_sessions.json"))
+SNAPSHOT_INTERVAL = float(os.getenv("GM_SESSION_SNAPSHOT_SECONDS", 30))
+
+
+@dataclass
+class GameSession:
+    id: str
+    universe: str
+    world: Dict[str, Any]
+    history: List[Dict[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    last_seen: float = field(default_factory=time.time)
+    # Rolling summary of turns that have been folded out of history
+    summary: str = ""
+    summarizing: bool = False
+
+    def record_turn(self, player_input: str, narration: str, world: Dict[str, Any]):
+        self.history.append({"role": "player", "text": player_input})
+        self.history.append({"role": "gm", "text": narration})
+        if not self.summarizing:
+            # Safety cap in case summaries keep failing; normally summarization keeps history short
+            del self.history[:-MAX_SESSION_HISTORY]
+        self.world = world
+        self.last_seen = time.time()
+
+    def turns_to_summarize(self, keep_recent: int, batch: int) -> List[Dict[str, str]]:
+        """The oldest batch of history entries once enough have fallen out of the recent window."""
+        if self.summarizing or len(self.history) < keep_recent + batch:
+            return []
+        return self.history[:batch]
+
+    def apply_summary(self, summary: str, folded: int):
+        # Only appends happen while summarizing, so the folded turns are still at the head
+        self.summary = summary
+        del self.history[:folded]
+        self.summarizing = False
+
+
+class SessionStore:
+    """In-memory sessions with idle-TTL eviction and periodic JSON snapshots."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS, snapshot_path: Optional[str] = SNAPSHOT_PATH):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.snapshot_path = snapshot_path
+        self._sessions: Dict[str, GameSession] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        # Sessions with a GM turn in flight; kept off GameSession so snapshots never hold it
+        self._in_turn: set = set()
+
+    def create(self, universe: str, world: Optional[Dict[str, Any]] = None, history: Optional[List[Dict[str, str]]] = None) -> GameSession:
+        session = GameSession(id=uuid.uuid4().hex, universe=universe, world=dict(world or {"turn": 1}), history=list(history or []))
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                # Drop the least recently used session to make room
+                oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+                del self._sessions[oldest.id]
+            self._sessions[session.id] = session
+            self._dirty = True
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                return None
+            session.last_seen = time.time()
+            self._dirty = True
+            return session
+
+    def begin_turn(self, session_id: str) -> bool:
+        """Claim the session for one GM turn; False while another turn on it is still running."""
+        with self._lock:
+            if session_id in self._in_turn:
+                return False
+            self._in_turn.add(session_id)
+            return True
+
+    def end_turn(self, session_id: str):
+        with self._lock:
+            self._in_turn.discard(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._dirty = True
+            return self._sessions.pop(session_id, None) is not None
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if s.last_seen < cutoff]
+            for sid in expired:
+                del self._sessions[sid]
+            if expired:
+                self._dirty = True
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def snapshot(self, force: bool = False):
+        """Write all live sessions to snapshot_path atomically (skipped when nothing changed)."""
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            if not self._dirty and not force:
+                return
+            data = [asdict(s) for s in self._sessions.values()]
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.snapshot_path)
+
+    def load(self) -> int:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            for item in data:
+                session = GameSession(**item)
+                session.summarizing = False
+                self._sessions[session.id] = session
+        self.evict_expired()
+        return len(self)
+
+
+def _pointer(parts: List[str]) -> str:
+    # RFC 6901 JSON Pointer escaping
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in parts)
+
+
+def world_delta(old: Dict[str, Any], new: Dict[str, Any], path: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """JSON-Patch (RFC 6902) operations that turn old into new. Nested dicts are diffed key by key;
+    lists and scalars are replaced whole."""
+    path = path or []
+    ops: List[Dict[str, Any]] = []
+    for key in old:
+        if key not in new:
+            ops.append({"op": "remove", "path": _pointer(path + [key])})
+    for key, value in new.items():
+        if key not in old:
+            ops.append({"op": "add", "path": _pointer(path + [key]), "value": value})
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            ops.extend(world_delta(old[key], value, path + [key]))
+        elif value != old[key]:
+            ops.append({"op": "replace", "path": _pointer(path + [key]), "value": value})
+    return ops
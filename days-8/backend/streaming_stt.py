@@ -0,0 +1,217 @@
+# Streaming speech-to-text for live GM turns: microphone frames go in as they arrive and
+# transcripts come out while the player is still talking, ending with one final transcript per
+# utterance. DeepgramStreamingSTT uses Deepgram's live WebSocket API; LocalStreamingSTT is an
+# offline stand-in (energy VAD + scripted lines) for tests and development without a key.
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional
+from urllib.parse import urlencode
+
+import numpy as np
+
+from audio_preprocess import TARGET_SAMPLE_RATE, VAD_THRESHOLD_DB
+from providers import STT_TIMEOUT, ProviderError
+from rate_limit import limiter
+
+DEEPGRAM_LIVE_URL = os.getenv("DEEPGRAM_LIVE_URL", "wss://api.deepgram.com/v1/listen")
+# Silence that ends an utterance
+ENDPOINTING_MS = int(os.getenv("STT_ENDPOINTING_MS", 300))
+# Deepgram drops idle streams after ~10s, so ping while the mic is quiet
+KEEPALIVE_SECONDS = 5.0
+
+
+@dataclass
+class Transcript:
+    text: str
+    # True once the utterance is over; the text is then what the player said
+    final: bool
+
+
+class TranscriptStream(ABC):
+    """One live utterance stream. send() audio, finalize() on push-to-talk release, iterate for transcripts."""
+
+    def __init__(self):
+        self._results: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    @abstractmethod
+    async def send(self, frame: bytes):
+        ...
+
+    @abstractmethod
+    async def finalize(self):
+        ...
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            self._results.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Transcript:
+        item = await self._results.get()
+        if item is None:
+            self._results.put_nowait(None)
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class DeepgramStream(TranscriptStream):
+    def __init__(self, ws):
+        super().__init__()
+        self.ws = ws
+        self._segments: List[str] = []
+        self._last_send = asyncio.get_running_loop().time()
+        self._reader = asyncio.create_task(self._read())
+        self._keepalive = asyncio.create_task(self._keep_alive())
+
+    async def send(self, frame: bytes):
+        self._last_send = asyncio.get_running_loop().time()
+        await self.ws.send(frame)
+
+    async def finalize(self):
+        await self.ws.send(json.dumps({"type": "Finalize"}))
+
+    def _end_utterance(self):
+        text = " ".join(self._segments).strip()
+        self._segments = []
+        if text:
+            self._results.put_nowait(Transcript(text, True))
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                msg = json.loads(message)
+                if msg.get("type") == "UtteranceEnd":
+                    self._end_utterance()
+                    continue
+                if msg.get("type") != "Results":
+                    continue
+                text = msg["channel"]["alternatives"][0]["transcript"]
+                if msg.get("is_final"):
+                    if text:
+                        self._segments.append(text)
+                    if msg.get("speech_final") or msg.get("from_finalize"):
+                        self._end_utterance()
+                elif text:
+                    self._results.put_nowait(Transcript(" ".join(self._segments + [text]), False))
+        except Exception as e:
+            if not self.closed:
+                self._results.put_nowait(ProviderError(f"Deepgram stream failed: {e!r}"))
+        finally:
+            await super().close()
+
+    async def _keep_alive(self):
+        loop = asyncio.get_running_loop()
+        while not self.closed:
+            await asyncio.sleep(KEEPALIVE_SECONDS)
+            if loop.time() - self._last_send >= KEEPALIVE_SECONDS:
+                try:
+                    await self.ws.send(json.dumps({"type": "KeepAlive"}))
+                except Exception:
+                    return
+
+    async def close(self):
+        if self.closed:
+            return
+        self._keepalive.cancel()
+        try:
+            await self.ws.send(json.dumps({"type": "CloseStream"}))
+            # Deepgram flushes the remaining results, then closes its side
+            await asyncio.wait_for(asyncio.shield(self._reader), 2.0)
+        except Exception:
+            pass
+        await self.ws.close()
+        await super().close()
+
+
+class DeepgramStreamingSTT:
+    def __init__(self, api_key: Optional[str] = None, url: str = DEEPGRAM_LIVE_URL, timeout: float = STT_TIMEOUT):
+        self.api_key = api_key or os.getenv("DEEPGRAM_API_KEY")
+        self.url = url
+        self.timeout = timeout
+
+    async def open(self, sample_rate: int = TARGET_SAMPLE_RATE) -> TranscriptStream:
+        # websockets is only needed for live mode, so it is imported on first use
+        from websockets.asyncio.client import connect
+
+        if not self.api_key:
+            raise ProviderError("DEEPGRAM_API_KEY not set")
+        await limiter.acquire("deepgram")
+        params = {
+            "encoding": "linear16", "sample_rate": sample_rate, "channels": 1, "language": "en",
+            "punctuate": "true", "interim_results": "true", "endpointing": ENDPOINTING_MS, "utterance_end_ms": 1000,
+        }
+        try:
+            ws = await asyncio.wait_for(
+                connect(f"{self.url}?{urlencode(params)}", additional_headers={"Authorization": f"Token {self.api_key}"}),
+                self.timeout,
+            )
+        except Exception as e:
+            raise ProviderError(f"Deepgram live connection failed: {e!r}") from e
+        return DeepgramStream(ws)
+
+
+class LocalStream(TranscriptStream):
+    def __init__(self, script: List[str], sample_rate: int, silence_ms: int):
+        super().__init__()
+        self.script = script
+        self.sample_rate = sample_rate
+        self.silence_ms = silence_ms
+        self.turn = 0
+        self.speech_ms = 0.0
+        self.silent_ms = 0.0
+
+    def _line(self) -> str:
+        return self.script[self.turn % len(self.script)]
+
+    def _end_utterance(self):
+        if self.speech_ms:
+            self._results.put_nowait(Transcript(self._line(), True))
+            self.turn += 1
+        self.speech_ms = self.silent_ms = 0.0
+
+    async def send(self, frame: bytes):
+        samples = np.frombuffer(frame[: len(frame) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+        if not samples.size:
+            return
+        ms = samples.size * 1000.0 / self.sample_rate
+        level = 10 * np.log10(float(np.mean(samples * samples)) + 1e-12)
+        if level >= VAD_THRESHOLD_DB:
+            self.speech_ms += ms
+            self.silent_ms = 0.0
+            # Interim result: reveal the scripted line word by word, one word per ~150ms of speech
+            words = self._line().split()
+            self._results.put_nowait(Transcript(" ".join(words[: max(1, int(self.speech_ms // 150))]), False))
+        elif self.speech_ms:
+            self.silent_ms += ms
+            if self.silent_ms >= self.silence_ms:
+                self._end_utterance()
+
+    async def finalize(self):
+        self._end_utterance()
+
+
+class LocalStreamingSTT:
+    """Offline stand-in: detects utterances by energy and "recognizes" them as the next scripted line."""
+
+    def __init__(self, script: Optional[List[str]] = None, silence_ms: int = ENDPOINTING_MS):
+        self.script = script or os.getenv("GM_LOCAL_STT_SCRIPT", "I look around.|I open the door.").split("|")
+        self.silence_ms = silence_ms
+
+    async def open(self, sample_rate: int = TARGET_SAMPLE_RATE) -> TranscriptStream:
+        return LocalStream(self.script, sample_rate, self.silence_ms)
+
+
+def get_streaming_stt():
+    # GM_STREAMING_STT=local runs live mode without Deepgram
+    if os.getenv("GM_STREAMING_STT", "deepgram") == "local":
+        return LocalStreamingSTT()
+    return DeepgramStreamingSTT()
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# main.py refuses to start without these; the tests never reach the real providers
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("LIVEKIT_API_KEY", "test")
+os.environ.setdefault("LIVEKIT_API_SECRET", "test")
+os.environ.setdefault("SERVER_TIMING", "0")
+# Shutdown snapshots the GM sessions: keep test sessions out of the real snapshot file
+os.environ.setdefault("GM_SESSION_SNAPSHOT", os.path.join(tempfile.mkdtemp(prefix="gm-sessions-"), "gm_sessions.json"))
@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import suppress
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+import main
+from admission import stages
+
+
+class FakeTTS:
+    api_key = "test"
+
+    def __init__(self):
+        self.closed = 0
+
+    async def stream(self, text, fmt="mp3"):
+        try:
+            for word in text.split():
+                yield word.encode()
+        finally:
+            self.closed += 1
+
+
+def http_scope(path):
+    return {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": [], "client": ("test", 1), "server": ("test", 80)}
+
+
+async def disconnect_before_body(path, spec_version):
+    """Run one request whose client is gone before the response body starts."""
+    scope = http_scope(path)
+    scope["asgi"]["spec_version"] = spec_version
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            if spec_version == "2.4":
+                raise OSError("connection reset")  # ASGI 2.4 servers fail the send
+            await asyncio.Event().wait()  # older servers: the disconnect listener cancels the send
+
+    with suppress(ClientDisconnect):
+        await main.app(scope, receive, send)
+
+
+@pytest.mark.parametrize("spec_version", ["2.4", "2.0"])
+def test_early_disconnect_releases_tts_slot(monkeypatch, spec_version):
+    fake = FakeTTS()
+    monkeypatch.setattr(main, "tts", fake)
+    limiter = stages["tts"]
+
+    async def run():
+        # More early disconnects than there are slots: every one must give its slot back
+        for _ in range(limiter.concurrency + 2):
+            clip_id = main.remember_clip("a short narration")
+            await disconnect_before_body(f"/api/gm/audio/{clip_id}", spec_version)
+        return limiter.in_flight
+
+    assert asyncio.run(run()) == 0
+    assert fake.closed == limiter.concurrency + 2
+
+
+def test_early_disconnect_releases_llm_slot(monkeypatch):
+    limiter = stages["llm"]
+
+    async def run():
+        for _ in range(limiter.concurrency + 2):
+            scope = http_scope("/api/gm/stream")
+            scope.update(method="POST", headers=[(b"content-type", b"application/json")])
+            body = b'{"world": {}, "history": [], "universe": "fantasy", "player_input": "look around"}'
+            messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+            async def receive(messages=messages):
+                return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    raise OSError("connection reset")
+
+            with suppress(ClientDisconnect):
+                await main.app(scope, receive, send)
+        return limiter.in_flight
+
+    assert asyncio.run(run()) == 0
+
+
+def test_full_stream_releases_slot(monkeypatch):
+    monkeypatch.setattr(main, "tts", FakeTTS())
+    from fastapi.testclient import TestClient
+
+    clip_id = main.remember_clip("hello brave adventurer")
+    with TestClient(main.app) as client:
+        resp = client.get(f"/api/gm/audio/{clip_id}")
+    assert resp.status_code == 200
+    assert resp.content == b"hellobraveadventurer"
+    assert stages["tts"].in_flight == 0
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from audio_preprocess import TARGET_SAMPLE_RATE, resample, trim_silence
+
+
+def tone(freq, rate, seconds=1.0, amplitude=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def gain_db(out, amplitude=0.5):
+    # Middle half only, away from the filter's start-up and tail
+    middle = out[len(out) // 4: -len(out) // 4]
+    return 20 * np.log10(np.sqrt(np.mean(middle * middle)) / (amplitude / np.sqrt(2)) + 1e-12)
+
+
+@pytest.mark.parametrize("rate", [22050, 44100, 48000])
+def test_resample_keeps_speech_band_and_rejects_aliases(rate):
+    assert abs(gain_db(resample(tone(1000, rate), rate))) < 0.1
+    # 12 kHz is above the 8 kHz output Nyquist; unfiltered it would fold back to 4 kHz
+    assert gain_db(resample(tone(12000, rate), rate)) < -60
+
+
+def test_resample_length_and_alignment():
+    impulse = np.zeros(48000, np.float32)
+    impulse[24000] = 1.0
+    out = resample(impulse, 48000)
+    assert len(out) == TARGET_SAMPLE_RATE
+    assert np.argmax(np.abs(out)) == 8000
+
+
+def test_sub_frame_clip_is_judged_by_its_energy():
+    # 5ms is shorter than one 20ms VAD frame
+    assert len(trim_silence(np.full(80, 1e-4, np.float32))) == 0
+    assert len(trim_silence(tone(440, TARGET_SAMPLE_RATE, seconds=0.005))) == 80
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+
+
+class CountingTTS:
+    api_key = "test"
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def stream(self, text, fmt="mp3"):
+        self.calls += 1
+        for word in text.split():
+            await asyncio.sleep(self.delay)
+            yield word.encode()
+
+
+def test_clip_audio_is_synthesized_once(monkeypatch):
+    fake = CountingTTS()
+    monkeypatch.setattr(main, "tts", fake)
+    clip_id = main.remember_clip("the dragon wakes")
+
+    with TestClient(main.app) as client:
+        # Browsers re-request media (range probes, retries); only the first reaches Murf
+        bodies = [client.get(f"/api/gm/audio/{clip_id}").content for _ in range(3)]
+    assert bodies == [b"thedragonwakes"] * 3
+    assert fake.calls == 1
+
+
+def test_concurrent_requests_share_one_synthesis(monkeypatch):
+    fake = CountingTTS(delay=0.02)
+    monkeypatch.setattr(main, "tts", fake)
+    clip_id = main.remember_clip("the torch gutters out")
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get(f"/api/gm/audio/{clip_id}") for _ in range(3)))
+
+    responses = asyncio.run(run())
+    assert [r.content for r in responses] == [b"thetorchguttersout"] * 3
+    assert fake.calls == 1
+
+
+def test_arbitrary_text_cannot_be_voiced():
+    with TestClient(main.app) as client:
+        assert client.post("/api/gm/speech", json={"text": "free speech"}).status_code in (404, 405)
+        assert client.get("/api/gm/audio/not-a-clip").status_code == 404
+
+
+def test_murf_request_matches_days9_client(monkeypatch):
+    import providers
+
+    seen = {}
+
+    def handler(request):
+        seen["headers"] = request.headers
+        seen["body"] = request.read()
+        return httpx.Response(200, content=b"ID3audio")
+
+    monkeypatch.setitem(providers._clients, "murf", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    tts = providers.MurfTTS(api_key="secret")
+
+    async def run():
+        return b"".join([chunk async for chunk in tts.stream("hello", "mp3")])
+
+    assert asyncio.run(run()) == b"ID3audio"
+    assert seen["headers"]["api-key"] == "secret"
+    assert "authorization" not in seen["headers"]
+    body = json.loads(seen["body"])
+    assert body["voiceId"] == "en-US-matthew" and body["text"] == "hello" and body["format"] == "MP3"
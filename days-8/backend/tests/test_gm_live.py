@@ -0,0 +1,86 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from streaming_stt import LocalStreamingSTT
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+NARRATION = "The torch flares to life. Shadows scatter across the walls. What do you do next?"
+
+
+class ScriptedLLM:
+    async def stream(self, prompt):
+        # Chunk boundaries deliberately fall mid-sentence, like a real token stream
+        for i in range(0, len(NARRATION), 7):
+            yield NARRATION[i:i + 7]
+
+
+class EchoTTS:
+    api_key = "test"
+
+    async def synthesize(self, text):
+        return text.encode()
+
+
+def pcm_frame(amplitude):
+    t = np.arange(SAMPLE_RATE * FRAME_MS // 1000) / SAMPLE_RATE
+    return (amplitude * 32767 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+
+def test_live_turn_event_order(monkeypatch):
+    monkeypatch.setattr(main, "llm", ScriptedLLM())
+    monkeypatch.setattr(main, "tts", EchoTTS())
+    monkeypatch.setattr(main, "live_stt", LocalStreamingSTT(script=["I light the torch."], silence_ms=100))
+
+    with TestClient(main.app) as client, client.websocket_connect(f"/api/gm/live?sample_rate={SAMPLE_RATE}") as ws:
+        assert ws.receive_json()["type"] == "session"
+        # 400ms of tone then 200ms of silence: the endpointer closes the utterance on its own
+        for _ in range(20):
+            ws.send_bytes(pcm_frame(0.3))
+        for _ in range(10):
+            ws.send_bytes(pcm_frame(0.0))
+        events = []
+        while not events or events[-1]["type"] != "done":
+            events.append(ws.receive_json())
+        ws.send_json({"type": "stop"})
+
+    transcripts = [e for e in events if e["type"] == "transcript"]
+    assert transcripts[-1] == {"type": "transcript", "text": "I light the torch.", "final": True}
+    assert not any(t["final"] for t in transcripts[:-1])
+    narration = events[len(transcripts):]
+    # Nothing is narrated before the final transcript
+    assert all(e["type"] in ("sentence", "audio", "done") for e in narration)
+
+    sentences = [e for e in narration if e["type"] == "sentence"]
+    audio = [e for e in narration if e["type"] == "audio"]
+    assert " ".join(s["text"] for s in sentences) == NARRATION
+    assert [a["index"] for a in audio] == list(range(len(sentences)))
+    # Each sentence's text goes out before its audio
+    position = {(e["type"], e.get("index")): i for i, e in enumerate(narration)}
+    assert all(position["sentence", i] < position["audio", i] for i in range(len(sentences)))
+    assert narration[-1]["narration"] == NARRATION
+    assert {"op": "replace", "path": "/turn", "value": 2} in narration[-1]["delta"]
+
+
+def test_bad_control_messages_get_an_error_frame(monkeypatch):
+    monkeypatch.setattr(main, "llm", ScriptedLLM())
+    monkeypatch.setattr(main, "tts", EchoTTS())
+    monkeypatch.setattr(main, "live_stt", LocalStreamingSTT(script=["I light the torch."], silence_ms=100))
+
+    with TestClient(main.app) as client, client.websocket_connect(f"/api/gm/live?sample_rate={SAMPLE_RATE}") as ws:
+        assert ws.receive_json()["type"] == "session"
+        for text in ("[]", '"end"', "42", "not json"):
+            ws.send_text(text)
+            assert ws.receive_json()["type"] == "error"
+        # The connection is still live: a push-to-talk turn goes through as usual
+        for _ in range(20):
+            ws.send_bytes(pcm_frame(0.3))
+        ws.send_json({"type": "end"})
+        events = []
+        while not events or events[-1]["type"] != "done":
+            events.append(ws.receive_json())
+        ws.send_json({"type": "stop"})
+
+    assert {"type": "transcript", "text": "I light the torch.", "final": True} in events
+    assert events[-1]["narration"] == NARRATION
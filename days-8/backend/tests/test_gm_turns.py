@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import httpx
+
+import main
+
+
+class FailingLLM:
+    async def generate(self, prompt, priority=None):
+        raise RuntimeError("quota exceeded")
+
+
+class GatedLLM:
+    """Holds every turn until released, so a second turn can arrive while the first is running."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def generate(self, prompt, priority=None):
+        self.started.set()
+        await self.release.wait()
+        return "The door opens."
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def test_gemini_failure_is_an_error_and_leaves_the_session_alone(monkeypatch):
+    monkeypatch.setattr(main, "llm", FailingLLM())
+    session = main.sessions.create("fantasy")
+
+    async def run():
+        async with client() as c:
+            return await c.post("/api/gm", json={"session_id": session.id, "player_input": "I open the door"})
+
+    response = asyncio.run(run())
+    assert response.status_code == 502
+    assert session.history == []
+    assert session.world == {"turn": 1}
+    # The error text is never queued for speech
+    assert not any("quota" in text for text in main.pending_clips.values())
+
+
+def test_overlapping_turns_on_one_session_are_rejected(monkeypatch):
+    session = main.sessions.create("fantasy")
+    body = {"session_id": session.id, "player_input": "I open the door"}
+
+    async def run():
+        llm = GatedLLM()
+        monkeypatch.setattr(main, "llm", llm)
+        async with client() as c:
+            first = asyncio.create_task(c.post("/api/gm", json=body))
+            await llm.started.wait()
+            second = await c.post("/api/gm", json=body)
+            stream = await c.post("/api/gm/stream", json=body)
+            llm.release.set()
+            first = await first
+            # The session is free again once the first turn is done
+            third = await c.post("/api/gm", json=body)
+        return first, second, stream, third
+
+    first, second, stream, third = asyncio.run(run())
+    assert (first.status_code, second.status_code, stream.status_code, third.status_code) == (200, 409, 409, 200)
+    assert session.world["turn"] == 3
+    assert len(session.history) == 4
+
+
+def test_first_llm_use_before_warm_up_does_not_block_the_loop(monkeypatch):
+    monkeypatch.setattr(main, "llm", None)
+    gated = GatedLLM()
+
+    def slow_load():
+        # Stands in for the ~1s google.generativeai import
+        time.sleep(0.3)
+        main.llm = gated
+        return gated
+
+    monkeypatch.setattr(main, "_load_llm", slow_load)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        loaded = await main.get_llm()
+        ticker.cancel()
+        return loaded, ticks
+
+    loaded, ticks = asyncio.run(run())
+    assert loaded is gated
+    assert ticks >= 10
@@ -0,0 +1,63 @@
+import asyncio
+
+import main
+from narration import narrate_stream
+
+TEXT = "The door creaks open. A cold wind blows. Something moves in the dark."
+
+
+class ScriptedLLM:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+
+    async def stream(self, prompt):
+        for i, word in enumerate(TEXT.split(" ")):
+            if i == self.fail_after:
+                raise RuntimeError("quota exceeded")
+            yield word + " "
+
+
+class FlakyTTS:
+    async def synthesize(self, text):
+        if "wind" in text:
+            raise RuntimeError("Murf 500")
+        return text.encode()
+
+
+def collect(llm, tts):
+    async def run():
+        # A hang here (no terminal event) fails the test instead of blocking it
+        return await asyncio.wait_for(_list(narrate_stream(llm, tts, "prompt")), 2.0)
+
+    return asyncio.run(run())
+
+
+async def _list(stream):
+    return [event async for event in stream]
+
+
+def test_failed_sentence_tts_gets_no_audio_and_the_stream_still_ends():
+    events = collect(ScriptedLLM(), FlakyTTS())
+    audio = {data["index"]: data["audio"] for kind, data in events if kind == "audio"}
+    assert audio == {0: b"The door creaks open.", 1: None, 2: b"Something moves in the dark."}
+    assert events[-1] == ("done", {"narration": TEXT})
+
+
+def test_llm_error_is_terminal():
+    events = collect(ScriptedLLM(fail_after=6), FlakyTTS())
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "error"
+    assert "done" not in kinds
+
+
+def test_failed_stream_turn_does_not_advance_the_session(monkeypatch):
+    monkeypatch.setattr(main, "llm", ScriptedLLM(fail_after=6))
+    session = main.sessions.create("fantasy")
+
+    async def run():
+        return await _list(main.narrate_turn(session, session.world, "I open the door", "prompt", "test"))
+
+    events = asyncio.run(run())
+    assert events[-1][0] == "error"
+    assert session.history == []
+    assert session.world["turn"] == 1
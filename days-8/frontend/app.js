@@ -67,7 +67,7 @@ async function callLocalLLM(prompt, playerText) {
     const data = await res.json();
     return data;
   } catch (e) {
-    return { narration: '[Backend unavailable] ' + e.message, update: { ...world, turn: world.turn + 1 } };
+    return { narration: '[Backend unavailable] ' + e.message, update: world };
   }
 }
 
@@ -7,12 +7,42 @@ interface WorldState {
   [key: string]: any;
 }
 
+type PatchOp = { op: 'add' | 'replace' | 'remove'; path: string; value?: any };
+
 interface GMResponse {
   narration: string;
-  update: Partial<WorldState>;
-  audio_base64?: string;
+  player_input?: string;
+  // Stateless replies carry the whole world; session replies only the JSON-Patch delta
+  update?: Partial<WorldState>;
+  session_id?: string;
+  delta?: PatchOp[];
+  audio_url?: string;
 }
 
+const API = 'http://localhost:8008';
+
+// Apply the server's JSON-Patch (RFC 6902) ops to a copy of the world. The server only emits
+// add/replace/remove on object keys (lists are replaced whole), so that is all this handles.
+const applyDelta = (world: WorldState, ops: PatchOp[]): WorldState => {
+  const next = structuredClone(world);
+  for (const { op, path, value } of ops) {
+    const keys = path.split('/').slice(1).map((k) => k.replace(/~1/g, '/').replace(/~0/g, '~'));
+    const last = keys.pop();
+    if (last === undefined) continue;
+    let target: any = next;
+    for (const key of keys) {
+      if (typeof target[key] !== 'object' || target[key] === null) target[key] = {};
+      target = target[key];
+    }
+    if (op === 'remove') delete target[last];
+    else target[last] = value;
+  }
+  return next;
+};
+
+const applyResponse = (world: WorldState, res: GMResponse): WorldState =>
+  res.delta ? applyDelta(world, res.delta) : { ...world, ...res.update };
+
 const defaultWorld = (universe: string): WorldState => ({
   location:
     universe === 'fantasy'
@@ -46,7 +76,13 @@ function GameMaster() {
         turn: 1,
       };
     }
-  const [history, setHistory] = useState<{ role: string; text: string }[]>([]);
+  // Server-side session: history and world live on the backend, each turn sends only the new input
+  const sessionIdRef = useRef<string | null>(null);
+  // Latest values for session creation from callbacks that outlive a render (live mode)
+  const worldRef = useRef(world);
+  worldRef.current = world;
+  const universeRef = useRef(universe);
+  universeRef.current = universe;
   const [exchangeCount, setExchangeCount] = useState(0);
   const [gmMessages, setGMMessages] = useState<string[]>([]);
   const [playerMessages, setPlayerMessages] = useState<string[]>([]);
@@ -73,44 +109,62 @@ function GameMaster() {
     window.speechSynthesis.speak(u);
   };
 
-  const createPrompt = (playerText: string) => {
-    return `You are a creative Game Master for a ${universe} scenario. Keep scenes short and vivid. Maintain a consistent world state in JSON: ${JSON.stringify(
-      world
-    )}. Player said: "${playerText}". Respond with a short narration (1-3 sentences) and end by asking "What do you do next?". Also include a one-line JSON_UPDATE block that describes any changes to the world state in JSON.`;
+  // Create the backend session on the first turn, seeded with the current world
+  const ensureSession = async (): Promise<string> => {
+    if (sessionIdRef.current) return sessionIdRef.current;
+    const res = await fetch(API + '/api/gm/session', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ universe: universeRef.current, world: worldRef.current }),
+    });
+    if (!res.ok) throw new Error('Could not start session');
+    const data = await res.json();
+    sessionIdRef.current = data.session_id;
+    return data.session_id;
   };
 
-  const callLocalLLM = async (prompt: string, playerText: string, audioBlob?: Blob): Promise<GMResponse> => {
-    try {
-      let res;
+  const endSession = () => {
+    const id = sessionIdRef.current;
+    sessionIdRef.current = null;
+    if (id) fetch(`${API}/api/gm/session/${id}`, { method: 'DELETE' }).catch(() => {});
+  };
+
+  // One GM turn: session_id plus the new input (text, or audio for the server to transcribe)
+  const postTurn = async (playerText: string, audioBlob?: Blob): Promise<Response> => {
+    const send = async () => {
+      const sessionId = await ensureSession();
       if (audioBlob) {
         const formData = new FormData();
         formData.append('audio', audioBlob, 'input.wav');
-        formData.append('history', JSON.stringify(history));
-        formData.append('world', JSON.stringify(world));
-        formData.append('universe', universe);
+        formData.append('session_id', sessionId);
         // player_input left blank, will be filled by STT
-        res = await fetch('http://localhost:8008/api/gm', {
-          method: 'POST',
-          body: formData,
-        });
-      } else {
-        res = await fetch('http://localhost:8008/api/gm', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            history,
-            world,
-            universe,
-            player_input: playerText,
-          }),
-        });
+        return fetch(API + '/api/gm', { method: 'POST', body: formData });
       }
+      return fetch(API + '/api/gm', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session_id: sessionId, player_input: playerText }),
+      });
+    };
+    let res = await send();
+    if (res.status === 404) {
+      // Session expired on the server: start a fresh one from the local world and retry once
+      sessionIdRef.current = null;
+      res = await send();
+    }
+    return res;
+  };
+
+  const callLocalLLM = async (playerText: string, audioBlob?: Blob): Promise<GMResponse> => {
+    try {
+      const res = await postTurn(playerText, audioBlob);
       if (!res.ok) throw new Error('Backend error');
       return await res.json();
     } catch (e: any) {
       return {
         narration: '[Backend unavailable] ' + e.message,
-        update: { ...world, turn: world.turn + 1 },
+        // A failed turn doesn't advance the world
+        update: world,
       };
     }
   };
@@ -235,26 +289,17 @@ function GameMaster() {
         setAgentState('thinking');
         const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
         setTranscript('Recognizing...');
-        const formData = new FormData();
-        formData.append('audio', audioBlob, 'input.wav');
-        formData.append('history', JSON.stringify(history));
-        formData.append('world', JSON.stringify(world));
-        formData.append('universe', universe);
-        const res = await fetch('http://localhost:8008/api/gm', {
-          method: 'POST',
-          body: formData,
-        });
-        if (res.ok) {
-          const data = await res.json();
+        const res = await postTurn('', audioBlob).catch(() => null);
+        if (res && res.ok) {
+          const data: GMResponse = await res.json();
           setTranscript(data.player_input || '[No speech detected]');
           setGMMessages((msgs) => [...msgs, '...thinking...']);
           setPlayerMessages((msgs) => [...msgs, data.player_input || '']);
-          setHistory((h) => [...h, { role: 'player', text: data.player_input || '' }]);
           setExchangeCount((c) => c + 1);
-          setWorld((w) => ({ ...w, ...data.update }));
+          setWorld((w) => applyResponse(w, data));
           setAgentState('speaking');
-          if (data.audio_base64) {
-            const audio = new Audio('data:audio/mp3;base64,' + data.audio_base64);
+          if (data.audio_url) {
+            const audio = new Audio(API + data.audio_url);
             audio.onended = () => {
               setAgentState('ready');
               if (liveSessionRef.current) startUtterance();
@@ -268,7 +313,6 @@ function GameMaster() {
             }, 2000);
           }
           setGMMessages((msgs) => [...msgs.slice(0, -1), data.narration]);
-          setHistory((h) => [...h, { role: 'gm', text: data.narration }]);
           if (exchangeCount + 1 >= 15) {
             setGMMessages((msgs) => [...msgs, 'Session complete. Thanks for playing!']);
             speakText('Session complete. Thanks for playing!');
@@ -327,7 +371,6 @@ function GameMaster() {
 
   const onPlayerInput = async (text: string, audioBlob?: Blob) => {
     setPlayerMessages((msgs) => [...msgs, text]);
-    setHistory((h) => [...h, { role: 'player', text }]);
     setExchangeCount((c) => c + 1);
     setGMMessages((msgs) => [...msgs, '...thinking...']);
     setAgentState('thinking');
@@ -340,21 +383,19 @@ function GameMaster() {
       else if (universe === 'sci-fi') setSuggestedActions(['Scan the area', 'Check the console', 'Open the airlock']);
       else setSuggestedActions(['Inspect the room', 'Call out', 'Check your pockets']);
     }
-    const prompt = createPrompt(text);
-    const res = await callLocalLLM(prompt, text, audioBlob);
+    const res = await callLocalLLM(text, audioBlob);
     setGMMessages((msgs) => [...msgs.slice(0, -1), res.narration]);
-    setWorld((w) => ({ ...w, ...res.update }));
+    setWorld((w) => applyResponse(w, res));
     setAgentState('speaking');
     // Play TTS audio from backend if present, else use browser TTS
-    if (res.audio_base64) {
-      const audio = new Audio('data:audio/mp3;base64,' + res.audio_base64);
+    if (res.audio_url) {
+      const audio = new Audio(API + res.audio_url);
       audio.onended = () => setAgentState('ready');
       audio.play();
     } else {
       speakText(res.narration);
       setTimeout(() => setAgentState('ready'), 2000);
     }
-    setHistory((h) => [...h, { role: 'gm', text: res.narration }]);
     // Always show suggestions after agent response
     setShowSuggestions(true);
     if (universe === 'fantasy') setSuggestedActions(['Look around', 'Talk to a villager', 'Check inventory']);
@@ -368,8 +409,9 @@ function GameMaster() {
   };
 
   const handleStart = () => {
+    // A new game gets a new session, created on its first turn from the fresh world
+    endSession();
     setWorld(defaultWorldWithUser(universe, selectedUser));
-    setHistory([]);
     setExchangeCount(0);
     setGMMessages([]);
     setPlayerMessages([]);
@@ -405,7 +447,11 @@ function GameMaster() {
           <select
             id="universe"
             value={universe}
-            onChange={(e) => setUniverse(e.target.value)}
+            onChange={(e) => {
+              setUniverse(e.target.value);
+              // The session is bound to a universe; the next turn starts one in the new universe
+              endSession();
+            }}
             disabled={exchangeCount > 0}
           >
             <option value="fantasy">Fantasy</option>
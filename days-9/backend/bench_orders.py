@@ -0,0 +1,29 @@
+# Throughput of one-at-a-time create_order vs batched create_orders.
+# Runs against a throwaway order log: python bench_orders.py
+import os
+import tempfile
+import time
+
+os.environ["ORDERS_LOG"] = os.path.join(tempfile.mkdtemp(), "orders.jsonl")
+
+import catalog  # noqa: E402
+
+LINE_ITEMS = [{"product_id": "mug-001", "quantity": 2}, {"product_id": "hoodie-001", "quantity": 1, "size": "M"}]
+
+
+def bench(n: int):
+    start = time.perf_counter()
+    for _ in range(n):
+        catalog.create_order(LINE_ITEMS)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = catalog.create_orders([{"line_items": LINE_ITEMS}] * n)
+    batched = time.perf_counter() - start
+    assert all(r["ok"] for r in results)
+    print(f"{n:>6} orders | single: {n / single:>9.0f} orders/s | batch: {n / batched:>9.0f} orders/s | speedup {single / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    for n in (1, 100, 10000):
+        bench(n)
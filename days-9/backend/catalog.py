@@ -1,9 +1,16 @@
 # Product catalog and order management for Day 9 ACP-inspired agent
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import logging
+import threading
+from array import array
+from collections import defaultdict, deque
+from datetime import date, datetime
+from itertools import islice
+from typing import Deque, Iterator, List, Dict, Optional
 import os
 
+logger = logging.getLogger(__name__)
+
 CATALOG_FILE = os.path.join(os.path.dirname(__file__), 'products.json')
 ORDERS_FILE = os.path.join(os.path.dirname(__file__), 'orders.json')
 
@@ -19,12 +26,33 @@ if not os.path.exists(CATALOG_FILE):
     with open(CATALOG_FILE, 'w', encoding='utf-8') as f:
         json.dump(PRODUCTS, f, indent=2)
 
-# In-memory orders (for session)
-ORDERS: List[Dict] = []
+# Orders live in an append-only JSON-lines log; only the most recent ones are kept in memory
+ORDERS_LOG = os.getenv("ORDERS_LOG", os.path.join(os.path.dirname(__file__), 'orders.jsonl'))
+RECENT_ORDERS_LIMIT = int(os.getenv("RECENT_ORDERS_LIMIT", 200))
+ORDERS: Deque[Dict] = deque(maxlen=RECENT_ORDERS_LIMIT)
+ORDER_OFFSETS = array('q')
+ORDER_SEQ = 0
+_ORDERS_LOCK = threading.Lock()
+
+# Running aggregates, updated as each order is indexed so voice queries never rescan the log
+SPEND_BY_DAY: Dict[str, int] = defaultdict(int)
+
+# Parsed catalog, reloaded only when products.json changes on disk
+_CATALOG_CACHE = {"mtime": None, "products": [], "by_id": {}}
+
+def _refresh_catalog():
+    mtime = os.stat(CATALOG_FILE).st_mtime_ns
+    if mtime != _CATALOG_CACHE["mtime"]:
+        with open(CATALOG_FILE, 'r', encoding='utf-8') as f:
+            products = json.load(f)
+        _CATALOG_CACHE.update(mtime=mtime, products=products, by_id={p['id']: p for p in products})
+    return _CATALOG_CACHE
 
 def load_products() -> List[Dict]:
-    with open(CATALOG_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return list(_refresh_catalog()["products"])
+
+def products_by_id() -> Dict[str, Dict]:
+    return _refresh_catalog()["by_id"]
 
 def list_products(filters: Optional[Dict] = None) -> List[Dict]:
     products = load_products()
@@ -47,27 +75,151 @@ def list_products(filters: Optional[Dict] = None) -> List[Dict]:
         return True
     return [p for p in products if match(p)]
 
-def save_order(order: Dict):
+def _order_seq(order_id) -> int:
+    try:
+        return int(str(order_id).rsplit('-', 1)[-1])
+    except ValueError:
+        return 0
+
+def _index_order(order: Dict, offset: int):
+    ORDER_OFFSETS.append(offset)
     ORDERS.append(order)
-    # Also append to file
-    if os.path.exists(ORDERS_FILE):
-        with open(ORDERS_FILE, 'r', encoding='utf-8') as f:
-            all_orders = json.load(f)
-    else:
-        all_orders = []
-    all_orders.append(order)
-    with open(ORDERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_orders, f, indent=2)
+    # created_at is ISO-8601, so the first 10 characters are the calendar day
+    SPEND_BY_DAY[str(order.get('created_at', ''))[:10]] += order.get('total', 0)
 
-def create_order(line_items: List[Dict]) -> Dict:
-    products = load_products()
+def _migrate_legacy_orders():
+    # One-time conversion of the old rewrite-everything orders.json into the append-only log
+    if os.path.exists(ORDERS_LOG) or not os.path.exists(ORDERS_FILE):
+        return
+    with open(ORDERS_FILE, 'r', encoding='utf-8') as f:
+        legacy = json.load(f)
+    tmp = ORDERS_LOG + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for order in legacy:
+            f.write(json.dumps(order) + '\n')
+    os.replace(tmp, ORDERS_LOG)
+
+def _load_order_log():
+    # Single pass at startup: byte offset of every order, the ID high-water mark, and the recent ring
+    global ORDER_SEQ
+    _migrate_legacy_orders()
+    if not os.path.exists(ORDERS_LOG):
+        return
+    with open(ORDERS_LOG, 'rb') as f:
+        offset = 0
+        line, indexed = b'', False
+        for line in f:
+            indexed = False
+            if line.strip():
+                try:
+                    order = json.loads(line)
+                except ValueError:
+                    order = None
+                if isinstance(order, dict):
+                    _index_order(order, offset)
+                    ORDER_SEQ = max(ORDER_SEQ, len(ORDER_OFFSETS), _order_seq(order.get('id')))
+                    indexed = True
+                elif line.endswith(b'\n'):
+                    # A complete but corrupt line: skip it, the orders after it are still valid
+                    logger.warning("Skipping corrupt line at byte %d of %s", offset, ORDERS_LOG)
+            offset += len(line)
+    if not line or line.endswith(b'\n'):
+        return
+    with open(ORDERS_LOG, 'rb+') as f:
+        if not indexed:
+            # Torn final write from a crash: drop the fragment, everything before it is intact
+            logger.warning("Truncating torn write at byte %d of %s", offset - len(line), ORDERS_LOG)
+            f.truncate(offset - len(line))
+        else:
+            # Last order was written without its newline: terminate it so the next append starts a new line
+            f.seek(0, os.SEEK_END)
+            f.write(b'\n')
+
+def _append_orders(orders: List[Dict]):
+    # Caller holds _ORDERS_LOCK. One write and one fsync for however many orders are passed.
+    lines = [json.dumps(o).encode('utf-8') + b'\n' for o in orders]
+    with open(ORDERS_LOG, 'ab') as f:
+        offset = f.tell()
+        f.write(b''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+    for order, line in zip(orders, lines):
+        _index_order(order, offset)
+        offset += len(line)
+
+def next_order_id() -> str:
+    global ORDER_SEQ
+    ORDER_SEQ += 1
+    return f"order-{ORDER_SEQ}"
+
+def save_order(order: Dict):
+    with _ORDERS_LOCK:
+        if not order.get('id'):
+            order['id'] = next_order_id()
+        _append_orders([order])
+
+def order_count() -> int:
+    return len(ORDER_OFFSETS)
+
+def read_orders(start: int, stop: int) -> List[Dict]:
+    """Orders [start, stop) in creation order, from the recent ring when possible, else from disk."""
+    with _ORDERS_LOCK:
+        total = len(ORDER_OFFSETS)
+        start, stop = max(0, start), min(stop, total)
+        if start >= stop:
+            return []
+        ring_start = total - len(ORDERS)
+        if start >= ring_start:
+            return list(islice(ORDERS, start - ring_start, stop - ring_start))
+        offsets = ORDER_OFFSETS[start:stop]
+    out = []
+    with open(ORDERS_LOG, 'rb') as f:
+        for offset in offsets:
+            # Seek per order: corrupt lines skipped at startup stay in the log between orders
+            if f.tell() != offset:
+                f.seek(offset)
+            out.append(json.loads(f.readline()))
+    return out
+
+def recent_orders(k: int) -> List[Dict]:
+    total = order_count()
+    return read_orders(total - k, total)
+
+def list_orders_page(offset: int = 0, limit: int = 20) -> Dict:
+    """Newest-first page of order history."""
+    total = order_count()
+    stop = total - offset
+    orders = read_orders(stop - limit, stop)
+    orders.reverse()
+    return {"orders": orders, "total": total, "offset": offset, "limit": limit}
+
+def spent_on(day: date) -> int:
+    return SPEND_BY_DAY.get(day.isoformat(), 0)
+
+def iter_orders(batch: int = 500) -> Iterator[Dict]:
+    for start in range(0, order_count(), batch):
+        yield from read_orders(start, start + batch)
+
+def _build_order(line_items: List[Dict], catalog: Dict[str, Dict], strict: bool = False) -> Dict:
+    # strict=True rejects unknown products and bad quantities instead of skipping them
+    if strict and not line_items:
+        raise ValueError("Order has no line items.")
     line_items_out = []
     total = 0
     for li in line_items:
-        prod = next((p for p in products if p['id'] == li['product_id']), None)
+        # Anything but a string id (a list or dict from a bad client) is unhashable or can't match
+        if not isinstance(li, dict) or not isinstance(li.get('product_id'), str):
+            if strict:
+                raise ValueError(f"Invalid line item: {li!r}")
+            continue
+        prod = catalog.get(li['product_id'])
         if not prod:
+            if strict:
+                raise ValueError(f"Unknown product: {li.get('product_id')}")
             continue
         qty = li.get('quantity', 1)
+        if strict and (not isinstance(qty, int) or isinstance(qty, bool) or qty < 1):
+            raise ValueError(f"Invalid quantity for {prod['id']}: {qty}")
         line_items_out.append({
             "product_id": prod['id'],
             "name": prod['name'],
@@ -77,8 +229,8 @@ def create_order(line_items: List[Dict]) -> Dict:
             **({"size": li["size"]} if "size" in li else {})
         })
         total += prod['price'] * qty
-    order = {
-        "id": f"order-{len(ORDERS)+1}",
+    return {
+        "id": None,
         "line_items": line_items_out,
         "total": total,
         "currency": line_items_out[0]['currency'] if line_items_out else 'INR',
@@ -86,15 +238,42 @@ def create_order(line_items: List[Dict]) -> Dict:
         "status": "CONFIRMED",
         "buyer": {"name": "Demo User"}
     }
+
+def create_order(line_items: List[Dict]) -> Dict:
+    order = _build_order(line_items, products_by_id())
     save_order(order)
     return order
 
+def create_orders(batch: List[Dict]) -> List[Dict]:
+    """Validate many orders against the catalog and persist the valid ones in one group commit.
+
+    Each entry is {"line_items": [...]}; the result list has one
+    {"ok": True, "order": ...} or {"ok": False, "error": ...} per entry, in order.
+    """
+    catalog = products_by_id()
+    results = []
+    valid = []
+    for req in batch:
+        if not isinstance(req, dict) or not isinstance(req.get('line_items', []), list):
+            results.append({"ok": False, "error": "Malformed order."})
+            continue
+        try:
+            order = _build_order(req.get('line_items') or [], catalog, strict=True)
+        except ValueError as e:
+            results.append({"ok": False, "error": str(e)})
+            continue
+        results.append({"ok": True, "order": order})
+        valid.append(order)
+    if valid:
+        with _ORDERS_LOCK:
+            for order in valid:
+                order['id'] = next_order_id()
+            _append_orders(valid)
+    return results
+
 def get_last_order() -> Optional[Dict]:
     if ORDERS:
         return ORDERS[-1]
-    if os.path.exists(ORDERS_FILE):
-        with open(ORDERS_FILE, 'r', encoding='utf-8') as f:
-            all_orders = json.load(f)
-            if all_orders:
-                return all_orders[-1]
     return None
+
+_load_order_log()
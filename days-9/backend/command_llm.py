@@ -0,0 +1,94 @@
+# Pluggable LLM fallback for voice commands the rule router can't handle.
+# The LLM only rephrases the utterance into a command the rules understand, so
+# orders and cart changes still go through the deterministic code path.
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from rate_limit import is_rate_limited, limiter
+
+COMMAND_LLM = os.getenv("COMMAND_LLM", "stub")
+COMMAND_LLM_MODEL = os.getenv("COMMAND_LLM_MODEL", "models/gemini-flash-lite-latest")
+LLM_FALLBACK_TIMEOUT = float(os.getenv("LLM_FALLBACK_TIMEOUT_SECONDS", 1.5))
+
+# Browsing and cart commands only: purchases need the shopper's own words, and
+# process_voice_command refuses a rewrite that buys when the original didn't ask to
+REWRITE_PROMPT = (
+    "You turn a shopper's request into exactly one of these commands: "
+    "'show <category>s', 'show <category>s under <price>', 'add <product> to cart', "
+    "'remove <product> from cart', 'show my cart', 'last order', 'order history', "
+    "'total spent today'. Categories: mug, hoodie, tshirt, jeans, saree, shoes, watch, bag, laptop, mobile, tv. "
+    "Never output a purchase or checkout. "
+    "Reply with only the command, or NONE if the request is not about shopping.\n"
+    "Shopper: {text}"
+)
+
+
+class CommandLLM(ABC):
+    name = "base"
+
+    @abstractmethod
+    def rewrite(self, text: str) -> Optional[str]:
+        """The utterance as one rule-router command, or None if it isn't about shopping."""
+
+
+class StubCommandLLM(CommandLLM):
+    """Local stand-in: maps common paraphrases onto the rule vocabulary, no network.
+
+    It only renames products and read-only requests. Turning loose phrases such as "grab me
+    a coffee cup" into "buy" or "checkout" would place real orders from small talk, so
+    purchases need the shopper's own words or a real LLM.
+    """
+
+    name = "stub"
+    SYNONYMS = [
+        (re.compile(r"\b(cups?|coffee cups?)\b"), "mug"),
+        (re.compile(r"\b(sweatshirts?|hoodies?)\b"), "hoodie"),
+        (re.compile(r"\b(tees?|t shirts?)\b"), "tshirt"),
+        (re.compile(r"\b(basket|trolley|bag so far)\b"), "cart"),
+        (re.compile(r"\b(purchase history|past purchases|previous orders)\b"), "order history"),
+    ]
+
+    def rewrite(self, text: str) -> Optional[str]:
+        out = text.lower()
+        for pattern, replacement in self.SYNONYMS:
+            out = pattern.sub(replacement, out)
+        return out if out != text.lower() else None
+
+
+class GeminiCommandLLM(CommandLLM):
+    name = "gemini"
+
+    def __init__(self, model_name: str = COMMAND_LLM_MODEL):
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name.replace("models/", "")
+
+    def rewrite(self, text: str) -> Optional[str]:
+        # Runs on the fallback thread, so wait for quota synchronously; the caller's timeout still applies
+        limiter.acquire_sync("gemini", self.model_name)
+        try:
+            # The caller stops waiting after LLM_FALLBACK_TIMEOUT; the request gives up too, freeing the worker
+            response = self.model.generate_content(REWRITE_PROMPT.format(text=text),
+                                                   request_options={"timeout": LLM_FALLBACK_TIMEOUT})
+        except Exception as e:
+            # No retry here: the rule router's answer is the fallback
+            if is_rate_limited(e):
+                limiter.rate_limited("gemini", self.model_name)
+            raise
+        command = (response.text or "").strip().strip("'\"").lower()
+        return None if not command or command == "none" else command
+
+
+_command_llm: Optional[CommandLLM] = None
+
+
+def get_command_llm() -> Optional[CommandLLM]:
+    """Shared fallback instance selected by COMMAND_LLM (stub, gemini or none)."""
+    global _command_llm
+    if _command_llm is None and COMMAND_LLM != "none":
+        _command_llm = GeminiCommandLLM() if COMMAND_LLM == "gemini" else StubCommandLLM()
+    return _command_llm
@@ -1,166 +1,274 @@
 
+import asyncio
+import os
 import re
-from catalog import list_products, create_order, get_last_order
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, Optional, Tuple
+from catalog import list_products, create_order, get_last_order, recent_orders, order_count, spent_on
+from command_llm import LLM_FALLBACK_TIMEOUT, get_command_llm
 
 # Global variables to track last catalog results and cart (for demo, not thread-safe)
 last_catalog_results = []
 cart = []
 
-def process_voice_command(text: str) -> str:
+# Spoken order history is capped; the full list is paged via GET /acp/orders
+ORDER_HISTORY_LIMIT = 10
+
+HELP_TEXT = "Sorry, I didn't understand. You can say things like 'show hoodies', 'buy mug', or 'what was my last order?'"
+
+# Rules that fire on a clear intent answer with full confidence; "couldn't identify" replies
+# are low confidence and get a second chance through the LLM fallback.
+RULE_HIT_CONFIDENCE = 1.0
+RULE_MISS_CONFIDENCE = 0.3
+FAST_PATH_CONFIDENCE = float(os.getenv("FAST_PATH_CONFIDENCE", 0.8))
+
+ORDINALS = {'first': 0, 'second': 1, 'third': 2, 'fourth': 3, 'fifth': 4, 'sixth': 5, 'seventh': 6, 'eighth': 7, 'ninth': 8, 'tenth': 9}
+ORDINAL_RE = re.compile(r'(first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth)')
+# Longest alternatives first so 't-shirt' wins over 'shirt' and 'navy blue' over 'blue'
+CATEGORY_RE = re.compile(r"\b(t-shirt|tshirt|hoodie|laptop|mobile|jeans|saree|shoes|shirt|watch|mug|bag|tv)s?\b")
+COLOR_RE = re.compile(r"\b(navy blue|aloe wash|silver|white|black|blue|grey|red)\b")
+PRICE_RE = re.compile(r'(under|below) (\d+)')
+SIZE_RE = re.compile(r'size ([a-zA-Z0-9]+)')
+ADD_RE = re.compile(r"add (.+?) to (my )?cart")
+REMOVE_RE = re.compile(r"remove (.+?) from (my )?cart")
+VIEW_CART_RE = re.compile(r"what('| i)s in (my )?cart|show (my )?cart|view (my )?cart")
+LEADING_ARTICLE_RE = re.compile(r'^(the|a|an) ')
+ORDER_PHRASES = ["buy", "order", "purchase", "put", "get", "want"]
+ARTICLES_RE = re.compile(r'\b(the|a|an)\b')
+
+# Rules run on one worker thread: checkout and purchases fsync the order log, which must not
+# stall the event loop, and a single thread still applies cart changes in arrival order
+_RULES_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="command-rules")
+
+LLM_WORKERS = 4
+_LLM_POOL = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="command-llm")
+# A timed-out call keeps its worker until the provider returns, so slots are only given back
+# when the thread finishes; with every worker still busy the fallback is skipped, not queued
+_LLM_SLOTS = threading.BoundedSemaphore(LLM_WORKERS)
+_STATS_LOCK = threading.Lock()
+COMMAND_STATS: Dict[str, float] = {
+    "fast_path": 0,
+    "llm_fallback": 0,
+    "llm_resolved": 0,
+    "llm_timeouts": 0,
+    "llm_errors": 0,
+    "llm_busy": 0,
+    "fast_path_seconds": 0.0,
+    "llm_seconds": 0.0,
+}
+
+def _describe_order(o) -> str:
+    # Support both 'line_items' (new) and 'items' (legacy)
+    items = ", ".join(f"{item['name']} x{item.get('quantity', 1)}" for item in (o.get('line_items') or o.get('items') or []))
+    return f"Order {o['id']}: {items} for {o['total']} {o['currency']} on {o['created_at'][:10]}"
+
+def asks_to_buy(text: str) -> bool:
+    """Whether the purchase rules (checkout or an order phrase) would look at this utterance."""
+    text = text.lower()
+    return "checkout" in text or "place order" in text or any(word in text for word in ORDER_PHRASES)
+
+
+def route_command(text: str, allow_orders: bool = True) -> Tuple[Optional[str], float]:
+    """Rule-based fast path. Returns (reply, confidence); reply is None when no rule matched.
+
+    With allow_orders=False the checkout and purchase rules are skipped, so nothing is bought.
+    """
     text = text.lower()
     # Order history and status queries
     if "last 3 orders" in text or "last three orders" in text:
-        from catalog import ORDERS
-        orders = ORDERS[-3:] if len(ORDERS) >= 3 else ORDERS
+        orders = recent_orders(3)
         if not orders:
-            return "No previous orders found."
-        resp = []
-        for o in orders:
-            items = ", ".join(f"{item['name']} x{item['quantity']}" for item in o['items'])
-            resp.append(f"Order {o['id']}: {items} for {o['total']} {o['currency']} on {o['created_at'][:10]}")
-        return "Last orders: " + " | ".join(resp)
+            return "No previous orders found.", RULE_HIT_CONFIDENCE
+        return "Last orders: " + " | ".join(_describe_order(o) for o in orders), RULE_HIT_CONFIDENCE
     if "order history" in text or "what have i bought" in text:
-        from catalog import ORDERS
-        if not ORDERS:
-            return "No previous orders found."
-        resp = []
-        for o in ORDERS:
-            items = ", ".join(f"{item['name']} x{item['quantity']}" for item in o['items'])
-            resp.append(f"Order {o['id']}: {items} for {o['total']} {o['currency']} on {o['created_at'][:10]}")
-        return "Order history: " + " | ".join(resp)
+        total = order_count()
+        if not total:
+            return "No previous orders found.", RULE_HIT_CONFIDENCE
+        orders = recent_orders(ORDER_HISTORY_LIMIT)
+        shown = f" (latest {len(orders)} of {total})" if total > len(orders) else ""
+        return f"Order history{shown}: " + " | ".join(_describe_order(o) for o in orders), RULE_HIT_CONFIDENCE
     if "total spent today" in text:
-        from catalog import ORDERS
-        from datetime import datetime
-        today = datetime.now().date()
-        total = 0
-        for o in ORDERS:
-            order_date = datetime.fromisoformat(o['created_at']).date()
-            if order_date == today:
-                total += o['total']
-        return f"Total spent today: {total} INR."
+        return f"Total spent today: {spent_on(date.today())} INR.", RULE_HIT_CONFIDENCE
     # Last order (check before product search)
     if "last order" in text or "what did i buy" in text:
         order = get_last_order()
         if not order:
-            return "No previous orders found."
+            return "No previous orders found.", RULE_HIT_CONFIDENCE
         # Support both 'line_items' (new) and 'items' (legacy)
         items_list = order.get('line_items') or order.get('items') or []
         items = ", ".join(f"{item['name']} x{item.get('quantity', 1)}" for item in items_list)
-        return f"Your last order: {items} for {order['total']} {order['currency']}."
+        return f"Your last order: {items} for {order['total']} {order['currency']}.", RULE_HIT_CONFIDENCE
     # Product search
     global last_catalog_results
     if any(word in text for word in ["show", "find", "list", "catalog", "browse"]):
         filters = {}
-        categories = ["mug", "hoodie", "t-shirt", "tshirt", "shirt", "jeans", "saree", "shoes", "watch", "bag", "laptop", "mobile", "tv"]
         # Match category in singular or plural, and allow for 'show hoodies', 'show all mugs', etc.
-        for cat in categories:
-            if re.search(rf"\\b{cat}s?\\b", text):
-                filters["category"] = cat.replace("t-shirt", "tshirt")
-        colors = ["white", "black", "blue", "aloe wash", "red", "grey", "navy blue", "silver"]
-        for color in colors:
-            if re.search(rf"\\b{color}\\b", text):
-                filters["color"] = color
-        price_match = re.search(r'(under|below) (\d+)', text)
+        cat_match = CATEGORY_RE.search(text)
+        if cat_match:
+            filters["category"] = cat_match.group(1).replace("t-shirt", "tshirt")
+        color_match = COLOR_RE.search(text)
+        if color_match:
+            filters["color"] = color_match.group(1)
+        price_match = PRICE_RE.search(text)
         if price_match:
             filters["max_price"] = int(price_match.group(2))
         products = list_products(filters if filters else None)
         last_catalog_results = products
         if not products:
-            return "No products found for your request."
-        return "Here are some products: " + ", ".join(f"{p['name']} ({p['price']} {p['currency']})" for p in products)
+            return "No products found for your request.", RULE_HIT_CONFIDENCE
+        return "Here are some products: " + ", ".join(f"{p['name']} ({p['price']} {p['currency']})" for p in products), RULE_HIT_CONFIDENCE
     # Cart operations
     global cart
     # Add to cart (robust natural language, fuzzy match)
-    if re.search(r"add (.+?) to (my )?cart", text) or ("add" in text and "cart" in text):
+    if ADD_RE.search(text) or ("add" in text and "cart" in text):
         # Try to add by reference or name
-        ref_match = re.search(r'(first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth)', text)
-        pos_map = {'first': 0, 'second': 1, 'third': 2, 'fourth': 3, 'fifth': 4, 'sixth': 5, 'seventh': 6, 'eighth': 7, 'ninth': 8, 'tenth': 9}
+        ref_match = ORDINAL_RE.search(text)
         if ref_match and last_catalog_results:
-            idx = pos_map.get(ref_match.group(1), None)
+            idx = ORDINALS.get(ref_match.group(1), None)
             if idx is not None and idx < len(last_catalog_results):
                 prod = last_catalog_results[idx]
                 cart.append({"product_id": prod["id"], "name": prod["name"], "quantity": 1})
-                return f"Added {prod['name']} to your cart."
+                return f"Added {prod['name']} to your cart.", RULE_HIT_CONFIDENCE
         # Otherwise, match by name/category in the phrase 'add X to cart'
-        add_match = re.search(r"add (.+?) to (my )?cart", text)
+        add_match = ADD_RE.search(text)
         if add_match:
             prod_phrase = add_match.group(1).strip()
             # Remove common articles
-            prod_phrase = re.sub(r'^(the|a|an) ', '', prod_phrase)
+            prod_phrase = LEADING_ARTICLE_RE.sub('', prod_phrase)
             for prod in list_products():
                 prod_name = prod["name"].lower()
                 prod_cat = prod["category"].lower()
                 # Fuzzy/partial match
                 if prod_phrase in prod_name or prod_phrase in prod_cat or prod_name in prod_phrase or prod_cat in prod_phrase:
                     cart.append({"product_id": prod["id"], "name": prod["name"], "quantity": 1})
-                    return f"Added {prod['name']} to your cart."
+                    return f"Added {prod['name']} to your cart.", RULE_HIT_CONFIDENCE
         # Fallback: match by name/category anywhere, ignore articles
-        text_no_articles = re.sub(r'\b(the|a|an)\b', '', text)
+        text_no_articles = ARTICLES_RE.sub('', text)
         for prod in list_products():
             prod_name = prod["name"].lower()
             prod_cat = prod["category"].lower()
             if prod_name in text_no_articles or prod_cat in text_no_articles or any(word in text_no_articles for word in prod_name.split()):
                 cart.append({"product_id": prod["id"], "name": prod["name"], "quantity": 1})
-                return f"Added {prod['name']} to your cart."
-        return "Sorry, I couldn't identify the product to add to your cart."
+                return f"Added {prod['name']} to your cart.", RULE_HIT_CONFIDENCE
+        return "Sorry, I couldn't identify the product to add to your cart.", RULE_MISS_CONFIDENCE
     # Remove from cart (robust natural language, fuzzy match)
-    if re.search(r"remove (.+?) from (my )?cart", text) or ("remove" in text and "cart" in text):
-        remove_match = re.search(r"remove (.+?) from (my )?cart", text)
+    if REMOVE_RE.search(text) or ("remove" in text and "cart" in text):
+        remove_match = REMOVE_RE.search(text)
         if remove_match:
             prod_phrase = remove_match.group(1).strip()
-            prod_phrase = re.sub(r'^(the|a|an) ', '', prod_phrase)
+            prod_phrase = LEADING_ARTICLE_RE.sub('', prod_phrase)
             for i, item in enumerate(cart):
                 if prod_phrase in item["name"].lower() or prod_phrase in item["product_id"] or item["name"].lower() in prod_phrase:
                     removed = cart.pop(i)
-                    return f"Removed {removed['name']} from your cart."
+                    return f"Removed {removed['name']} from your cart.", RULE_HIT_CONFIDENCE
         # Fallback: match by name/category anywhere, ignore articles
-        text_no_articles = re.sub(r'\b(the|a|an)\b', '', text)
+        text_no_articles = ARTICLES_RE.sub('', text)
         for i, item in enumerate(cart):
             if item["name"].lower() in text_no_articles or item["product_id"] in text_no_articles:
                 removed = cart.pop(i)
-                return f"Removed {removed['name']} from your cart."
-        return "Sorry, I couldn't find that item in your cart."
+                return f"Removed {removed['name']} from your cart.", RULE_HIT_CONFIDENCE
+        return "Sorry, I couldn't find that item in your cart.", RULE_MISS_CONFIDENCE
     # View cart (robust natural language)
     # View cart (robust natural language, only on clear cart-view phrases)
-    if re.search(r"what('| i)s in (my )?cart", text) or re.search(r"show (my )?cart", text) or re.search(r"view (my )?cart", text):
+    if VIEW_CART_RE.search(text):
         if not cart:
-            return "Your cart is empty."
-        return "Your cart contains: " + ", ".join(f"{item['name']} x{item['quantity']}" for item in cart)
+            return "Your cart is empty.", RULE_HIT_CONFIDENCE
+        return "Your cart contains: " + ", ".join(f"{item['name']} x{item['quantity']}" for item in cart), RULE_HIT_CONFIDENCE
+    if not allow_orders:
+        return None, 0.0
     # Checkout
     if "checkout" in text or "place order" in text:
         if not cart:
-            return "Your cart is empty. Add items before checking out."
+            return "Your cart is empty. Add items before checking out.", RULE_HIT_CONFIDENCE
         order = create_order(cart)
         cart.clear()
-        return f"Order placed for: {', '.join(item['name'] for item in order['items'])} at {order['total']} {order['currency']}."
+        return f"Order placed for: {', '.join(item['name'] for item in order['line_items'])} at {order['total']} {order['currency']}.", RULE_HIT_CONFIDENCE
     # Place order (more flexible matching, supports reference to last shown products)
-    order_phrases = ["buy", "order", "purchase", "put", "get", "want"]
-    if any(word in text for word in order_phrases):
-        ref_match = re.search(r'(first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth)', text)
-        pos_map = {'first': 0, 'second': 1, 'third': 2, 'fourth': 3, 'fifth': 4, 'sixth': 5, 'seventh': 6, 'eighth': 7, 'ninth': 8, 'tenth': 9}
+    if any(word in text for word in ORDER_PHRASES):
+        ref_match = ORDINAL_RE.search(text)
         if ref_match and last_catalog_results:
-            idx = pos_map.get(ref_match.group(1), None)
+            idx = ORDINALS.get(ref_match.group(1), None)
             if idx is not None and idx < len(last_catalog_results):
                 prod = last_catalog_results[idx]
-                size_match = re.search(r'size ([a-zA-Z0-9]+)', text)
+                size_match = SIZE_RE.search(text)
                 size = size_match.group(1) if size_match else None
                 order_item = {"product_id": prod["id"], "quantity": 1}
                 if size:
                     order_item["size"] = size
                 order = create_order([order_item])
-                return f"Order placed for {prod['name']}{' (size ' + size + ')' if size else ''} at {order['total']} {order['currency']}."
+                return f"Order placed for {prod['name']}{' (size ' + size + ')' if size else ''} at {order['total']} {order['currency']}.", RULE_HIT_CONFIDENCE
             else:
-                return "Sorry, I couldn't find that product in the last list."
+                return "Sorry, I couldn't find that product in the last list.", RULE_MISS_CONFIDENCE
         for prod in list_products():
             prod_name = prod["name"].lower()
             prod_cat = prod["category"].lower()
             if (prod_name in text or prod_cat in text or any(word in text for word in prod_name.split())):
-                size_match = re.search(r'size ([a-zA-Z0-9]+)', text)
+                size_match = SIZE_RE.search(text)
                 size = size_match.group(1) if size_match else None
                 order_item = {"product_id": prod["id"], "quantity": 1}
                 if size:
                     order_item["size"] = size
                 order = create_order([order_item])
-                return f"Order placed for {prod['name']}{' (size ' + size + ')' if size else ''} at {order['total']} {order['currency']}."
-        return "Sorry, I couldn't identify the product to order."
-    return "Sorry, I didn't understand. You can say things like 'show hoodies', 'buy mug', or 'what was my last order?'"
+                return f"Order placed for {prod['name']}{' (size ' + size + ')' if size else ''} at {order['total']} {order['currency']}.", RULE_HIT_CONFIDENCE
+        return "Sorry, I couldn't identify the product to order.", RULE_MISS_CONFIDENCE
+    return None, 0.0
+
+
+def _count(**deltas):
+    with _STATS_LOCK:
+        for k, v in deltas.items():
+            COMMAND_STATS[k] += v
+
+
+async def _route(text: str, allow_orders: bool = True) -> Tuple[Optional[str], float]:
+    return await asyncio.wrap_future(_RULES_POOL.submit(route_command, text, allow_orders))
+
+
+async def _rewrite_with_llm(text: str) -> Optional[str]:
+    llm = get_command_llm()
+    if llm is None:
+        return None
+    if not _LLM_SLOTS.acquire(blocking=False):
+        _count(llm_busy=1)
+        return None
+    future = _LLM_POOL.submit(llm.rewrite, text)
+    future.add_done_callback(lambda _: _LLM_SLOTS.release())
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), LLM_FALLBACK_TIMEOUT)
+    except asyncio.TimeoutError:
+        _count(llm_timeouts=1)
+    except Exception:
+        _count(llm_errors=1)
+    return None
+
+
+async def process_voice_command(text: str) -> str:
+    """Answer from the rule router when it is confident, otherwise let the LLM rephrase once."""
+    start = time.perf_counter()
+    reply, confidence = await _route(text)
+    if confidence >= FAST_PATH_CONFIDENCE:
+        _count(fast_path=1, fast_path_seconds=time.perf_counter() - start)
+        return reply
+    rewritten = await _rewrite_with_llm(text)
+    if rewritten and rewritten.lower() != text.lower():
+        # A rephrased command may only buy when the shopper's own words asked to
+        llm_reply, llm_confidence = await _route(rewritten, allow_orders=asks_to_buy(text))
+        if llm_reply is not None and llm_confidence >= FAST_PATH_CONFIDENCE:
+            reply = llm_reply
+            _count(llm_resolved=1)
+    _count(llm_fallback=1, llm_seconds=time.perf_counter() - start)
+    return reply or HELP_TEXT
+
+
+def command_stats() -> Dict[str, float]:
+    with _STATS_LOCK:
+        stats = dict(COMMAND_STATS)
+    total = stats["fast_path"] + stats["llm_fallback"]
+    stats["requests"] = total
+    stats["fast_path_fraction"] = stats["fast_path"] / total if total else 0.0
+    stats["avg_fast_path_us"] = stats["fast_path_seconds"] / stats["fast_path"] * 1e6 if stats["fast_path"] else 0.0
+    stats["avg_llm_ms"] = stats["llm_seconds"] / stats["llm_fallback"] * 1e3 if stats["llm_fallback"] else 0.0
+    return stats
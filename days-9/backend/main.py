@@ -1,17 +1,22 @@
 # FastAPI backend for Day 9 ACP-inspired shopping agent
 
 from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse
+import asyncio
 import logging
 from fastapi.middleware.cors import CORSMiddleware
-from catalog import list_products, create_order, get_last_order
-from llm_agent import process_voice_command
+from catalog import list_products, create_order, create_orders, get_last_order, list_orders_page
+from llm_agent import process_voice_command, command_stats
+from uploads import AudioUpload, UploadTooLarge
+from audio_preprocess import normalize_for_stt, TARGET_SAMPLE_RATE
+from tts import synthesize, TTS_CACHE
+from timing import SERVER_TIMING, TimingMiddleware, span, timing_stats
+from rate_limit import call_with_backoff, limiter, rate_limit_stats
 import os
-from google.cloud import speech, texttospeech
-from deepgram import DeepgramClient
+from google.cloud import speech
 from dotenv import load_dotenv
-import requests
+import httpx
 import base64
-import io
 from typing import Optional
 from pydantic import BaseModel
 
@@ -34,6 +39,15 @@ class VoiceRequest(BaseModel):
     text: str = None
 
 
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT_SECONDS", 30))
+MAX_BATCH_ORDERS = int(os.getenv("MAX_BATCH_ORDERS", 10000))
+
+# Google STT encodings for uploads we don't decode ourselves
+GOOGLE_ENCODINGS = {
+    "audio/webm": speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
+    "audio/ogg": speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
+    "audio/flac": speech.RecognitionConfig.AudioEncoding.FLAC,
+}
 
 # /voice endpoint: supports Deepgram (if provider=deepgram), else Google APIs
 
@@ -50,49 +64,109 @@ async def voice_command(
     # Speech-to-Text
     if file is not None:
         logger.info("Processing audio file upload for STT...")
-        audio_bytes = await file.read()
-        if stt_provider == "deepgram":
-            dg_key = os.getenv("DEEPGRAM_API_KEY")
-            if not dg_key:
-                return {"error": "Deepgram API key not set."}
-            dg_client = DeepgramClient(dg_key)
-            response = await dg_client.speech.transcribe_prerecorded(
-                {"buffer": io.BytesIO(audio_bytes), "mimetype": file.content_type or "audio/wav"},
-                {"model": "general", "language": "en-US", "punctuate": True}
-            )
-            transcript = response['results']['channels'][0]['alternatives'][0]['transcript']
-        elif stt_provider == "murf":
-            murf_key = os.getenv("MURF_API_KEY")
-            if not murf_key:
-                return {"error": "Murf API key not set."}
-            # Example Murf Falcon API call (replace with actual endpoint and params)
-            response = requests.post(
-                "https://api.murf.ai/v1/speech-to-text",
-                headers={"Authorization": f"Bearer {murf_key}"},
-                files={"file": (file.filename, audio_bytes, file.content_type or "audio/wav")}
-            )
-            if response.status_code == 200:
-                transcript = response.json().get("transcript", "")
+        upload = AudioUpload(file)
+        try:
+            if stt_provider == "deepgram":
+                dg_key = os.getenv("DEEPGRAM_API_KEY")
+                if not dg_key:
+                    return {"error": "Deepgram API key not set."}
+                # Stream the upload straight into the request body instead of buffering it
+                # (so the stt span includes receiving the upload). A streamed body can't be replayed,
+                # so these calls wait for quota but are not retried.
+                await limiter.acquire("deepgram")
+                with span("stt"):
+                    async with httpx.AsyncClient(timeout=STT_TIMEOUT) as client:
+                        response = await client.post(
+                            "https://api.deepgram.com/v1/listen",
+                            headers={"Authorization": f"Token {dg_key}", "Content-Type": upload.content_type},
+                            params={"model": "general", "language": "en-US", "punctuate": "true"},
+                            content=upload.chunks(),
+                        )
+                if response.status_code != 200:
+                    return {"error": f"Deepgram STT failed: {response.text}"}
+                transcript = response.json()['results']['channels'][0]['alternatives'][0]['transcript']
+            elif stt_provider == "murf":
+                murf_key = os.getenv("MURF_API_KEY")
+                if not murf_key:
+                    return {"error": "Murf API key not set."}
+                # httpx encodes multipart bodies synchronously, so a file object here would be read
+                # on the event loop; read the bounded upload asynchronously and send the bytes
+                with span("upload"):
+                    audio_bytes = await upload.read_all()
+                # Example Murf Falcon API call (replace with actual endpoint and params)
+                await limiter.acquire("murf")
+                with span("stt"):
+                    async with httpx.AsyncClient(timeout=STT_TIMEOUT) as client:
+                        response = await client.post(
+                            "https://api.murf.ai/v1/speech-to-text",
+                            headers={"Authorization": f"Bearer {murf_key}"},
+                            files={"file": (upload.filename, audio_bytes, upload.content_type)},
+                        )
+                if response.status_code == 200:
+                    transcript = response.json().get("transcript", "")
+                else:
+                    return {"error": f"Murf Falcon STT failed: {response.text}"}
             else:
-                return {"error": f"Murf Falcon STT failed: {response.text}"}
-        else:
-            client = speech.SpeechClient()
-            audio = speech.RecognitionAudio(content=audio_bytes)
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=16000,
-                language_code="en-US",
-            )
-            response = client.recognize(config=config, audio=audio)
-            transcript = " ".join([result.alternatives[0].transcript for result in response.results])
+                # Google's synchronous recognize needs the whole clip, bounded by the upload limits
+                with span("upload"):
+                    audio_bytes = await upload.read_all()
+                # Decode, downmix, resample to 16 kHz and trim silence so we only send speech
+                with span("preprocess"):
+                    pcm = normalize_for_stt(audio_bytes, upload.content_type)
+                if pcm is not None:
+                    logger.info(f"Normalized audio {len(audio_bytes)} -> {len(pcm)} bytes")
+                    config = speech.RecognitionConfig(
+                        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                        sample_rate_hertz=TARGET_SAMPLE_RATE,
+                        language_code="en-US",
+                    )
+                    audio_bytes = pcm
+                else:
+                    # Compressed upload: let Google read the rate from the container
+                    encoding = GOOGLE_ENCODINGS.get(upload.content_type, speech.RecognitionConfig.AudioEncoding.ENCODING_UNSPECIFIED)
+                    config = speech.RecognitionConfig(encoding=encoding, language_code="en-US")
+                if audio_bytes:
+                    with span("stt"):
+                        client = speech.SpeechClient()
+                        audio = speech.RecognitionAudio(content=audio_bytes)
+                        response = await call_with_backoff(
+                            lambda: asyncio.to_thread(client.recognize, config=config, audio=audio), "google_stt")
+                    transcript = " ".join([result.alternatives[0].transcript for result in response.results])
+        except UploadTooLarge as e:
+            logger.warning(f"Rejected audio upload: {e}")
+            return JSONResponse(status_code=413, content={"error": str(e)})
     if not transcript:
         logger.warning("No transcript received from STT or text input.")
         return {"response": "Sorry, I didn't catch that. Please try again.", "audio": None, "transcript": "", "stt_provider": stt_provider, "tts_provider": tts_provider}
     logger.info(f"Transcript: {transcript}")
-    reply = process_voice_command(transcript)
+    with span("command"):
+        reply = await process_voice_command(transcript)
     logger.info(f"Agent reply: {reply}")
     # Always respond with text, even if TTS fails
-    return {"response": reply, "audio": None, "transcript": transcript, "stt_provider": stt_provider, "tts_provider": tts_provider}
+    audio = await synthesize(reply, tts_provider)
+    audio_b64 = base64.b64encode(audio).decode("ascii") if audio else None
+    return {"response": reply, "audio": audio_b64, "transcript": transcript, "stt_provider": stt_provider, "tts_provider": tts_provider}
+
+
+@app.get("/metrics/commands")
+def command_router_stats():
+    return command_stats()
+
+
+@app.get("/metrics/timings")
+def request_timings():
+    # p50/p95/p99 per /voice stage since startup (empty when SERVER_TIMING=0)
+    return timing_stats()
+
+
+@app.get("/metrics/rate-limits")
+def provider_rate_limits():
+    return rate_limit_stats()
+
+
+@app.get("/metrics/tts-cache")
+def tts_cache_stats():
+    return TTS_CACHE.stats()
 
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):
@@ -108,7 +182,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+if SERVER_TIMING:
+    app.add_middleware(TimingMiddleware, paths=("/voice",))
 
 @app.get("/acp/catalog")
 def get_catalog(category: Optional[str] = None, color: Optional[str] = None):
@@ -126,6 +203,21 @@ def post_order(order_req: dict):
     order = create_order(line_items)
     return order
 
+@app.post("/acp/orders/batch")
+def post_orders_batch(batch_req: dict):
+    # Expects: {"orders": [{"line_items": [...]}, ...]}; returns one result per order, in order
+    orders = batch_req.get("orders", [])
+    if not isinstance(orders, list) or len(orders) > MAX_BATCH_ORDERS:
+        return JSONResponse(status_code=400, content={"error": f"'orders' must be a list of at most {MAX_BATCH_ORDERS} orders."})
+    results = create_orders(orders)
+    created = sum(1 for r in results if r["ok"])
+    return {"results": results, "created": created, "failed": len(results) - created}
+
+@app.get("/acp/orders")
+def get_orders(offset: int = 0, limit: int = 20):
+    # Newest-first order history, paged from the order log index
+    return list_orders_page(max(offset, 0), min(max(limit, 1), 100))
+
 @app.get("/acp/orders/last")
 def get_last():
     order = get_last_order()
@@ -0,0 +1,249 @@
+# Provider-aware rate limiting shared by every caller in the process: a token bucket per
+# provider and per provider:model, priority lanes so interactive turns go ahead of background
+# work, and jittered exponential backoff that slows the whole bucket down after a 429.
+#
+# Limits come from PROVIDER_RATE_LIMITS, e.g. "gemini=60/min,gemini:gemini-2.0-flash-exp=10/min,murf=5/s".
+# Keys without a limit are not throttled; malformed entries are logged and skipped. The module has
+# no framework dependencies and is copied into the FastAPI backends and the LiveKit agents, which
+# are built and deployed separately (each from its own directory), so keep the copies in sync.
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Background calls leave this share of the bucket for interactive ones
+BACKGROUND_RESERVE = float(os.getenv("RATE_LIMIT_BACKGROUND_RESERVE", 0.5))
+BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE_SECONDS", 0.5))
+BACKOFF_CAP = float(os.getenv("RATE_LIMIT_BACKOFF_CAP_SECONDS", 20))
+MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 3))
+
+PERIODS = {"s": 1.0, "sec": 1.0, "min": 60.0, "m": 60.0, "h": 3600.0, "hour": 3600.0}
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Waiting is done by sleeping until enough tokens have refilled,
+    so callers on different event loops (or plain threads) can share one bucket."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.rate_limited = 0
+        # Interactive callers currently waiting on this bucket; background callers yield to them
+        self.interactive_waiting = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, priority: int = INTERACTIVE, cost: float = 1.0) -> float:
+        """Take cost tokens and return 0, or return how long to wait before trying again."""
+        # Capped so a small bucket still lets background calls through once it is full
+        floor = min(self.capacity * BACKGROUND_RESERVE, self.capacity - cost) if priority >= BACKGROUND else 0.0
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill(now)
+            if priority >= BACKGROUND and self.interactive_waiting:
+                # Every refilled token goes to the interactive waiters first
+                return cost / self.rate
+            if self.tokens - cost >= floor:
+                self.tokens -= cost
+                return 0.0
+            return (cost + floor - self.tokens) / self.rate
+
+    @contextmanager
+    def waiting(self, priority: int):
+        """Mark a caller as queued on this bucket while it sleeps for tokens."""
+        if priority >= BACKGROUND:
+            yield
+            return
+        with self._lock:
+            self.interactive_waiting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.interactive_waiting -= 1
+
+    def block(self, seconds: float):
+        # A 429 means the real quota is gone: stop everyone, and restart from an empty bucket
+        with self._lock:
+            self.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+    def record_wait(self, waited: float):
+        with self._lock:
+            self.acquired += 1
+            if waited > 0:
+                self.delayed += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_s": self.rate,
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "wait_ms_avg": round(self.wait_total / self.delayed * 1000, 1) if self.delayed else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 1),
+            "rate_limited": self.rate_limited,
+        }
+
+
+def parse_limits(spec: str) -> Dict[str, TokenBucket]:
+    """Parse "gemini=60/min,murf=5/s" into buckets; the count is both the rate per period and the burst.
+
+    A malformed entry is logged and skipped rather than raised: this runs at import, and a typo in
+    the env var shouldn't take the service down with it.
+    """
+    buckets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, limit = item.partition("=")
+        count, _, period = limit.partition("/")
+        try:
+            n = float(count)
+        except ValueError:
+            n = 0.0
+        seconds = PERIODS.get(period.strip() or "s")
+        if not key.strip() or not n > 0 or seconds is None:
+            logger.warning(f"Ignoring malformed PROVIDER_RATE_LIMITS entry {item!r}")
+            continue
+        buckets[key.strip()] = TokenBucket(n / seconds, n)
+    return buckets
+
+
+class RateLimiter:
+    def __init__(self, spec: str = ""):
+        self.buckets: Dict[str, TokenBucket] = parse_limits(spec)
+        self.retries = 0
+
+    def configure(self, key: str, count: float, per_seconds: float = 60.0):
+        """Set a limit in code (env limits for the same key win)."""
+        self.buckets.setdefault(key, TokenBucket(count / per_seconds, count))
+
+    def _buckets(self, provider: str, model: Optional[str]) -> List[TokenBucket]:
+        keys = [provider] + ([f"{provider}:{model}"] if model else [])
+        return [self.buckets[k] for k in keys if k in self.buckets]
+
+    async def acquire(self, provider: str, model: Optional[str] = None, priority: int = INTERACTIVE) -> float:
+        """Wait for a token from the provider bucket and the provider:model bucket; returns seconds waited."""
+        waited = 0.0
+        for bucket in self._buckets(provider, model):
+            start = time.monotonic()
+            delay = bucket.try_take(priority)
+            delayed = bool(delay)
+            if delayed:
+                with bucket.waiting(priority):
+                    while delay:
+                        # A little jitter keeps waiters that woke together from racing for one token
+                        await asyncio.sleep(delay * random.uniform(1.0, 1.2))
+                        delay = bucket.try_take(priority)
+            wait = time.monotonic() - start if delayed else 0.0
+            bucket.record_wait(wait)
+            waited += wait
+        return waited
+
+    def acquire_sync(self, provider: str, model: Optional[str] = None, priority: int = INTERACTIVE) -> float:
+        """acquire() for blocking SDK calls that already run on a worker thread."""
+        waited = 0.0
+        for bucket in self._buckets(provider, model):
+            start = time.monotonic()
+            delay = bucket.try_take(priority)
+            delayed = bool(delay)
+            if delayed:
+                with bucket.waiting(priority):
+                    while delay:
+                        time.sleep(delay * random.uniform(1.0, 1.2))
+                        delay = bucket.try_take(priority)
+            wait = time.monotonic() - start if delayed else 0.0
+            bucket.record_wait(wait)
+            waited += wait
+        return waited
+
+    def rate_limited(self, provider: str, model: Optional[str] = None, retry_after: Optional[float] = None):
+        """Report a 429 from the provider so every caller backs off, not just the one that was refused."""
+        for bucket in self._buckets(provider, model):
+            bucket.block(retry_after if retry_after is not None else BACKOFF_BASE)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"retries": self.retries, "buckets": {key: b.stats() for key, b in sorted(self.buckets.items())}}
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    # Our ProviderError (status_code), google.api_core ResourceExhausted (code), httpx responses
+    for attr in ("status_code", "code"):
+        if getattr(error, attr, None) == 429:
+            return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "quota" in text.lower()
+
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    # Full jitter: uniform over [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def call_with_backoff(
+    call: Callable[[], Awaitable[Any]],
+    provider: str,
+    model: Optional[str] = None,
+    priority: int = INTERACTIVE,
+    retries: int = MAX_RETRIES,
+) -> Any:
+    """Run call() under the provider's limits, retrying 429s with jittered exponential backoff."""
+    for attempt in range(retries + 1):
+        await limiter.acquire(provider, model, priority)
+        try:
+            return await call()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == retries:
+                raise
+            retry_after = retry_after_of(e)
+            delay = max(backoff_delay(attempt), retry_after or 0.0)
+            limiter.rate_limited(provider, model, delay)
+            limiter.retries += 1
+            await asyncio.sleep(delay)
+
+
+# One limiter per process, shared by all sessions and requests
+limiter = RateLimiter(os.getenv("PROVIDER_RATE_LIMITS", ""))
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return limiter.stats()
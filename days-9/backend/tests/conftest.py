@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# catalog.py opens the order log at import: keep test orders out of the real one
+os.environ.setdefault("ORDERS_LOG", os.path.join(tempfile.mkdtemp(prefix="orders-"), "orders.jsonl"))
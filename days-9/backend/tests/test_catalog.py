@@ -0,0 +1,96 @@
+import json
+from array import array
+from collections import defaultdict, deque
+from datetime import date
+
+import catalog
+from catalog import create_orders, order_count
+
+
+def test_bad_product_ids_fail_only_their_own_entry():
+    before = order_count()
+    results = create_orders([
+        {"line_items": [{"product_id": ["mug-001"], "quantity": 1}]},
+        {"line_items": [{"product_id": {"id": "mug-001"}, "quantity": 1}]},
+        {"line_items": ["mug-001"]},
+        {"line_items": [{"product_id": "mug-001", "quantity": 2}]},
+        {"line_items": [{"product_id": "no-such-product"}]},
+    ])
+
+    assert [r["ok"] for r in results] == [False, False, False, True, False]
+    assert all("Invalid line item" in r["error"] for r in results[:3])
+    assert "Unknown product" in results[4]["error"]
+    assert results[3]["order"]["total"] == 1600
+    assert order_count() == before + 1
+
+
+def load_log(monkeypatch, tmp_path, content):
+    # Fresh in-memory state over a log with the given bytes; the ring holds one order so reads go to disk
+    path = tmp_path / "orders.jsonl"
+    path.write_bytes(content)
+    monkeypatch.setattr(catalog, "ORDERS_LOG", str(path))
+    monkeypatch.setattr(catalog, "ORDERS", deque(maxlen=1))
+    monkeypatch.setattr(catalog, "ORDER_OFFSETS", array("q"))
+    monkeypatch.setattr(catalog, "ORDER_SEQ", 0)
+    monkeypatch.setattr(catalog, "SPEND_BY_DAY", defaultdict(int))
+    catalog._load_order_log()
+    return path
+
+
+def order_line(n):
+    return json.dumps({"id": f"order-{n}", "total": 100}).encode() + b"\n"
+
+
+def test_corrupt_line_keeps_later_orders(monkeypatch, tmp_path):
+    content = order_line(1) + b'{"id": "order-2", "tot\n' + order_line(3) + order_line(4)
+    path = load_log(monkeypatch, tmp_path, content)
+
+    assert path.read_bytes() == content
+    assert [o["id"] for o in catalog.read_orders(0, 3)] == ["order-1", "order-3", "order-4"]
+    assert catalog.next_order_id() == "order-5"
+
+
+def test_torn_final_write_is_truncated(monkeypatch, tmp_path):
+    path = load_log(monkeypatch, tmp_path, order_line(1) + order_line(2) + b'{"id": "order-3", "to')
+
+    assert path.read_bytes() == order_line(1) + order_line(2)
+    assert catalog.order_count() == 2
+
+
+def test_missing_final_newline_is_restored_before_append(monkeypatch, tmp_path):
+    path = load_log(monkeypatch, tmp_path, order_line(1) + order_line(2).rstrip(b"\n"))
+    catalog.save_order({"total": 50})
+
+    assert path.read_bytes().splitlines()[-1] == json.dumps({"total": 50, "id": "order-3"}).encode()
+    assert [o["id"] for o in catalog.read_orders(0, 3)] == ["order-1", "order-2", "order-3"]
+
+
+def dated_line(n, day, total):
+    return json.dumps({"id": f"order-{n}", "total": total, "created_at": f"{day}T10:00:00"}).encode() + b"\n"
+
+
+def test_orders_page_is_newest_first_across_ring_and_disk(monkeypatch, tmp_path):
+    load_log(monkeypatch, tmp_path, b"".join(order_line(n) for n in range(1, 6)))
+
+    def ids(page):
+        return [o["id"] for o in page["orders"]]
+
+    first = catalog.list_orders_page(0, 2)
+    assert ids(first) == ["order-5", "order-4"]
+    assert (first["total"], first["offset"], first["limit"]) == (5, 0, 2)
+    assert ids(catalog.list_orders_page(2, 2)) == ["order-3", "order-2"]
+    # The last page is short, and past the end is empty
+    assert ids(catalog.list_orders_page(4, 2)) == ["order-1"]
+    assert ids(catalog.list_orders_page(5, 2)) == []
+
+
+def test_spent_on_sums_each_day_including_new_orders(monkeypatch, tmp_path):
+    load_log(monkeypatch, tmp_path, dated_line(1, "2024-05-01", 800) + dated_line(2, "2024-05-01", 600)
+             + dated_line(3, "2024-05-02", 1500))
+
+    assert catalog.spent_on(date(2024, 5, 1)) == 1400
+    assert catalog.spent_on(date(2024, 5, 2)) == 1500
+    assert catalog.spent_on(date(2024, 5, 3)) == 0
+
+    order = catalog.create_order([{"product_id": "mug-001", "quantity": 2}])
+    assert catalog.spent_on(date.fromisoformat(order["created_at"][:10])) == order["total"]
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+import catalog
+import llm_agent
+from catalog import order_count
+from command_llm import CommandLLM, StubCommandLLM
+
+
+class StuckLLM(CommandLLM):
+    """Never answers until released, like a provider call that outlives its timeout."""
+
+    name = "stuck"
+    release = threading.Event()
+
+    def rewrite(self, text):
+        self.release.wait(5)
+        return "show mugs"
+
+
+@pytest.fixture
+def stuck_llm(monkeypatch):
+    StuckLLM.release.clear()
+    monkeypatch.setattr(llm_agent, "get_command_llm", StuckLLM)
+    yield
+    StuckLLM.release.set()
+    # Wait for the workers to come back before the next test
+    for _ in range(llm_agent.LLM_WORKERS):
+        llm_agent._LLM_SLOTS.acquire(timeout=5)
+    for _ in range(llm_agent.LLM_WORKERS):
+        llm_agent._LLM_SLOTS.release()
+
+
+def test_fallback_does_not_block_event_loop(monkeypatch, stuck_llm):
+    monkeypatch.setattr(llm_agent, "LLM_FALLBACK_TIMEOUT", 0.1)
+    before = dict(llm_agent.COMMAND_STATS)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        reply = await llm_agent.process_voice_command("hmm not sure what I need")
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        return reply, elapsed, ticks
+
+    reply, elapsed, ticks = asyncio.run(run())
+    assert reply == llm_agent.HELP_TEXT
+    assert elapsed < 0.4
+    # Other requests kept being served while the fallback waited
+    assert ticks >= 5
+    assert llm_agent.COMMAND_STATS["llm_timeouts"] == before["llm_timeouts"] + 1
+
+
+def test_fallback_skipped_while_workers_are_busy(monkeypatch, stuck_llm):
+    monkeypatch.setattr(llm_agent, "LLM_FALLBACK_TIMEOUT", 0.05)
+    before = llm_agent.COMMAND_STATS["llm_busy"]
+
+    async def run():
+        # Every worker is still running a timed-out call, so the next fallback must not queue
+        await asyncio.gather(*(llm_agent.process_voice_command("hmm") for _ in range(llm_agent.LLM_WORKERS)))
+        start = time.perf_counter()
+        await llm_agent.process_voice_command("hmm")
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 0.05
+    assert llm_agent.COMMAND_STATS["llm_busy"] == before + 1
+
+
+def test_stub_never_turns_small_talk_into_an_order(monkeypatch):
+    monkeypatch.setattr(llm_agent, "get_command_llm", StubCommandLLM)
+    orders = order_count()
+
+    for text in ["grab me a coffee cup", "I'd like a coffee cup of tea", "pay the electricity bill", "finish up the call"]:
+        assert asyncio.run(llm_agent.process_voice_command(text)) == llm_agent.HELP_TEXT
+    assert order_count() == orders
+    # Product and read-only paraphrases still resolve
+    assert asyncio.run(llm_agent.process_voice_command("what's in my basket")).startswith("Your cart")
+
+
+class BuyingLLM(CommandLLM):
+    """A provider that ignores the prompt and rewrites everything into a purchase."""
+
+    name = "buying"
+
+    def rewrite(self, text):
+        return "buy hoodie"
+
+
+def test_rewrite_only_buys_when_the_shopper_asked_to(monkeypatch):
+    monkeypatch.setattr(llm_agent, "get_command_llm", BuyingLLM)
+    orders = order_count()
+
+    assert asyncio.run(llm_agent.process_voice_command("I need something warm for winter")) == llm_agent.HELP_TEXT
+    assert order_count() == orders
+
+    assert asyncio.run(llm_agent.process_voice_command("please order something warm")).startswith("Order placed")
+    assert order_count() == orders + 1
+
+
+def test_orders_are_written_off_the_event_loop(monkeypatch):
+    fsync = os.fsync
+    threads = []
+
+    def record_fsync(fd):
+        threads.append(threading.current_thread())
+        fsync(fd)
+
+    monkeypatch.setattr(catalog.os, "fsync", record_fsync)
+
+    async def run():
+        return await llm_agent.process_voice_command("buy a mug")
+
+    assert asyncio.run(run()).startswith("Order placed")
+    assert threads and threading.main_thread() not in threads
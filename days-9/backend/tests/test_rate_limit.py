@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import (
+    BACKGROUND,
+    INTERACTIVE,
+    RateLimiter,
+    TokenBucket,
+    call_with_backoff,
+    parse_limits,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: low)
+
+
+class RateLimitedError(Exception):
+    status_code = 429
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    assert all(bucket.try_take() == 0.0 for _ in range(4))
+    assert bucket.try_take() == pytest.approx(0.5)
+    clock.now += 1.0
+    assert bucket.try_take() == 0.0
+    assert bucket.try_take() == 0.0
+    assert bucket.try_take() > 0
+    clock.now += 60.0
+    bucket.try_take()
+    assert bucket.tokens == pytest.approx(3)
+
+
+def test_background_leaves_the_reserve_for_interactive(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "BACKGROUND_RESERVE", 0.5)
+    bucket = TokenBucket(rate=1.0, capacity=4)
+    assert bucket.try_take(BACKGROUND) == 0.0
+    assert bucket.try_take(BACKGROUND) == 0.0
+    assert bucket.try_take(BACKGROUND) > 0
+    assert bucket.try_take(INTERACTIVE) == 0.0
+    # A one-token bucket has no room for a reserve; background must still get through
+    assert TokenBucket(rate=1.0, capacity=1).try_take(BACKGROUND) == 0.0
+
+
+def test_waiting_interactive_callers_go_before_background(monkeypatch):
+    monkeypatch.setattr(rate_limit, "BACKGROUND_RESERVE", 0.0)
+    limiter = RateLimiter("gemini=20/s")
+    limiter.buckets["gemini"].capacity = limiter.buckets["gemini"].tokens = 1
+    order = []
+
+    async def call(priority, name):
+        await limiter.acquire("gemini", priority=priority)
+        order.append(name)
+
+    async def run():
+        await limiter.acquire("gemini")
+        background = asyncio.create_task(call(BACKGROUND, "background"))
+        await asyncio.sleep(0)
+        interactive = [asyncio.create_task(call(INTERACTIVE, f"turn{i}")) for i in range(2)]
+        await asyncio.gather(background, *interactive)
+
+    asyncio.run(run())
+    assert order[-1] == "background"
+
+
+def test_parse_limits_skips_malformed_entries(caplog):
+    buckets = parse_limits("gemini=60/min, murf=five/s,deepgram=10/fortnight,=3/s,google_tts=0/s, murf:falcon=5")
+    assert sorted(buckets) == ["gemini", "murf:falcon"]
+    assert buckets["gemini"].rate == pytest.approx(1.0)
+    assert buckets["murf:falcon"].rate == 5.0
+    assert caplog.text.count("Ignoring malformed") == 4
+
+
+def test_rate_limited_blocks_every_caller(clock):
+    limiter = RateLimiter("murf=5/s")
+    limiter.rate_limited("murf", retry_after=3.0)
+    assert limiter.buckets["murf"].try_take() == pytest.approx(3.0)
+    assert limiter.stats()["buckets"]["murf"]["rate_limited"] == 1
+
+
+@pytest.fixture
+def fresh_limiter(monkeypatch):
+    limiter = RateLimiter("murf=100/s")
+    monkeypatch.setattr(rate_limit, "limiter", limiter)
+    monkeypatch.setattr(rate_limit, "backoff_delay", lambda attempt: 0.0)
+    return limiter
+
+
+def test_call_with_backoff_retries_429s(fresh_limiter):
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitedError("429 Too Many Requests")
+        return "audio"
+
+    assert asyncio.run(call_with_backoff(flaky, "murf")) == "audio"
+    assert len(attempts) == 3
+    assert fresh_limiter.retries == 2
+    assert fresh_limiter.buckets["murf"].rate_limited == 2
+
+
+def test_call_with_backoff_gives_up_and_passes_other_errors_through(fresh_limiter):
+    async def always_429():
+        raise RateLimitedError("quota exceeded")
+
+    async def broken():
+        raise ValueError("bad voice")
+
+    with pytest.raises(RateLimitedError):
+        asyncio.run(call_with_backoff(always_429, "murf", retries=2))
+    assert fresh_limiter.retries == 2
+    with pytest.raises(ValueError):
+        asyncio.run(call_with_backoff(broken, "murf"))
+    assert fresh_limiter.retries == 2
@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+import pytest
+
+import tts
+from tts import TTSCache, cache_key
+
+
+def files(directory):
+    return sorted(name for _, _, names in os.walk(directory) for name in names)
+
+
+def test_disk_tier_drops_least_recently_used_past_cap(tmp_path):
+    cache = TTSCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=250)
+    keys = [cache_key(f"line {i}", "v", "mp3") for i in range(3)]
+    cache.put(keys[0], "mp3", b"a" * 100)
+    cache.put(keys[1], "mp3", b"b" * 100)
+    # A disk hit makes the first clip the most recently used
+    assert cache.get(keys[0], "mp3") == b"a" * 100
+    cache.put(keys[2], "mp3", b"c" * 100)
+
+    assert files(tmp_path) == sorted(f"{k}.mp3" for k in (keys[0], keys[2]))
+    assert cache.stats()["disk_bytes"] == 200
+
+
+def test_disk_tier_drops_stale_clips_found_at_startup(tmp_path):
+    old = TTSCache(str(tmp_path))
+    stale = cache_key("stale", "v", "mp3")
+    old.put(stale, "mp3", b"s" * 10)
+    path = old._path(stale, "mp3")
+    os.utime(path, (0, 0))
+
+    cache = TTSCache(str(tmp_path), max_age_days=1)
+    cache.put(cache_key("fresh", "v", "mp3"), "mp3", b"f" * 10)
+    assert not os.path.exists(path)
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = TTSCache(str(tmp_path))
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tts.os, "replace", fail)
+    cache.put(cache_key("line", "v", "mp3"), "mp3", b"audio")
+    assert files(tmp_path) == []
+
+
+def test_concurrent_misses_share_one_synthesis(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_CACHE", TTSCache(str(tmp_path)))
+    calls = []
+
+    async def fake_murf(text, voice, fmt):
+        calls.append(text)
+        await asyncio.sleep(0.05)
+        return b"clip"
+
+    monkeypatch.setattr(tts, "_murf_tts", fake_murf)
+
+    async def run():
+        return await asyncio.gather(*(tts.synthesize("Your order is placed.", "murf") for _ in range(5)))
+
+    assert asyncio.run(run()) == [b"clip"] * 5
+    assert calls == ["Your order is placed."]
+    assert tts._IN_FLIGHT == {}
+
+
+@pytest.mark.parametrize("error", [RuntimeError("boom"), None])
+def test_waiters_get_none_when_synthesis_fails(tmp_path, monkeypatch, error):
+    monkeypatch.setattr(tts, "TTS_CACHE", TTSCache(str(tmp_path)))
+
+    async def fake_murf(text, voice, fmt):
+        await asyncio.sleep(0.01)
+        if error:
+            raise error
+
+    monkeypatch.setattr(tts, "_murf_tts", fake_murf)
+
+    async def run():
+        return await asyncio.gather(*(tts.synthesize("Hello", "murf") for _ in range(3)))
+
+    assert asyncio.run(run()) == [None] * 3
+    assert files(tmp_path) == []
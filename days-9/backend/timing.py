@@ -0,0 +1,124 @@
+# Per-request stage timing: span("stt") etc. record how long each stage took, the middleware
+# returns them in a Server-Timing header, and every span also feeds an in-process histogram.
+# With SERVER_TIMING=0 the middleware is not installed and span() is a no-op.
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+# Histogram bucket upper bounds in ms: 0.5ms to ~2 minutes, ~12% apart
+BUCKET_BOUNDS = [0.5 * 1.12 ** i for i in range(110)]
+
+# Spans of the request being handled; None outside a timed request
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timing_spans", default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p: float) -> float:
+        # Upper bound of the bucket holding the p-th sample (never above the observed max)
+        rank = p * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return round(min(BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max, self.max), 1)
+        return 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 1),
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+_hist_lock = threading.Lock()
+
+
+def record(stage: str, ms: float):
+    with _hist_lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.record(ms)
+
+
+def timing_stats() -> Dict[str, Dict]:
+    with _hist_lock:
+        return {stage: hist.summary() for stage, hist in sorted(_histograms.items())}
+
+
+@contextmanager
+def span(name: str):
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        spans.append((name, ms))
+        record(name, ms)
+
+
+def server_timing_header(spans: List[Tuple[str, float]]) -> bytes:
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in spans).encode("latin-1")
+
+
+class TimingMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware) so streamed responses pass through untouched.
+
+    The header is written when the response starts, so it covers everything up to the first
+    byte plus a "total" span; stages that run while a body is streaming still reach the histograms.
+    """
+
+    def __init__(self, app, paths: Tuple[str, ...] = ("/",)):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        spans: List[Tuple[str, float]] = []
+        token = _spans.set(spans)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = (time.perf_counter() - start) * 1000
+                record("total", total)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(spans + [("total", total)])))
+                # Lets the cross-origin frontend read the header through the Resource Timing API
+                headers.append((b"timing-allow-origin", b"*"))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(token)
@@ -0,0 +1,268 @@
+# Server-side TTS for /voice with a content-addressed, two-tier (memory + disk) cache
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from rate_limit import call_with_backoff
+from timing import span
+
+logger = logging.getLogger("voice-backend")
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(__file__), "tts_cache"))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+# The disk tier is pruned least-recently-used first past this size, and of clips unused this long
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+TTS_CACHE_MAX_AGE_DAYS = float(os.getenv("TTS_CACHE_MAX_AGE_DAYS", 30))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT_SECONDS", 15))
+
+DEFAULT_VOICES = {
+    "google": "en-US-Neural2-F",
+    "murf": "en-US-natalie",
+}
+
+
+def cache_key(text: str, voice: str, fmt: str) -> str:
+    return hashlib.sha256(f"{voice}\0{fmt}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """LRU of synthesized clips in memory, backed by one file per clip on disk.
+
+    The disk tier is an LRU too: a file's mtime is its last use, so recency survives restarts.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_memory_bytes: int = TTS_CACHE_MEMORY_BYTES,
+                 max_disk_bytes: int = TTS_CACHE_DISK_BYTES, max_age_days: float = TTS_CACHE_MAX_AGE_DAYS):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # path -> (size, last use), least recently used first; built from the directory on first use
+        self._disk: Optional["OrderedDict[str, Tuple[int, float]]"] = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{fmt}")
+
+    def _remember(self, key: str, audio: bytes):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = audio
+            self._memory_bytes += len(audio)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _scan_disk(self):
+        # Caller holds _lock
+        if self._disk is not None:
+            return
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        self._disk = OrderedDict((path, (size, mtime)) for mtime, path, size in entries)
+        self._disk_bytes = sum(size for _, _, size in entries)
+
+    def _touch_disk(self, path: str, size: int) -> List[str]:
+        """Record a use of path; return the files to delete to get back under the size and age limits."""
+        now = time.time()
+        with self._lock:
+            self._scan_disk()
+            old = self._disk.pop(path, None)
+            if old is not None:
+                self._disk_bytes -= old[0]
+            self._disk[path] = (size, now)
+            self._disk_bytes += size
+            victims = []
+            while len(self._disk) > 1:
+                oldest, (oldest_size, used) = next(iter(self._disk.items()))
+                if self._disk_bytes <= self.max_disk_bytes and now - used <= self.max_age_seconds:
+                    break
+                del self._disk[oldest]
+                self._disk_bytes -= oldest_size
+                victims.append(oldest)
+            return victims
+
+    def _prune(self, victims: List[str]):
+        for path in victims:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def get(self, key: str, fmt: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.bytes_saved += len(audio)
+                return audio
+        try:
+            with open(self._path(key, fmt), "rb") as f:
+                audio = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._remember(key, audio)
+        path = self._path(key, fmt)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._prune(self._touch_disk(path, len(audio)))
+        with self._lock:
+            self.disk_hits += 1
+            self.bytes_saved += len(audio)
+        return audio
+
+    def put(self, key: str, fmt: str, audio: bytes):
+        self._remember(key, audio)
+        path = self._path(key, fmt)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial clip
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp, path)
+            except BaseException:
+                # Disk full or similar: don't leave the partial temp file behind
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry {key}: {e}")
+            return
+        self._prune(self._touch_disk(path, len(audio)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk) if self._disk is not None else None,
+                "disk_bytes": self._disk_bytes if self._disk is not None else None,
+            }
+
+
+TTS_CACHE = TTSCache()
+# Synthesis in progress per cache key, so concurrent requests for one clip share a provider call
+_IN_FLIGHT: Dict[str, "asyncio.Future[Optional[bytes]]"] = {}
+
+
+_google_client = None
+_google_client_lock = threading.Lock()
+
+
+def _google_tts_client():
+    # One client per process: creating it sets up credentials and a gRPC channel, which every call
+    # would otherwise pay again. Created on first use, from the to_thread worker that calls it.
+    global _google_client
+    with _google_client_lock:
+        if _google_client is None:
+            from google.cloud import texttospeech
+
+            _google_client = texttospeech.TextToSpeechClient()
+    return _google_client
+
+
+def _google_tts(text: str, voice: str, fmt: str) -> bytes:
+    from google.cloud import texttospeech
+
+    client = _google_tts_client()
+    encoding = texttospeech.AudioEncoding.OGG_OPUS if fmt == "ogg" else texttospeech.AudioEncoding.MP3
+    response = client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text=text),
+        voice=texttospeech.VoiceSelectionParams(language_code=voice[:5], name=voice),
+        audio_config=texttospeech.AudioConfig(audio_encoding=encoding),
+    )
+    return response.audio_content
+
+
+async def _murf_tts(text: str, voice: str, fmt: str) -> Optional[bytes]:
+    murf_key = os.getenv("MURF_API_KEY")
+    if not murf_key:
+        return None
+    async with httpx.AsyncClient(timeout=TTS_TIMEOUT) as client:
+        response = await client.post(
+            "https://api.murf.ai/v1/speech/generate",
+            headers={"api-key": murf_key, "Content-Type": "application/json"},
+            json={"voiceId": voice, "text": text, "format": fmt.upper(), "encodeAsBase64": True},
+        )
+    if response.status_code == 429:
+        # Raised so call_with_backoff can retry it
+        response.raise_for_status()
+    if response.status_code != 200:
+        logger.warning(f"Murf TTS failed: {response.text}")
+        return None
+    encoded = response.json().get("encodedAudio")
+    return base64.b64decode(encoded) if encoded else None
+
+
+async def synthesize(text: str, provider: str = "google", voice: Optional[str] = None, fmt: str = "mp3") -> Optional[bytes]:
+    """Return audio for text, from the cache when this exact (text, voice, format) was spoken before."""
+    if provider not in DEFAULT_VOICES or not text:
+        return None
+    voice = voice or DEFAULT_VOICES[provider]
+    key = cache_key(text, f"{provider}:{voice}", fmt)
+    with span("tts_cache"):
+        audio = await asyncio.to_thread(TTS_CACHE.get, key, fmt)
+    if audio is not None:
+        return audio
+    pending = _IN_FLIGHT.get(key)
+    if pending is not None:
+        # shield: one waiter giving up must not cancel the synthesis for the others
+        return await asyncio.shield(pending)
+    pending = _IN_FLIGHT[key] = asyncio.get_running_loop().create_future()
+    audio = None
+    try:
+        with span("tts"):
+            if provider == "murf":
+                audio = await call_with_backoff(lambda: _murf_tts(text, voice, fmt), "murf")
+            else:
+                audio = await call_with_backoff(lambda: asyncio.to_thread(_google_tts, text, voice, fmt), "google_tts")
+        if audio:
+            await asyncio.to_thread(TTS_CACHE.put, key, fmt, audio)
+    except Exception as e:
+        logger.warning(f"{provider} TTS failed: {e}")
+        audio = None
+    finally:
+        del _IN_FLIGHT[key]
+        pending.set_result(audio)
+    return audio
@@ -0,0 +1,94 @@
+# Bounded, chunked access to uploaded audio for the /voice endpoint
+import os
+import struct
+from typing import AsyncIterator, Optional
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("VOICE_UPLOAD_CHUNK_BYTES", 64 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("VOICE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_UPLOAD_SECONDS = float(os.getenv("VOICE_MAX_UPLOAD_SECONDS", 60))
+
+# Raw PCM uploads carry no header, assume 16 kHz mono 16-bit
+RAW_PCM_TYPES = ("audio/l16", "audio/pcm", "audio/x-raw")
+RAW_PCM_BYTE_RATE = 16000 * 2
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def wav_byte_rate(header: bytes) -> Optional[int]:
+    """Return the byte rate from a RIFF/WAVE header, or None if it isn't one."""
+    if len(header) < 32 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    pos = 12
+    while pos + 8 <= len(header):
+        chunk_id = header[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", header, pos + 4)[0]
+        if chunk_id == b"fmt " and pos + 16 <= len(header):
+            return struct.unpack_from("<I", header, pos + 16)[0] or None
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+class AudioUpload:
+    """Reads an UploadFile in fixed-size chunks, enforcing size and duration limits.
+
+    Starlette already spools the request body to a temporary file, so reading
+    through this wrapper keeps per-request memory at one chunk instead of the
+    whole recording.
+    """
+
+    def __init__(
+        self,
+        upload: UploadFile,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+        max_seconds: float = MAX_UPLOAD_SECONDS,
+        chunk_size: int = UPLOAD_CHUNK_BYTES,
+    ):
+        self.upload = upload
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        content_type = (upload.content_type or "audio/wav").split(";")[0].strip().lower()
+        self.content_type = content_type
+        self.byte_rate: Optional[int] = RAW_PCM_BYTE_RATE if content_type in RAW_PCM_TYPES else None
+        self._header_checked = False
+
+    @property
+    def filename(self) -> str:
+        return self.upload.filename or "audio"
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if not self.byte_rate:
+            return None
+        return self.bytes_read / self.byte_rate
+
+    def _account(self, chunk: bytes) -> bytes:
+        if not self._header_checked:
+            self._header_checked = True
+            self.byte_rate = wav_byte_rate(chunk[:512]) or self.byte_rate
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(f"Audio upload exceeds {self.max_bytes} bytes.")
+        if self.seconds is not None and self.seconds > self.max_seconds:
+            raise UploadTooLarge(f"Audio upload exceeds {self.max_seconds:g} seconds.")
+        return chunk
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Yield the upload chunk by chunk, for streaming request bodies."""
+        while True:
+            chunk = await self.upload.read(self.chunk_size)
+            if not chunk:
+                break
+            yield self._account(chunk)
+
+    async def read_all(self) -> bytes:
+        """Read the whole upload for providers that need the full payload in one request."""
+        buf = bytearray()
+        async for chunk in self.chunks():
+            buf += chunk
+        return bytes(buf)